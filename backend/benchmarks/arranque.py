@@ -0,0 +1,175 @@
+# benchmarks/arranque.py
+"""
+Tempo de arranque do backend: cada medição corre num processo novo (arranque a frio),
+com a BD SQLite numa pasta temporária.
+
+Mede o `import main` (com -X importtime, para listar os módulos mais caros), o tempo até
+à primeira resposta a GET / (inclui o ciclo de vida: schema, aquecimento e tempo confiável)
+e verifica que as bibliotecas pesadas não são carregadas no import.
+
+Uso (a partir de backend/):
+    python -m benchmarks.arranque
+    python -m benchmarks.arranque --repeticoes 10 --top 25
+    python -m benchmarks.arranque --guardar-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PASTA_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "arranque_baseline.json")
+# Mais lento do que baseline * LIMIAR_REGRESSAO conta como regressão
+LIMIAR_REGRESSAO = 1.25
+# Não devem ser importadas por `import main` (são carregadas em segundo plano ou no primeiro pedido)
+PESADAS = ("pandas", "numpy", "openpyxl", "reportlab", "camelot", "requests", "rapidfuzz")
+
+PRIMEIRA_RESPOSTA = """
+import json, sys, time
+inicio = time.perf_counter()
+import main
+importado = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as cliente:
+    arrancado = time.perf_counter()
+    estado = cliente.get("/").status_code
+    respondido = time.perf_counter()
+pesadas = [m for m in {pesadas!r} if m in sys.modules]
+print(json.dumps({{
+    "import_s": importado - inicio,
+    "primeira_resposta_s": respondido - inicio,
+    "ciclo_de_vida_s": arrancado - importado,
+    "estado": estado,
+}}))
+"""
+
+LINHA_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _ambiente(pasta: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{pasta}/arranque.db",
+        "CACHE_EXTRACAO_DIR": os.path.join(pasta, "cache_extracao"),
+        "RESULTADOS_DIR": os.path.join(pasta, "resultados"),
+        "JOBS_DIR": os.path.join(pasta, "jobs"),
+        "CACHE_HMAC_FICHEIRO": os.path.join(pasta, "cache_hmac.key"),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    return env
+
+
+def medir_import(env: dict) -> dict:
+    """`import main` com -X importtime: total e módulos que main importa diretamente (acumulado)."""
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=PASTA_BACKEND, env=env, capture_output=True, text=True, check=True,
+    )
+    linhas = []
+    for linha in processo.stderr.splitlines():
+        m = LINHA_IMPORTTIME.match(linha)
+        if m:
+            linhas.append((int(m.group(2)), len(m.group(3)), m.group(4)))
+
+    # O importtime escreve os filhos antes do pai: a subárvore de main são as linhas
+    # mais indentadas imediatamente antes dela (o que o site carrega antes fica de fora)
+    fim = max(i for i, (_, _, nome) in enumerate(linhas) if nome == "main")
+    total_us, nivel_main, _ = linhas[fim]
+    modulos = {}
+    inicio = fim
+    while inicio > 0 and linhas[inicio - 1][1] > nivel_main:
+        inicio -= 1
+        acumulado, nivel, nome = linhas[inicio]
+        if nivel == nivel_main + 2:
+            modulos[nome] = acumulado / 1e6
+    carregados = {nome.split(".")[0] for _, _, nome in linhas[inicio:fim + 1]}
+    return {
+        "import_s": total_us / 1e6,
+        "modulos": modulos,
+        "pesadas": sorted(m for m in PESADAS if m in carregados),
+    }
+
+
+def medir_primeira_resposta(env: dict) -> dict:
+    processo = subprocess.run(
+        [sys.executable, "-c", PRIMEIRA_RESPOSTA.format(pesadas=PESADAS)],
+        cwd=PASTA_BACKEND, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def comparar(chave: str, valor: float, baseline: dict) -> str:
+    anterior = baseline.get("resultados", {}).get(chave)
+    if not anterior:
+        return ""
+    razao = valor / max(anterior, 1e-9)
+    marca = "❌ REGRESSÃO" if razao > LIMIAR_REGRESSAO else "✅"
+    return f"  {marca} {razao:.2f}x baseline ({anterior:.3f}s)"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tempo de arranque a frio do backend")
+    parser.add_argument("--repeticoes", type=int, default=5, help="processos por medição (mediana)")
+    parser.add_argument("--top", type=int, default=15, help="módulos mais caros a mostrar")
+    parser.add_argument("--sem-resposta", action="store_true", help="só mede o import")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--guardar-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    pasta = tempfile.mkdtemp(prefix="contacerta_arranque_")
+    try:
+        env = _ambiente(pasta)
+        imports = [medir_import(env) for _ in range(args.repeticoes)]
+        respostas = [] if args.sem_resposta else [medir_primeira_resposta(env) for _ in range(args.repeticoes)]
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    resultados = {"import_s": round(statistics.median(m["import_s"] for m in imports), 4)}
+    print(f"\n🚀 Arranque a frio (mediana de {args.repeticoes} processos)")
+    print(f"  import main             {resultados['import_s']:>8.3f}s{comparar('import_s', resultados['import_s'], baseline)}")
+    if respostas:
+        for chave, titulo in (("ciclo_de_vida_s", "ciclo de vida"), ("primeira_resposta_s", "primeira resposta GET /")):
+            resultados[chave] = round(statistics.median(r[chave] for r in respostas), 4)
+            print(f"  {titulo:<23} {resultados[chave]:>8.3f}s{comparar(chave, resultados[chave], baseline)}")
+        estados = {r["estado"] for r in respostas}
+        if estados != {200}:
+            print(f"  ⚠️ GET / respondeu {sorted(estados)}")
+
+    pesadas = sorted({m for medicao in imports for m in medicao["pesadas"]})
+    print(f"  bibliotecas pesadas no import: {', '.join(pesadas) if pesadas else 'nenhuma ✅'}")
+
+    nomes = set().union(*(m["modulos"] for m in imports))
+    modulos = {n: statistics.median(m["modulos"].get(n, 0.0) for m in imports) for n in nomes}
+    print(f"\n📦 Módulos importados por main (acumulado, top {args.top})")
+    for nome, segundos in sorted(modulos.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {nome:<45} {segundos:>8.3f}s")
+
+    regressoes = sum("REGRESSÃO" in comparar(k, v, baseline) for k, v in resultados.items())
+    if args.guardar_baseline:
+        baseline["ambiente"] = {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        }
+        baseline.setdefault("resultados", {}).update(resultados)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\n💾 Baseline gravada em {args.baseline}")
+
+    return 1 if regressoes or pesadas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
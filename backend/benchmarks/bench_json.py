@@ -0,0 +1,71 @@
+# benchmarks/bench_json.py
+"""
+Compara o caminho antigo de serialização do resultado fiscal
+(where/to_dict + jsonable_encoder + JSONResponse) com utils.json_rapido.
+
+Uso (a partir de backend/):  python benchmarks/bench_json.py [linhas] [repeticoes]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from utils.json_rapido import RespostaJSON, orjson, registos
+
+
+def gerar_resultado(n: int, seed: int = 0) -> pd.DataFrame:
+    """DataFrame com o formato de uma categoria fiscal (inclui NaN, datas e strings)."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "nif": [f"5{x:08d}" for x in rng.integers(0, n // 4 + 2, n)],
+        "nome_normalizado": rng.choice(["EMPRESA A LDA", "JOAO SILVA", "ACME SA"], n),
+        "documento_agt": [f"FT {x}" for x in rng.integers(0, n, n)],
+        "valor_agt": np.round(rng.random(n) * 10_000, 2),
+        "iva_agt": np.round(rng.random(n) * 1_400, 2),
+        "valor_cont": np.round(rng.random(n) * 10_000, 2),
+        "iva_cont": np.round(rng.random(n) * 1_400, 2),
+        "data_documento": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        "periodo": "2025-01",
+    })
+    df.loc[rng.random(n) < 0.05, "iva_agt"] = np.nan
+    df.loc[rng.random(n) < 0.05, "iva_cont"] = np.nan
+    return df
+
+
+def caminho_antigo(df: pd.DataFrame) -> bytes:
+    dados = jsonable_encoder(
+        {"conciliados": df.where(pd.notnull(df), None).to_dict(orient="records")},
+        custom_encoder={float: lambda x: None if pd.isna(x) else x},
+    )
+    return JSONResponse(dados).body
+
+
+def caminho_novo(df: pd.DataFrame) -> bytes:
+    return RespostaJSON({"conciliados": registos(df)}).body
+
+
+def medir(func, df: pd.DataFrame, repeticoes: int) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func(df)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+if __name__ == "__main__":
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    df = gerar_resultado(linhas)
+
+    print(f"📊 {linhas} linhas, melhor de {repeticoes} (orjson: {'sim' if orjson else 'não'})")
+    t_antigo = medir(caminho_antigo, df, repeticoes)
+    t_novo = medir(caminho_novo, df, repeticoes)
+    print(f"  jsonable_encoder + JSONResponse: {t_antigo:.3f}s")
+    print(f"  registos + RespostaJSON:         {t_novo:.3f}s  ({t_antigo / t_novo:.1f}x)")
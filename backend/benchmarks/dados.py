@@ -0,0 +1,207 @@
+# benchmarks/dados.py
+"""
+Gerador determinístico (seed) de dados sintéticos no formato que os extratores produzem:
+extrato BAI, contabilidade e mapas fiscais AGT / fornecedores.
+
+A contabilidade e o mapa de fornecedores são derivados do extrato / mapa AGT com o ruído
+que aparece nos dados reais: duplicados, valores quase iguais, datas deslocadas,
+descritivos com abreviaturas e erros de escrita, linhas em falta e linhas a mais.
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+INICIO = np.datetime64("2025-01-01")
+DIAS = 365
+
+ENTIDADES = [
+    "SONANGOL", "UNITEL", "ENDE", "EPAL", "TOTAL ENERGIES", "SHOPRITE", "KERO", "CANDANDO",
+    "BPC", "ZAP", "TAAG", "REFRIANGO", "MULTIPERFIL", "NOSSA SEGUROS", "ANGOLA TELECOM",
+]
+NOMES = [
+    "JOÃO MANUEL", "MARIA DA CONCEIÇÃO", "ANTÓNIO JOSÉ", "ANA PAULA", "PEDRO DOMINGOS",
+    "FRANCISCA LOURENÇO", "CARLOS ALBERTO", "TERESA GONÇALVES",
+]
+MODELOS = [
+    "TRANSFERENCIA {nome} REF {ref}",
+    "PAGAMENTO SERVICOS {ent} {ref}",
+    "COMPRA TPA {ent} LUANDA",
+    "LEVANTAMENTO ATM {ref}",
+    "DEPOSITO NUMERARIO {nome}",
+    "COMISSAO MANUTENCAO CONTA",
+    "IMPOSTO SELO {ref}",
+    "SALARIO {nome}",
+]
+ABREVIATURAS = {
+    "TRANSFERENCIA": "TRF", "PAGAMENTO": "PAG", "SERVICOS": "SERV", "LEVANTAMENTO": "LEV",
+    "DEPOSITO": "DEP", "COMISSAO": "COM", "MANUTENCAO": "MANUT", "NUMERARIO": "NUM",
+}
+FIRMAS = [
+    "Sonangol Distribuição, S.A.", "Unitel, S.A.", "Refriango - Indústria, Lda.",
+    "Candando Comércio, Lda", "Construções Kianda Lda.", "Farmácia São José",
+    "Tecnologias Ngola, S.A.", "Transportes Bié, Lda.", "Restaurante O Cantinho",
+    "Gráfica Palanca Negra, Lda.",
+]
+
+
+def _valores_pt(valores: np.ndarray) -> list:
+    """Valores como o PDF do BAI os mostra ('2.507,55'; vazio para zero)."""
+    return [f"{v:,.2f}".replace(",", " ").replace(".", ",").replace(" ", ".") if v else "" for v in valores]
+
+
+def _descritivos(rng: np.random.Generator, n: int) -> np.ndarray:
+    modelos = rng.integers(0, len(MODELOS), n)
+    nomes = rng.integers(0, len(NOMES), n)
+    entidades = rng.integers(0, len(ENTIDADES), n)
+    refs = rng.integers(100_000, 999_999, n)
+    return np.array([
+        MODELOS[m].format(nome=NOMES[p], ent=ENTIDADES[e], ref=r)
+        for m, p, e, r in zip(modelos, nomes, entidades, refs)
+    ], dtype=object)
+
+
+def _com_ruido(rng: np.random.Generator, texto: str) -> str:
+    """Abreviaturas, palavras trocadas ou cortadas e erros de escrita, como na contabilidade."""
+    palavras = [ABREVIATURAS.get(p, p) if rng.random() < 0.5 else p for p in texto.split()]
+    sorteio = rng.random()
+    if sorteio < 0.15 and len(palavras) > 2:
+        palavras = palavras[:-1]
+    elif sorteio < 0.25 and len(palavras) > 1:
+        i = int(rng.integers(0, len(palavras) - 1))
+        palavras[i], palavras[i + 1] = palavras[i + 1], palavras[i]
+    texto = " ".join(palavras)
+    if rng.random() < 0.2 and len(texto) > 3:
+        i = int(rng.integers(0, len(texto)))
+        texto = texto[:i] + texto[i + 1:]
+    return texto
+
+
+def gerar_contabil(n: int, seed: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Extrato BAI com n linhas (colunas de extrair_dados_bai) e a contabilidade correspondente
+    (colunas de extrair_dados_contabilidade), ordenados por data.
+
+    Da contabilidade: ~70% das linhas do extrato aparecem iguais (com descritivo ruidoso),
+    ~8% com valor quase igual (metade dentro da tolerância de 0,01), ~8% com data deslocada
+    1 a 3 dias, ~4% em duplicado; ~10% faltam e há mais ~10% de lançamentos só contabilísticos.
+    """
+    rng = np.random.default_rng(seed)
+    datas = np.sort(INICIO + rng.integers(0, DIAS, n).astype("timedelta64[D]"))
+    data_valor = datas + (rng.random(n) < 0.1).astype("timedelta64[D]")
+    valores = np.round(rng.lognormal(9, 1.5, n), 2)
+    entrada = rng.random(n) < 0.4
+    credito = np.where(entrada, valores, 0.0)
+    debito = np.where(entrada, 0.0, valores)
+    descritivos = _descritivos(rng, n)
+    saldo = np.round(1_000_000 + np.cumsum(credito - debito), 2)
+
+    extrato = pd.DataFrame({
+        "data mov.": pd.to_datetime(datas).strftime("%d-%m-%Y"),
+        "data valor": pd.to_datetime(data_valor).strftime("%d-%m-%Y"),
+        "descritivo": descritivos,
+        "débito": _valores_pt(debito),
+        "crédito": _valores_pt(credito),
+        "movimento": _valores_pt(saldo),
+    })
+
+    # Contrapartidas na contabilidade
+    sorteio = rng.random(n)
+    presente = sorteio >= 0.10
+    quase = (sorteio >= 0.10) & (sorteio < 0.18)
+    deslocada = (sorteio >= 0.18) & (sorteio < 0.26)
+    duplicada = (sorteio >= 0.26) & (sorteio < 0.30)
+
+    idx = np.concatenate([np.flatnonzero(presente), np.flatnonzero(duplicada)])
+    c_datas = datas[idx].copy()
+    c_data_valor = data_valor[idx].copy()
+    c_credito = credito[idx].copy()
+    c_debito = debito[idx].copy()
+
+    ajuste = np.where(rng.random(len(idx)) < 0.5, 0.01, rng.choice([0.5, 1.0, 10.0], len(idx)))
+    ajuste = np.where(quase[idx], ajuste * rng.choice([-1, 1], len(idx)), 0.0)
+    c_credito = np.round(np.where(c_credito > 0, np.maximum(c_credito + ajuste, 0.01), 0.0), 2)
+    c_debito = np.round(np.where(c_debito > 0, np.maximum(c_debito + ajuste, 0.01), 0.0), 2)
+
+    deslocamento = np.where(deslocada[idx], rng.integers(1, 4, len(idx)), 0).astype("timedelta64[D]")
+    c_datas = c_datas + deslocamento
+    c_data_valor = np.where(rng.random(len(idx)) < 0.5, c_data_valor + deslocamento, c_data_valor)
+    c_descritivos = [_com_ruido(rng, d) for d in descritivos[idx]]
+
+    # Lançamentos só contabilísticos
+    extra = n // 10
+    e_datas = INICIO + rng.integers(0, DIAS, extra).astype("timedelta64[D]")
+    e_valores = np.round(rng.lognormal(8, 1.5, extra), 2)
+    e_entrada = rng.random(extra) < 0.5
+
+    contab = pd.DataFrame({
+        "data_movimento": pd.to_datetime(np.concatenate([c_datas, e_datas])),
+        "data_valor": pd.to_datetime(np.concatenate([c_data_valor, e_datas])),
+        "descritivo": c_descritivos + ["ACERTO " + d for d in _descritivos(rng, extra)],
+        "debito": np.concatenate([c_debito, np.where(e_entrada, 0.0, e_valores)]),
+        "credito": np.concatenate([c_credito, np.where(e_entrada, e_valores, 0.0)]),
+    })
+    contab = contab.sort_values("data_movimento", kind="stable").reset_index(drop=True)
+    contab.insert(1, "numero_operacao", [f"OP{i:08d}" for i in range(len(contab))])
+    contab["saldo_disponivel"] = np.round(1_000_000 + np.cumsum(contab["credito"] - contab["debito"]), 2)
+    return extrato, contab
+
+
+def gerar_fiscal(n: int, seed: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Mapa AGT com n documentos e o mapa de fornecedores da contabilidade (colunas originais
+    dos ficheiros Excel). Nos fornecedores: ~10% dos documentos faltam, ~15% têm o nº do
+    documento escrito de outra forma, ~8% diferem no IVA, ~4% no valor (quase sempre por
+    pouco), ~3% estão em duplicado e há ~5% de documentos que não constam da AGT.
+    """
+    rng = np.random.default_rng(seed)
+    nifs = rng.integers(0, max(2, n // 20), n)
+    nif = np.array([f"5{x:09d}" for x in nifs], dtype=object)
+    firma = np.array(FIRMAS, dtype=object)[nifs % len(FIRMAS)]
+    serie = rng.choice(["FT", "FR", "FS"], n)
+    documento = np.array([f"{s} {2025}/{i + 1}" for s, i in zip(serie, rng.permutation(n))], dtype=object)
+    valor = np.round(rng.lognormal(10, 1.2, n), 2)
+    iva = np.round(valor * 0.14, 2)
+    periodo = pd.to_datetime(INICIO + rng.integers(0, DIAS, n).astype("timedelta64[D]")).strftime("%Y-%m")
+
+    agt = pd.DataFrame({
+        "Nº de Identificação Fiscal": nif,
+        "Nome / Firma": firma,
+        "Nº do Documento": documento,
+        "Valor do Documento": valor,
+        "IVA Dedutível - Valor": iva,
+        "Período": periodo,
+    })
+
+    sorteio = rng.random(n)
+    idx = np.concatenate([np.flatnonzero(sorteio >= 0.10), np.flatnonzero(sorteio >= 0.97)])
+    m = len(idx)
+    c_doc = documento[idx].copy()
+    variante = rng.random(m)
+    c_doc = np.array([
+        d.replace(" ", "") if v < 0.05 else d.lower() if v < 0.10 else f" {d} " if v < 0.15 else d
+        for d, v in zip(c_doc, variante)
+    ], dtype=object)
+    c_iva = iva[idx] + np.where(rng.random(m) < 0.08, rng.choice([0.5, 14.0, 100.0], m), 0.0)
+    c_valor = valor[idx] + np.where(rng.random(m) < 0.04, rng.choice([0.5, 1.0, 50.0], m), 0.0)
+    c_firma = np.array([f.upper() if rng.random() < 0.3 else f for f in firma[idx]], dtype=object)
+
+    extra = n // 20
+    e_valor = np.round(rng.lognormal(10, 1.2, extra), 2)
+    forn = pd.DataFrame({
+        "NIF": np.concatenate([nif[idx], nif[rng.integers(0, n, extra)]]),
+        "NOME / DENOMINAÇÃO": np.concatenate([c_firma, firma[rng.integers(0, n, extra)]]),
+        "NÚMERO DO DOCUMENTO": np.concatenate([c_doc, [f"NC 2025/{i + 1}" for i in range(extra)]]),
+        "VALOR DO DOCUMENTO": np.round(np.concatenate([c_valor, e_valor]), 2),
+        "IVA DEDUTÍVEL VALOR": np.round(np.concatenate([c_iva, e_valor * 0.14]), 2),
+        "Período": np.concatenate([periodo[idx], periodo[:extra]]),
+    })
+    return agt, forn.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+def gravar_mapas_fiscais(agt: pd.DataFrame, forn: pd.DataFrame, pasta: str) -> Dict[str, str]:
+    """Grava os mapas como os ficheiros reais (cabeçalho na 3ª linha na AGT, na 2ª nos fornecedores)."""
+    caminhos = {"agt": f"{pasta}/mapa_agt.xlsx", "fornecedores": f"{pasta}/mapa_fornecedores.xlsx"}
+    agt.to_excel(caminhos["agt"], startrow=2, index=False)
+    forn.to_excel(caminhos["fornecedores"], startrow=1, index=False)
+    return caminhos
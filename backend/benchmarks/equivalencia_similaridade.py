@@ -0,0 +1,93 @@
+# benchmarks/equivalencia_similaridade.py
+"""
+Equivalência dos matchers com dados sintéticos (benchmarks/dados.py).
+
+Verifica que conciliar_listas e reconcile_movements emparelham exatamente os mesmos pares,
+com o mesmo score, usando o MotorSimilaridade (por omissão) e pontuando par a par
+(usar_motor_similaridade / use_similarity_engine = False), e mostra o tempo de cada modo.
+
+Uso (a partir de backend/):
+    python -m benchmarks.equivalencia_similaridade
+    python -m benchmarks.equivalencia_similaridade --tamanhos 2000 --seed 7
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.dados import gerar_contabil
+from utils.conciliacao import conciliar_listas
+from utils.extratores import normalizar_data, normalizar_valor
+from utils.reconciliador import reconcile_movements
+
+TAMANHOS = (1_000, 10_000)
+
+
+def listas_conciliacao(extrato, contab):
+    """Extrato e contabilidade como conciliar_movimentos_db os lê da BD (to_dict_list)."""
+    ext = [{
+        "id": i,
+        "data_mov": normalizar_data(r["data mov."]).isoformat(),
+        "data_valor": normalizar_data(r["data valor"]).isoformat(),
+        "descritivo": r["descritivo"].upper().strip(),
+        "debito": float(normalizar_valor(r["débito"])),
+        "credito": float(normalizar_valor(r["crédito"])),
+    } for i, r in enumerate(extrato.to_dict("records"))]
+    cont = [{
+        "id": i,
+        "data_mov": r["data_movimento"].date().isoformat(),
+        "data_valor": r["data_valor"].date().isoformat(),
+        "descritivo": r["descritivo"].upper().strip(),
+        "debito": float(r["debito"]),
+        "credito": float(r["credito"]),
+    } for i, r in enumerate(contab.to_dict("records"))]
+    return ext, cont
+
+
+def pares_conciliacao(extrato, contab, **opcoes) -> set:
+    ext, cont = listas_conciliacao(extrato, contab)
+    resultado = conciliar_listas(ext, cont, paralelo=False, **opcoes)
+    return {(c["extrato_id"], c["contabilidade_id"]) for c in resultado["conciliados"]}
+
+
+def pares_reconciliador(extrato, espelho, **opcoes) -> set:
+    resultado = reconcile_movements(extrato, espelho, parallel=False, **opcoes)
+    return {(m["ext_idx"], m["cont_idx"], m["status"], m["desc_similarity"])
+            for m in resultado["matches"] + resultado["potential"]}
+
+
+def _medir(funcao, **opcoes):
+    inicio = time.perf_counter()
+    pares = funcao(**opcoes)
+    return pares, time.perf_counter() - inicio
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Equivalência do MotorSimilaridade com o score par a par")
+    parser.add_argument("--tamanhos", default=",".join(str(t) for t in TAMANHOS))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    diferentes = 0
+    for n in (int(t) for t in args.tamanhos.split(",") if t):
+        extrato, contab = gerar_contabil(n, args.seed)
+        # reconcile_movements usa o sinal da contabilidade em espelho (débito = entrada)
+        espelho = contab.rename(columns={"debito": "credito", "credito": "debito"})
+        print(f"\n📦 {n} linhas (seed {args.seed})")
+
+        for nome, funcao, opcao in (
+            ("conciliar_listas", lambda **o: pares_conciliacao(extrato, contab, **o), "usar_motor_similaridade"),
+            ("reconcile_movements", lambda **o: pares_reconciliador(extrato, espelho, **o), "use_similarity_engine"),
+        ):
+            referencia, t_ref = _medir(funcao, **{opcao: False})
+            motor, t_motor = _medir(funcao, **{opcao: True})
+            igual = motor == referencia
+            diferentes += not igual
+            print(f"  {nome:<20} par a par {len(referencia):>6} pares {t_ref:>8.2f}s")
+            print(f"  {nome:<20} motor     {len(motor):>6} pares {t_motor:>8.2f}s  "
+                  f"(+{len(motor - referencia)} / -{len(referencia - motor)})  {'✅' if igual else '❌'}")
+
+    return 1 if diferentes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+# benchmarks/executar.py
+"""
+Benchmarks de conciliar_movimentos_db, reconcile_movements, reconciliar_fiscal e
+gerar_excel_conciliacao com dados sintéticos (benchmarks/dados.py), offline em SQLite.
+
+Para cada função e tamanho mostra o tempo (mediana de N execuções), o pico de memória Python
+(tracemalloc, numa execução à parte, só do processo principal) e as contagens de resultado,
+comparando com a baseline guardada. Só conta como regressão o que passa LIMIAR_REGRESSAO e
+também LIMIAR_ABSOLUTO_S: nas medições curtas o ruído da máquina chega a 25%.
+
+Uso (a partir de backend/):
+    python -m benchmarks.executar                              # 1k, 10k, 100k e 1M
+    python -m benchmarks.executar --tamanhos 1000,10000 --funcoes fiscal,excel
+    python -m benchmarks.executar --tamanhos 1000,10000 --guardar-baseline
+    python -m benchmarks.executar --tamanhos 1000000 --sem-memoria --guardar-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# A BD e os caches têm de apontar para a pasta temporária antes de importar a aplicação
+PASTA_TRABALHO = tempfile.mkdtemp(prefix="contacerta_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{PASTA_TRABALHO}/bench.db"
+os.environ["CACHE_EXTRACAO_DIR"] = os.path.join(PASTA_TRABALHO, "cache_extracao")
+os.environ["RESULTADOS_DIR"] = os.path.join(PASTA_TRABALHO, "resultados")
+os.environ["CACHE_HMAC_FICHEIRO"] = os.path.join(PASTA_TRABALHO, "cache_hmac.key")
+
+import pandas as pd
+
+from benchmarks.dados import gerar_contabil, gerar_fiscal, gravar_mapas_fiscais
+from models.user_model import ExecucaoReconciliacao
+from services.reconciliacao_contabil_service import (
+    salvar_movimentacoes_contabilidade, salvar_movimentacoes_extrato
+)
+from services.reconciliacao_fiscal_service import reconciliar_fiscal
+from utils import cache_ficheiros
+from utils.conciliacao import conciliar_movimentos_db
+from utils.db import Base, SessionLocal, engine
+from utils.reconciliador import reconcile_movements
+from utils.relatorios import gerar_excel_conciliacao
+
+TAMANHOS = (1_000, 10_000, 100_000, 1_000_000)
+FUNCOES = ("conciliar_movimentos_db", "reconcile_movements", "reconciliar_fiscal", "gerar_excel_conciliacao")
+ATALHOS = {"db": FUNCOES[0], "reconcile": FUNCOES[1], "fiscal": FUNCOES[2], "excel": FUNCOES[3]}
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Mais lento do que baseline * LIMIAR_REGRESSAO (e mais LIMIAR_ABSOLUTO_S segundos) conta como regressão
+LIMIAR_REGRESSAO = 1.25
+LIMIAR_ABSOLUTO_S = 0.1
+# Execuções por medição quando --repeticoes não é dado: menos nos tamanhos grandes
+REPETICOES_POR_TAMANHO = ((10_000, 5), (100_000, 3))
+
+
+def repeticoes_para(n: int) -> int:
+    for limite, repeticoes in REPETICOES_POR_TAMANHO:
+        if n <= limite:
+            return repeticoes
+    return 1
+
+
+def medir(func, repeticoes: int, com_memoria: bool, preparar=None) -> dict:
+    """Mediana (e intervalo) de `repeticoes` execuções e, numa execução extra, o pico do tracemalloc."""
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        resultado = func()
+        tempos.append(time.perf_counter() - inicio)
+    medicao = {"segundos": round(statistics.median(tempos), 4), "min_s": round(min(tempos), 4),
+               "max_s": round(max(tempos), 4), "repeticoes": len(tempos), "pico_mb": None, "resultado": resultado}
+    if com_memoria:
+        if preparar:
+            preparar()
+        tracemalloc.start()
+        try:
+            func()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        medicao["pico_mb"] = round(pico / (1024 * 1024), 1)
+    return medicao
+
+
+def _contagens(resultado: dict, chaves) -> dict:
+    return {k: len(resultado.get(k, [])) for k in chaves}
+
+
+def _limpar_cache_fiscal():
+    """Cada execução lê e normaliza os mapas de novo (sem cache em memória nem em disco)."""
+    cache_ficheiros._memoria.clear()
+    shutil.rmtree(os.environ["CACHE_EXTRACAO_DIR"], ignore_errors=True)
+
+
+def executar_tamanho(n: int, funcoes, seed: int, repeticoes: int, com_memoria: bool) -> dict:
+    print(f"\n📦 {n} linhas (seed {seed})")
+    inicio = time.perf_counter()
+    extrato, contab = gerar_contabil(n, seed)
+    agt, forn = gerar_fiscal(n, seed)
+    print(f"  dados gerados em {time.perf_counter() - inicio:.1f}s")
+
+    medicoes = {}
+    db = SessionLocal()
+    try:
+        execucao_id = None
+        if FUNCOES[0] in funcoes or FUNCOES[3] in funcoes:
+            inicio = time.perf_counter()
+            execucao = ExecucaoReconciliacao(empresa_id=1)
+            db.add(execucao)
+            db.flush()
+            salvar_movimentacoes_extrato(db, extrato, 1, execucao.id)
+            salvar_movimentacoes_contabilidade(db, contab, 1, execucao.id)
+            db.commit()
+            execucao_id = execucao.id
+            print(f"  movimentos gravados em SQLite em {time.perf_counter() - inicio:.1f}s")
+
+        conciliacao = None
+        if FUNCOES[0] in funcoes:
+            m = medir(lambda: conciliar_movimentos_db(db, execucao_id), repeticoes, com_memoria)
+            conciliacao = m.pop("resultado")
+            m["contagens"] = _contagens(conciliacao, ("conciliados", "somente_extrato", "somente_contabilidade"))
+            medicoes[FUNCOES[0]] = m
+
+        if FUNCOES[1] in funcoes:
+            # reconcile_movements usa o sinal da contabilidade em espelho (débito = entrada)
+            espelho = contab.rename(columns={"debito": "credito", "credito": "debito"})
+            m = medir(lambda: reconcile_movements(extrato, espelho), repeticoes, com_memoria)
+            m["contagens"] = _contagens(m.pop("resultado"),
+                                        ("matches", "potential", "unmatched_extrato", "unmatched_contabilidade"))
+            medicoes[FUNCOES[1]] = m
+
+        if FUNCOES[2] in funcoes:
+            inicio = time.perf_counter()
+            caminhos = gravar_mapas_fiscais(agt, forn, PASTA_TRABALHO)
+            print(f"  mapas fiscais gravados em {time.perf_counter() - inicio:.1f}s")
+            m = medir(lambda: reconciliar_fiscal(caminhos["agt"], caminhos["fornecedores"]),
+                      repeticoes, com_memoria, preparar=_limpar_cache_fiscal)
+            m["contagens"] = _contagens(m.pop("resultado"), (
+                "conciliados", "divergentes_iva", "conciliados_aproximados", "so_agt", "so_contabilidade"))
+            medicoes[FUNCOES[2]] = m
+
+        if FUNCOES[3] in funcoes:
+            if conciliacao is None:
+                conciliacao = conciliar_movimentos_db(db, execucao_id)
+            caminho = os.path.join(PASTA_TRABALHO, f"relatorio_{n}.xlsx")
+            m = medir(lambda: gerar_excel_conciliacao(db, execucao_id, caminho, conciliacao=conciliacao),
+                      repeticoes, com_memoria)
+            m.pop("resultado")
+            m["contagens"] = {"linhas": sum(_contagens(conciliacao, (
+                "conciliados", "somente_extrato", "somente_contabilidade")).values())}
+            medicoes[FUNCOES[3]] = m
+    finally:
+        db.close()
+    return medicoes
+
+
+def comparar(funcao: str, n: int, medicao: dict, baseline: dict) -> str:
+    anterior = baseline.get("resultados", {}).get(funcao, {}).get(str(n))
+    if not anterior:
+        return ""
+    razao = medicao["segundos"] / max(anterior["segundos"], 1e-9)
+    regressao = razao > LIMIAR_REGRESSAO and medicao["segundos"] - anterior["segundos"] > LIMIAR_ABSOLUTO_S
+    marca = "❌ REGRESSÃO" if regressao else "✅"
+    texto = f"  {marca} {razao:.2f}x baseline"
+    if anterior.get("contagens") != medicao["contagens"]:
+        texto += f"  ⚠️ contagens diferentes (baseline {anterior.get('contagens')})"
+    return texto
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de conciliação com dados sintéticos")
+    parser.add_argument("--tamanhos", default=",".join(str(t) for t in TAMANHOS))
+    parser.add_argument("--funcoes", default=",".join(FUNCOES),
+                        help="nomes completos ou atalhos: " + ", ".join(ATALHOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=None,
+                        help="execuções por medição (mediana); por omissão 5 até 10k linhas, 3 até 100k, 1 acima")
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede o pico de memória")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--guardar-baseline", action="store_true",
+                        help="grava as medições na baseline (mantém as dos tamanhos não medidos)")
+    args = parser.parse_args(argv)
+
+    tamanhos = [int(t) for t in args.tamanhos.split(",") if t]
+    funcoes = [ATALHOS.get(f, f) for f in args.funcoes.split(",") if f]
+    desconhecidas = set(funcoes) - set(FUNCOES)
+    if desconhecidas:
+        parser.error(f"funções desconhecidas: {', '.join(sorted(desconhecidas))}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    Base.metadata.create_all(bind=engine)
+    resultados = {}
+    regressoes = 0
+    try:
+        for n in tamanhos:
+            repeticoes = args.repeticoes or repeticoes_para(n)
+            for funcao, medicao in executar_tamanho(n, funcoes, args.seed, repeticoes,
+                                                    not args.sem_memoria).items():
+                resultados.setdefault(funcao, {})[str(n)] = medicao
+                pico = f"{medicao['pico_mb']:.1f} MB" if medicao["pico_mb"] is not None else "-"
+                comparacao = comparar(funcao, n, medicao, baseline)
+                regressoes += "REGRESSÃO" in comparacao
+                intervalo = f"[{medicao['min_s']:.3f}-{medicao['max_s']:.3f}] x{medicao['repeticoes']}"
+                print(f"  {funcao:<26} {medicao['segundos']:>9.3f}s {intervalo:<22} pico {pico:>10}  "
+                      f"{medicao['contagens']}{comparacao}")
+    finally:
+        engine.dispose()
+        shutil.rmtree(PASTA_TRABALHO, ignore_errors=True)
+
+    if args.guardar_baseline:
+        if baseline.get("seed", args.seed) != args.seed:
+            baseline["resultados"] = {}
+        baseline["seed"] = args.seed
+        baseline["ambiente"] = {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        }
+        for funcao, por_tamanho in resultados.items():
+            baseline.setdefault("resultados", {}).setdefault(funcao, {}).update(por_tamanho)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\n💾 Baseline gravada em {args.baseline}")
+
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,10 @@
 # ✅ main.py
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from routers import auth_router
 from utils.db import Base, engine
 from routers import auth_router, licenca_router
@@ -8,8 +12,32 @@ from routers import auth_router, licenca_router, reconciliacao_fiscal_router
 from routers import reconciliacao_contabil_router
 from routers import relatorio_router
 from routers import dashboard_router
+from routers import metricas_router
 from models import user_model
-app = FastAPI()
+from utils.migracoes import migrar_schema
+from utils.arranque import aquecer_modulos
+from utils.jobs import gestor_jobs
+from services.licenca_service import iniciar_atualizador_tempo
+# LOG_LEVEL=DEBUG ativa os dumps de DataFrames da extração
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+def verificar_schema():
+    Base.metadata.create_all(bind=engine)
+    migrar_schema(engine)
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    # Schema no arranque do servidor (não ao importar main), fora do event loop
+    await run_in_threadpool(verificar_schema)
+    # Jobs que o processo anterior deixou a meio ficam com estado final (erro) para quem os consulta
+    await run_in_threadpool(gestor_jobs.recuperar_interrompidos)
+    # pandas/camelot/reportlab/openpyxl carregam em segundo plano; os routers só os importam quando precisam
+    aquecer_modulos()
+    # A data confiável da licença é atualizada em segundo plano (o /licenca/status não espera pela rede)
+    iniciar_atualizador_tempo()
+    yield
+
+app = FastAPI(lifespan=ciclo_de_vida)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,8 +47,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-Base.metadata.create_all(bind=engine)
-
 @app.get("/")
 def root():
     return {"msg": "API ContaCerta rodando"}
@@ -31,6 +57,7 @@ app.include_router(reconciliacao_fiscal_router.router)
 app.include_router(reconciliacao_contabil_router.router)
 app.include_router(relatorio_router.router)
 app.include_router(dashboard_router.router)
+app.include_router(metricas_router.router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, Numeric, Index, Float
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from utils.db import Base
@@ -47,15 +47,21 @@ class MovimentacaoBAI(Base):
     empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False)
     execucao_id = Column(Integer, ForeignKey("execucoes_reconciliacao.id"), nullable=False)
 
-    data_mov = Column(String(20))
-    data_valor = Column(String(20))
+    data_mov = Column(Date)
+    data_valor = Column(Date)
     descritivo = Column(String(255))
-    debito = Column(Float)
-    credito = Column(Float)
-    saldo = Column(Float)
+    debito = Column(Numeric(18, 2))
+    credito = Column(Numeric(18, 2))
+    saldo = Column(Numeric(18, 2))
+    valor = Column(Numeric(18, 2))  # líquido: crédito - débito
 
     criado_em = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_mov_bai_execucao_data_valor", "execucao_id", "data_mov", "valor"),
+        Index("ix_mov_bai_empresa_criado", "empresa_id", "criado_em"),
+    )
+
 class MovimentacaoContabilidade(Base):
     __tablename__ = "movimentacoes_contabilidade"
 
@@ -63,16 +69,22 @@ class MovimentacaoContabilidade(Base):
     empresa_id = Column(Integer, ForeignKey("empresas.id"))
     execucao_id = Column(Integer, ForeignKey("execucoes_reconciliacao.id"))
 
-    data_mov = Column(String(40))
-    data_valor = Column(String(40))
+    data_mov = Column(Date)
+    data_valor = Column(Date)
     numero_operacao = Column(String(40))
     descritivo = Column(String(255))
-    debito = Column(Float)
-    credito = Column(Float)
-    saldo = Column(Float)
+    debito = Column(Numeric(18, 2))
+    credito = Column(Numeric(18, 2))
+    saldo = Column(Numeric(18, 2))
+    valor = Column(Numeric(18, 2))  # líquido: crédito - débito
 
     criado_em = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_mov_contab_execucao_data_valor", "execucao_id", "data_mov", "valor"),
+        Index("ix_mov_contab_empresa_criado", "empresa_id", "criado_em"),
+    )
+
 class ExecucaoReconciliacao(Base):
     __tablename__ = "execucoes_reconciliacao"
 
@@ -85,3 +97,17 @@ class ExecucaoReconciliacao(Base):
     # Exemplo: pode ter status ou observações
     status = Column(String(20), default="finalizada")
 
+    # Duração (segundos) de cada etapa e linhas processadas, preenchidas por processar_contabil
+    duracao_upload = Column(Float)
+    duracao_extracao = Column(Float)
+    duracao_persistencia = Column(Float)
+    duracao_conciliacao = Column(Float)
+    duracao_relatorio = Column(Float)  # última geração de relatório (PDF ou Excel)
+    linhas_extrato = Column(Integer)
+    linhas_contabilidade = Column(Integer)
+    linhas_conciliadas = Column(Integer)
+
+    __table_args__ = (
+        Index("ix_execucao_empresa_criado", "empresa_id", "criado_em"),
+    )
+
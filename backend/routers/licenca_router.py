@@ -1,11 +1,10 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 import json
 import base64
-from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.backends import default_backend
 import os
-from services.licenca_service import validar_licenca
+from services.licenca_service import validar_licenca, carregar_chave_publica
 from models.user_model import Empresa, User 
 from sqlalchemy.orm import Session
 from utils.db import get_db
@@ -14,14 +13,6 @@ router = APIRouter(prefix="/licenca", tags=["Licença"])
 LICENCA_DIR = os.path.join(os.path.dirname(__file__), "../licencas")
 LICENCA_PATH = os.path.join(LICENCA_DIR, "licenca.lic")
 
-def carregar_chave_publica():
-    try:
-        caminho = os.path.join(os.path.dirname(__file__), "../public_key.pem")
-        with open(caminho, "rb") as f:
-            return serialization.load_pem_public_key(f.read(), backend=default_backend())
-    except Exception as e:
-        raise RuntimeError(f"Erro ao carregar chave pública: {str(e)}")
-
 @router.post("/upload")
 async def receber_licenca(
     file: UploadFile = File(...),
@@ -84,12 +75,8 @@ def verificar_licenca():
         if not os.path.exists(LICENCA_PATH):
             return {"valida": False, "motivo": "Arquivo de licença não encontrado"}
 
-        # ✅ Usa a função que valida assinatura, data e máquina
-        public_key_path = os.path.join(os.path.dirname(__file__), "../public_key.pem")
-        with open(public_key_path, "r") as f:
-            public_key_pem = f.read()
-
-        licenca = validar_licenca(LICENCA_PATH, public_key_pem)
+        # ✅ Valida assinatura, data e máquina (resultado em cache até o ficheiro mudar)
+        licenca = validar_licenca(LICENCA_PATH)
 
         return {"valida": True, "dados": licenca}
 
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from utils.metricas import texto_prometheus
+
+router = APIRouter(tags=["Métricas"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metricas():
+    """Histogramas de duração e linhas por etapa, no formato de texto do Prometheus."""
+    return PlainTextResponse(texto_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
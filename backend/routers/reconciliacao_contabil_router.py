@@ -1,9 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form
+from typing import Optional, Tuple
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from services.reconciliacao_contabil_service import processar_contabil
+from models.user_model import ExecucaoReconciliacao
 from utils.db import get_db
+from utils.jobs import gestor_jobs
+from utils.json_rapido import RespostaJSON
+from utils.paginacao import LIMITE_PADRAO, paginar, linhas_ndjson
+from utils.resultados import ResultadoEmCalculo, obter_ou_calcular
 
-router = APIRouter(prefix="/contabil", tags=["Reconciliação Contábil"])
+router = APIRouter(prefix="/contabil", tags=["Reconciliação Contábil"], default_response_class=RespostaJSON)
+
+# O serviço contábil (pandas, camelot) é importado no primeiro pedido ou no aquecimento, não no arranque
 
 @router.post("/upload")
 async def upload_ficheiros_contabeis(
@@ -11,20 +19,90 @@ async def upload_ficheiros_contabeis(
     modelo: str = Form(...),
     extrato: UploadFile = File(...),
     contabilidade: UploadFile = File(...),
-    db: Session = Depends(get_db)
 ):
-   
+    if banco not in ("bfa", "bai"):
+        raise HTTPException(status_code=400, detail="Banco não suportado")
+    from services.reconciliacao_contabil_service import guardar_ficheiros_contabeis, processar_contabil
+
     try:
         empresa_id = 1  # ← virá do token futuramente
-        resultado = await processar_contabil(
-            banco=banco,
-            modelo=modelo,
-            extrato_file=extrato,
-            contabilidade_file=contabilidade,
-            db=db,
-            empresa_id=empresa_id,
-        )
-        print("Chegou aqui")
-        return {"msg": "Ficheiros processados com sucesso", "dados": resultado}
+        ficheiros = await guardar_ficheiros_contabeis(extrato, contabilidade, empresa_id)
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro no processamento: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao gravar ficheiros: {str(e)}")
+
+    # Processamento pesado corre num job; o cliente consulta /contabil/jobs/{job_id}
+    job = gestor_jobs.submeter(
+        "contabil",
+        processar_contabil,
+        banco=banco,
+        modelo=modelo,
+        empresa_id=empresa_id,
+        **ficheiros,
+    )
+    return {"msg": "Processamento iniciado", "job_id": job.id, "estado": job.estado}
+
+
+@router.get("/jobs/{job_id}")
+def estado_job(job_id: str):
+    job = gestor_jobs.obter(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return RespostaJSON(job.to_dict())
+
+
+def _lista_execucao(db: Session, execucao_id: int, categoria: str) -> Tuple[list, str]:
+    from services.reconciliacao_contabil_service import CATEGORIAS_CONTABIL
+
+    if categoria not in CATEGORIAS_CONTABIL:
+        raise HTTPException(status_code=404, detail="Categoria desconhecida")
+    if db.query(ExecucaoReconciliacao.id).filter_by(id=execucao_id).first() is None:
+        raise HTTPException(status_code=404, detail="Execução não encontrada")
+    try:
+        conciliacao, versao = obter_ou_calcular(db, execucao_id)
+    except ResultadoEmCalculo as e:  # o job ainda não gravou o resultado: consultar /contabil/jobs/{job_id}
+        raise HTTPException(status_code=409, detail=str(e))
+    return conciliacao.get(categoria, []), versao
+
+
+@router.get("/execucoes/{execucao_id}/{categoria}")
+def listar_resultados(
+    execucao_id: int,
+    categoria: str,
+    cursor: Optional[str] = None,
+    limite: int = LIMITE_PADRAO,
+    status: Optional[str] = None,
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Página de conciliados / somente_extrato / somente_contabilidade; segue proximo_cursor."""
+    from services.reconciliacao_contabil_service import filtro_contabil
+
+    itens, versao = _lista_execucao(db, execucao_id, categoria)
+    chave = ("conciliacao", execucao_id, versao, categoria, status, data_inicio, data_fim)
+    try:
+        return RespostaJSON(paginar(itens, cursor, limite, filtro_contabil(status, data_inicio, data_fim),
+                                    chave_total=chave))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+@router.get("/execucoes/{execucao_id}/{categoria}/ndjson")
+def exportar_resultados_ndjson(
+    execucao_id: int,
+    categoria: str,
+    status: Optional[str] = None,
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """A lista completa (com os mesmos filtros) em NDJSON, enviada em streaming."""
+    from services.reconciliacao_contabil_service import filtro_contabil
+
+    itens, _ = _lista_execucao(db, execucao_id, categoria)
+    return StreamingResponse(
+        linhas_ndjson(itens, filtro_contabil(status, data_inicio, data_fim)),
+        media_type="application/x-ndjson",
+    )
@@ -1,10 +1,16 @@
+from typing import Optional, Tuple
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from services.reconciliacao_fiscal_service import processar_ficheiros, reconciliar_fiscal
+from fastapi.responses import StreamingResponse
 from utils.db import get_db
+from utils.paginacao import LIMITE_PADRAO, paginar, linhas_ndjson
+from utils.resultados import carregar_resultado
+from utils.json_rapido import RespostaJSON
 from sqlalchemy.orm import Session
 import os
 
-router = APIRouter(prefix="/fiscal", tags=["Reconciliação Fiscal"])
+router = APIRouter(prefix="/fiscal", tags=["Reconciliação Fiscal"], default_response_class=RespostaJSON)
+
+# O serviço fiscal (pandas/numpy) é importado no primeiro pedido ou no aquecimento, não no arranque
 
 @router.post("/upload")
 async def upload_ficheiros(
@@ -12,11 +18,15 @@ async def upload_ficheiros(
     retencao: UploadFile = File(...),
     db: Session = Depends(get_db),
 ):
+    from services.reconciliacao_fiscal_service import processar_ficheiros
+
     try:
         # Substituir por empresa do token futuramente
         empresa_id = 1
         resultado = await processar_ficheiros(fornecedores, retencao, db, empresa_id)
         return {"msg": "Ficheiros processados com sucesso", "dados": resultado}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro no processamento: {str(e)}")
 
@@ -25,9 +35,14 @@ async def upload_ficheiros(
 def reconciliar(
     empresa_id: int = 1,  # Simulado, depois virá do token
     periodo: str = "2025-01",  # Futuramente dinâmico
+    # None usa os valores por omissão do serviço (FISCAL_TOLERANCIA_VALOR, FISCAL_TOLERANCIA_IVA, FISCAL_LIMIAR_DOCUMENTO)
+    tolerancia_valor: Optional[float] = None,
+    tolerancia_iva: Optional[float] = None,
+    limiar_documento: Optional[float] = None,
     db: Session = Depends(get_db),
 ):
     from models.user_model import ReconciliacaoFiscal
+    from services.reconciliacao_fiscal_service import reconciliar_e_guardar
 
     reconciliacao = (
         db.query(ReconciliacaoFiscal)
@@ -46,7 +61,61 @@ def reconciliar(
         raise HTTPException(status_code=400, detail="Caminhos dos ficheiros inválidos")
 
     try:
-        resultado = reconciliar_fiscal(path_agt, path_fornecedores)
-        return {"msg": "Reconciliação concluída", "dados": resultado}
+        parametros = {
+            "tolerancia_valor": tolerancia_valor,
+            "tolerancia_iva": tolerancia_iva,
+            "limiar_documento": limiar_documento,
+        }
+        resultado = reconciliar_e_guardar(
+            reconciliacao.id, path_agt, path_fornecedores,
+            **{nome: valor for nome, valor in parametros.items() if valor is not None},
+        )
+        return RespostaJSON({"msg": "Reconciliação concluída", "dados": resultado})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao reconciliar: {str(e)}")
+
+
+def _lista_reconciliacao(reconciliacao_id: int, categoria: str) -> Tuple[list, str]:
+    from services.reconciliacao_fiscal_service import CATEGORIAS_FISCAL
+
+    if categoria not in CATEGORIAS_FISCAL:
+        raise HTTPException(status_code=404, detail="Categoria desconhecida")
+    guardado = carregar_resultado(reconciliacao_id, tipo="fiscal")
+    if guardado is None:
+        raise HTTPException(status_code=404, detail="Resultado da reconciliação não encontrado")
+    resultado, versao = guardado
+    return resultado.get(categoria, []), versao
+
+
+@router.get("/reconciliacoes/{reconciliacao_id}/{categoria}")
+def listar_resultados(
+    reconciliacao_id: int,
+    categoria: str,
+    cursor: Optional[str] = None,
+    limite: int = LIMITE_PADRAO,
+    nif: Optional[str] = None,
+    documento: Optional[str] = None,
+):
+    """Página de uma categoria do resultado fiscal; segue proximo_cursor."""
+    from services.reconciliacao_fiscal_service import filtro_fiscal
+
+    itens, versao = _lista_reconciliacao(reconciliacao_id, categoria)
+    chave = ("fiscal", reconciliacao_id, versao, categoria, nif, documento)
+    try:
+        return RespostaJSON(paginar(itens, cursor, limite, filtro_fiscal(nif, documento), chave_total=chave))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+@router.get("/reconciliacoes/{reconciliacao_id}/{categoria}/ndjson")
+def exportar_resultados_ndjson(
+    reconciliacao_id: int,
+    categoria: str,
+    nif: Optional[str] = None,
+    documento: Optional[str] = None,
+):
+    """A categoria completa (com os mesmos filtros) em NDJSON, enviada em streaming."""
+    from services.reconciliacao_fiscal_service import filtro_fiscal
+
+    itens, _ = _lista_reconciliacao(reconciliacao_id, categoria)
+    return StreamingResponse(linhas_ndjson(itens, filtro_fiscal(nif, documento)), media_type="application/x-ndjson")
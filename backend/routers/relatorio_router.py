@@ -1,36 +1,53 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-import os
-from datetime import datetime
 from utils.db import get_db
-from utils.relatorios import gerar_pdf_conciliacao, gerar_excel_conciliacao
+from utils.json_rapido import RespostaJSON
+from utils.resultados import ResultadoEmCalculo
 from models.user_model import ExecucaoReconciliacao
 
-router = APIRouter(prefix="/relatorios", tags=["Relatórios"])
+router = APIRouter(prefix="/relatorios", tags=["Relatórios"], default_response_class=RespostaJSON)
+
+def _relatorio(db: Session, execucao_id: int, formato: str) -> str:
+    from utils.relatorios import obter_relatorio  # reportlab/openpyxl só no primeiro relatório (ou no aquecimento)
+
+    if db.query(ExecucaoReconciliacao.id).filter_by(id=execucao_id).first() is None:
+        raise HTTPException(status_code=404, detail="Execução não encontrada")
+    try:
+        return obter_relatorio(db, execucao_id, formato)
+    except ResultadoEmCalculo as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 @router.get("/{execucao_id}/pdf")
-def download_pdf(execucao_id: int):
-    caminho = f"uploads/relatorios/relatorio_{execucao_id}.pdf"
-    if not os.path.exists(caminho):
-        raise HTTPException(status_code=404, detail="Relatório PDF não encontrado")
+def download_pdf(execucao_id: int, db: Session = Depends(get_db)):
+    caminho = _relatorio(db, execucao_id, "pdf")
     return FileResponse(caminho, media_type="application/pdf", filename=f"relatorio_{execucao_id}.pdf")
 
 @router.get("/{execucao_id}/excel")
-def download_excel(execucao_id: int):
-    caminho = f"uploads/relatorios/relatorio_{execucao_id}.xlsx"
-    if not os.path.exists(caminho):
-        raise HTTPException(status_code=404, detail="Relatório Excel não encontrado")
+def download_excel(execucao_id: int, db: Session = Depends(get_db)):
+    caminho = _relatorio(db, execucao_id, "excel")
     return FileResponse(caminho, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", filename=f"relatorio_{execucao_id}.xlsx")
 
 @router.get("/execucoes")
 def listar_execucoes(db: Session = Depends(get_db)):
     execucoes = db.query(ExecucaoReconciliacao).all()
-    return [
+    return RespostaJSON([
         {
             "id": e.id,
             "empresa_id": e.empresa_id,
             "criado_em": e.criado_em,
+            "duracoes": {
+                "upload": e.duracao_upload,
+                "extracao": e.duracao_extracao,
+                "persistencia": e.duracao_persistencia,
+                "conciliacao": e.duracao_conciliacao,
+                "relatorio": e.duracao_relatorio,
+            },
+            "linhas": {
+                "extrato": e.linhas_extrato,
+                "contabilidade": e.linhas_contabilidade,
+                "conciliadas": e.linhas_conciliadas,
+            },
         }
         for e in execucoes
-    ]
+    ])
@@ -1,8 +1,10 @@
+import copy
 import json
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 import base64
 import os
-import requests
+import threading
+import time
 from fastapi import HTTPException
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import padding
@@ -14,22 +16,88 @@ LICENCAS_DIR = os.path.join(BASE_DIR, "../licencas")
 ULTIMA_DATA_PATH = os.path.join(LICENCAS_DIR, "ultima_execucao.json")
 PUBLIC_KEY_PATH = os.path.join(BASE_DIR, "../public_key.pem")
 
+# Intervalo de atualização da data confiável (e de nova tentativa quando falha)
+INTERVALO_TEMPO_S = int(os.getenv("LICENCA_INTERVALO_TEMPO_S", "3600"))
+INTERVALO_TEMPO_FALHA_S = int(os.getenv("LICENCA_INTERVALO_TEMPO_FALHA_S", "60"))
+
+_lock = threading.Lock()
+_chave_publica = None  # (mtime_ns, chave)
+_licenca_validada = {}  # (caminho, mtime_ns, tamanho, origem da chave) -> (licença, None) ou (None, (status, detalhe))
+
+# Última data externa obtida pelo atualizador em segundo plano, com o instante (monotónico) em que chegou
+_tempo_confiavel = None  # (datetime, monotonic)
+_atualizador = None
+
 
 def carregar_chave_publica():
+    """Chave pública já interpretada; só volta a ler o ficheiro se o mtime mudar."""
+    global _chave_publica
+    mtime = os.stat(PUBLIC_KEY_PATH).st_mtime_ns
+    with _lock:
+        if _chave_publica is not None and _chave_publica[0] == mtime:
+            return _chave_publica[1]
     with open(PUBLIC_KEY_PATH, "rb") as f:
-        return serialization.load_pem_public_key(f.read())
+        chave = serialization.load_pem_public_key(f.read())
+    with _lock:
+        _chave_publica = (mtime, chave)
+    return chave
 
 
-def obter_data_atual_confiavel():
+def obter_tempo_externo():
+    import requests  # só na thread de atualização (não atrasa o arranque)
+
     try:
         res = requests.get("http://worldtimeapi.org/api/ip", timeout=(1, 2))
         if res.status_code == 200:
             data_str = res.json()["datetime"]
             print(f"[INFO] Data confiável recebida: {data_str}")
-            return datetime.fromisoformat(data_str).date()
+            return datetime.fromisoformat(data_str)
     except Exception as e:
         print(f"[INFO] Não foi possível obter data externa: {e}")
+    return None
+
+
+def atualizar_tempo_confiavel() -> bool:
+    """Uma tentativa de obter a data externa; guarda-a em memória e como última data local."""
+    global _tempo_confiavel
+    agora = obter_tempo_externo()
+    if agora is None:
+        return False
+    with _lock:
+        _tempo_confiavel = (agora, time.monotonic())
+    salvar_data_local(agora.date())
+    return True
+
+
+def _ciclo_atualizacao():
+    while True:
+        ok = atualizar_tempo_confiavel()
+        time.sleep(INTERVALO_TEMPO_S if ok else INTERVALO_TEMPO_FALHA_S)
+
+
+def iniciar_atualizador_tempo() -> None:
+    """Arranca (uma vez) a thread que mantém a data confiável atualizada."""
+    global _atualizador
+    with _lock:
+        if _atualizador is not None and _atualizador.is_alive():
+            return
+        _atualizador = threading.Thread(target=_ciclo_atualizacao, name="licenca-tempo", daemon=True)
+        _atualizador.start()
+
+
+def data_confiavel_em_cache():
+    """
+    Data confiável sem rede: a última data externa mais o tempo decorrido desde que chegou.
+    None enquanto o atualizador ainda não obteve nenhuma (logo após o arranque ou offline):
+    quem chama usa então a última data local. Nunca espera pela rede.
+    """
+    iniciar_atualizador_tempo()
+    with _lock:
+        tempo = _tempo_confiavel
+    if tempo is None:
         return None
+    recebido, instante = tempo
+    return (recebido + timedelta(seconds=time.monotonic() - instante)).date()
 
 
 def verificar_data_local():
@@ -58,7 +126,8 @@ def salvar_data_local(data: date):
         json.dump({"data": data.isoformat()}, f)
 
 
-def validar_licenca(path: str, public_key_pem: str):
+def _verificar_ficheiro(path: str, public_key_pem: str = None):
+    """Lê a licença e verifica a assinatura RSA e a máquina (a parte que não depende da data)."""
     try:
         with open(path, "r") as f:
             lic = json.load(f)
@@ -73,22 +142,14 @@ def validar_licenca(path: str, public_key_pem: str):
         data_bytes = json.dumps(dados_base, separators=(",", ":")).encode()
         assinatura = base64.b64decode(lic["assinatura"])
 
-        public_key = serialization.load_pem_public_key(public_key_pem.encode())
+        if public_key_pem is not None:
+            public_key = serialization.load_pem_public_key(public_key_pem.encode())
+        else:
+            public_key = carregar_chave_publica()
         public_key.verify(
             assinatura, data_bytes, padding.PKCS1v15(), hashes.SHA256()
         )
-
-        validade = date.fromisoformat(lic["validade"])
-        data_confiavel = obter_data_atual_confiavel()
-
-        if data_confiavel:
-            if validade < data_confiavel:
-                raise HTTPException(status_code=403, detail="Licença expirada (data externa confiável)")
-            salvar_data_local(data_confiavel)
-        else:
-            verificar_data_local()
-            if validade < date.today():
-                raise HTTPException(status_code=403, detail="Licença expirada (data local)")
+        date.fromisoformat(lic["validade"])
 
         if lic["machine_id"] != get_machine_id():
             raise HTTPException(status_code=403, detail="Licença não corresponde a esta máquina")
@@ -101,3 +162,39 @@ def validar_licenca(path: str, public_key_pem: str):
         raise HTTPException(status_code=403, detail="Assinatura da licença inválida")
     except Exception as e:
         raise HTTPException(status_code=403, detail=f"Licença inválida: {str(e)}")
+
+
+def validar_licenca(path: str, public_key_pem: str = None):
+    """
+    Valida assinatura, máquina e validade. O resultado da verificação do ficheiro fica em
+    memória até o ficheiro (ou a chave pública) mudar; a data vem do atualizador em segundo plano.
+    """
+    st = os.stat(path)
+    origem_chave = public_key_pem if public_key_pem is not None else os.stat(PUBLIC_KEY_PATH).st_mtime_ns
+    chave = (os.path.abspath(path), st.st_mtime_ns, st.st_size, origem_chave)
+    with _lock:
+        resultado = _licenca_validada.get(chave)
+    if resultado is None:
+        try:
+            resultado = (_verificar_ficheiro(path, public_key_pem), None)
+        except HTTPException as e:
+            # guarda só status e detalhe: voltar a lançar a mesma exceção acumularia o traceback
+            resultado = (None, (e.status_code, e.detail))
+        with _lock:
+            _licenca_validada.clear()  # só interessa a versão atual do ficheiro
+            _licenca_validada[chave] = resultado
+    lic, erro = resultado
+    if erro is not None:
+        raise HTTPException(status_code=erro[0], detail=erro[1])
+    lic = copy.deepcopy(lic)  # quem chama pode alterar a licença sem mexer no cache
+
+    validade = date.fromisoformat(lic["validade"])
+    data_confiavel = data_confiavel_em_cache()
+    if data_confiavel:
+        if validade < data_confiavel:
+            raise HTTPException(status_code=403, detail="Licença expirada (data externa confiável)")
+    else:
+        verificar_data_local()
+        if validade < date.today():
+            raise HTTPException(status_code=403, detail="Licença expirada (data local)")
+    return lic
@@ -1,146 +1,257 @@
-import os
-import shutil
+import logging
+import uuid
+from contextlib import ExitStack
+from typing import Optional
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
 from utils.extratores import  extrair_dados_bai 
-from utils.extratores import extrair_dados_contabilidade
+from utils.extratores import extrair_dados_contabilidade, normalizar_data, normalizar_valor
 import pandas as pd
-from difflib import SequenceMatcher
 from models.user_model import MovimentacaoBAI, MovimentacaoContabilidade
-from datetime import datetime
 from models.user_model import ExecucaoReconciliacao
-from utils.relatorios import gerar_pdf_conciliacao, gerar_excel_conciliacao
+from utils.resultados import calculo_resultado, guardar_resultado
 from utils.conciliacao import conciliar_movimentos_db
+from utils.db import SessionLocal, inserir_em_lotes
+from utils.jobs import Job
+from utils.uploads import gravar_upload, remover_uploads
+from utils import cache_extracao
+from utils.metricas import cronometro, contar_linhas
 
-async def salvar_arquivo(upload: UploadFile, destino: str):
-    os.makedirs(os.path.dirname(destino), exist_ok=True)
-    with open(destino, "wb") as f:
-        shutil.copyfileobj(upload.file, f)
-    return destino
+logger = logging.getLogger(__name__)
 
+PALAVRAS_IGNORADAS = {"SALDO INICIAL", "SALDO FINAL", "TRANSPORTE", "A TRANSPORTAR"}
 
-async def processar_contabil(
-    banco: str,
-    modelo: str,
+
+def _extrair_extrato_bai(extrato_path: str, progresso=None) -> pd.DataFrame:
+    dados_extrato = extrair_dados_bai(extrato_path, progresso=progresso)
+
+    def linha_valida_df(row) -> bool:
+        valores = " ".join(str(v).upper() for v in row if v is not None)
+        return not any(p in valores for p in PALAVRAS_IGNORADAS)
+    if dados_extrato.empty:
+        return dados_extrato
+    return dados_extrato[dados_extrato.apply(linha_valida_df, axis=1)]
+
+
+async def guardar_ficheiros_contabeis(
     extrato_file: UploadFile,
     contabilidade_file: UploadFile,
-    db: Session,
     empresa_id: int
+) -> dict:
+    """Grava os dois uploads (nomes únicos, para jobs em simultâneo) e devolve caminhos, hashes e duração."""
+    prefixo = f"uploads/contabil/{empresa_id}_{uuid.uuid4().hex}"
+    extrato_path = f"{prefixo}_extrato.{extrato_file.filename.split('.')[-1]}"
+    contab_path = f"{prefixo}_contabilidade.{contabilidade_file.filename.split('.')[-1]}"
+
+    duracoes = {}
+    try:
+        with cronometro("upload", duracoes):
+            hash_extrato = await gravar_upload(extrato_file, extrato_path)
+            hash_contab = await gravar_upload(contabilidade_file, contab_path)
+    except BaseException:
+        remover_uploads(extrato_path, contab_path)
+        raise
+    return {
+        "extrato_path": extrato_path,
+        "hash_extrato": hash_extrato,
+        "contab_path": contab_path,
+        "hash_contab": hash_contab,
+        "duracao_upload": duracoes["upload"],
+    }
+
+
+def processar_contabil(
+    job: Optional[Job],
+    banco: str,
+    modelo: str,
+    extrato_path: str,
+    hash_extrato: str,
+    contab_path: str,
+    hash_contab: str,
+    empresa_id: int,
+    duracao_upload: Optional[float] = None
 ):
+    """
+    Processamento completo de um upload contabilístico (extração, persistência e conciliação).
+    Corre fora do event loop, num job; usa a sua própria sessão de BD.
+    A duração de cada etapa e as linhas processadas ficam gravadas na execução.
+    Os ficheiros de upload são apagados no fim, com ou sem erro: uma nova extração
+    do mesmo conteúdo vem do cache_extracao (chave = hash), não dos ficheiros.
+    """
+    def etapa(nome: str, progresso: float):
+        logger.info("[%s] %.0f%%", nome, progresso * 100)
+        if job is not None:
+            job.atualizar(etapa=nome, progresso=progresso)
+
+    duracoes = {}
+    db = SessionLocal()
+    # da criação da execução até gravar o resultado, os pedidos dessa execução recebem 409 em vez de recalcular
+    calculo = ExitStack()
     try:
-        extrato_path = f"uploads/contabil/{empresa_id}_extrato.{extrato_file.filename.split('.')[-1]}"
-        contab_path = f"uploads/contabil/{empresa_id}_contabilidade.{contabilidade_file.filename.split('.')[-1]}"
-
-        await salvar_arquivo(extrato_file, extrato_path)
-        await salvar_arquivo(contabilidade_file, contab_path)
-        print("salvou e não extraiu")
-
-        # Extrair dados
-        if banco == "bfa":
-            dados_extrato = None
-        elif banco == "bai":
-            dados_extrato = extrair_dados_bai(extrato_path)
-        else:
-            raise ValueError("Banco não suportado")
-
-        print("extraiu extrato")
-
-        if dados_extrato is not None:
-            palavras_ignoradas = {"SALDO INICIAL", "SALDO FINAL", "TRANSPORTE", "A TRANSPORTAR"}
-            def linha_valida_df(row) -> bool:
-                valores = " ".join(str(v).upper() for v in row if v is not None)
-                return not any(p in valores for p in palavras_ignoradas)
-            dados_extrato = dados_extrato[dados_extrato.apply(linha_valida_df, axis=1)]
-
-        dados_contabilidade = extrair_dados_contabilidade(contab_path)
-        print("extraiu contabilidade")
-
-        # Criar execução
-        execucao = ExecucaoReconciliacao(empresa_id=empresa_id)
-        db.add(execucao)
-        db.commit()
-        db.refresh(execucao)
+        # Extrair dados (re-uploads do mesmo ficheiro vêm do cache de extração)
+        with cronometro("extracao", duracoes):
+            etapa("extracao_extrato", 0.05)
+            if banco == "bfa":
+                dados_extrato = None
+            elif banco == "bai":
+                def progresso_paginas(feitas: int, total: int):
+                    etapa("extracao_extrato", 0.05 + 0.35 * feitas / max(1, total))
+                dados_extrato = cache_extracao.obter_ou_extrair(
+                    hash_extrato, "bai", lambda: _extrair_extrato_bai(extrato_path, progresso_paginas))
+            else:
+                raise ValueError("Banco não suportado")
 
-        # Salvar movimentos
-        salvar_movimentacoes_extrato(db, dados_extrato, empresa_id, execucao.id)
-        salvar_movimentacoes_contabilidade(db, dados_contabilidade, empresa_id, execucao.id)
+            etapa("extracao_contabilidade", 0.4)
+            dados_contabilidade = cache_extracao.obter_ou_extrair(
+                hash_contab, "contabilidade", lambda: extrair_dados_contabilidade(contab_path))
+        paginas_com_erro = list(dados_extrato.attrs.get("paginas_com_erro", [])) if dados_extrato is not None else []
+        if paginas_com_erro:
+            logger.warning("⚠ Extrato com páginas não lidas %s: os seus movimentos ficam de fora", paginas_com_erro)
+        linhas_extrato = len(dados_extrato) if dados_extrato is not None else 0
+        linhas_contabilidade = len(dados_contabilidade) if dados_contabilidade is not None else 0
+        contar_linhas("extracao_extrato", linhas_extrato)
+        contar_linhas("extracao_contabilidade", linhas_contabilidade)
 
-        # JSON serializável
-        extrato_json = dados_extrato.fillna("").to_dict(orient="records") if dados_extrato is not None else []
-        contabilidade_json = dados_contabilidade.fillna("").to_dict(orient="records") if dados_contabilidade is not None else []
+        # Criar execução e salvar movimentos numa única transação
+        etapa("persistencia", 0.5)
+        with cronometro("persistencia", duracoes):
+            try:
+                execucao = ExecucaoReconciliacao(
+                    empresa_id=empresa_id,
+                    duracao_upload=duracao_upload,
+                    duracao_extracao=duracoes["extracao"],
+                    linhas_extrato=linhas_extrato,
+                    linhas_contabilidade=linhas_contabilidade,
+                )
+                db.add(execucao)
+                db.flush()
+                calculo.enter_context(calculo_resultado(execucao.id))
+                if dados_extrato is not None:
+                    salvar_movimentacoes_extrato(db, dados_extrato, empresa_id, execucao.id)
+                salvar_movimentacoes_contabilidade(db, dados_contabilidade, empresa_id, execucao.id)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        contar_linhas("persistencia", linhas_extrato + linhas_contabilidade)
 
-        conciliacao = conciliar_movimentos_db(db, execucao.id)
+        etapa("conciliacao", 0.7)
+        with cronometro("conciliacao", duracoes):
+            conciliacao = conciliar_movimentos_db(db, execucao.id)
+            # Listas ficam guardadas e são lidas por página (/contabil/execucoes/{id}/...) e pelos relatórios
+            guardar_resultado(execucao.id, conciliacao)
+            calculo.close()
+        contar_linhas("conciliacao", len(conciliacao.get("conciliados", [])))
+
+        execucao.duracao_persistencia = duracoes["persistencia"]
+        execucao.duracao_conciliacao = duracoes["conciliacao"]
+        execucao.linhas_conciliadas = len(conciliacao.get("conciliados", []))
+        db.commit()
 
         summary = {
-            "total_extrato": len(extrato_json),
-            "total_contabilidade": len(contabilidade_json),
+            "total_extrato": linhas_extrato,
+            "total_contabilidade": linhas_contabilidade,
             "conciliados": len(conciliacao.get("conciliados", [])),
             "somente_extrato": len(conciliacao.get("somente_extrato", [])),
             "somente_contabilidade": len(conciliacao.get("somente_contabilidade", [])),
+            # páginas do PDF que não foram lidas: o resultado está incompleto
+            "paginas_com_erro": paginas_com_erro,
         }
 
         resultado = {
-            "extrato": extrato_json,
-            "contabilidade": contabilidade_json,
-            "conciliacao": conciliacao,
+            "execucao_id": execucao.id,
             "summary": summary
         }
 
-        # 🔹 Geração automática dos relatórios
-        pasta = "uploads/relatorios"
-        os.makedirs(pasta, exist_ok=True)
-        caminho_pdf = os.path.join(pasta, f"relatorio_{execucao.id}.pdf")
-        caminho_excel = os.path.join(pasta, f"relatorio_{execucao.id}.xlsx")
+        return resultado
+    finally:
+        calculo.close()
+        db.close()
+        remover_uploads(extrato_path, contab_path)
 
-        gerar_pdf_conciliacao(db, execucao.id, caminho_pdf)
-        gerar_excel_conciliacao(db, execucao.id, caminho_excel)
 
-        return resultado
+def _coluna(df: pd.DataFrame, *nomes):
+    """Primeira coluna existente entre `nomes` (ou uma coluna vazia), com NaN -> None."""
+    for nome in nomes:
+        if nome in df.columns:
+            return df[nome].astype(object).where(df[nome].notna(), None)
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def _mapear_unicos(serie: pd.Series, func) -> pd.Series:
+    """Aplica func uma vez por valor distinto (datas e valores repetem-se muito)."""
+    codigos, unicos = pd.factorize(serie)
+    convertidos = [func(v) for v in unicos] + [func(None)]  # código -1 = nulo
+    return pd.Series([convertidos[c] for c in codigos], index=serie.index, dtype=object)
+
+
+def _coluna_data(df: pd.DataFrame, *nomes):
+    return _mapear_unicos(_coluna(df, *nomes), normalizar_data)
+
+
+def _coluna_valor(df: pd.DataFrame, *nomes):
+    return _mapear_unicos(_coluna(df, *nomes), normalizar_valor)
 
-    except Exception as e:
-        import traceback
-        print("Erro em processar_contabil:", e)
-        traceback.print_exc()
+
+def _registros_movimentos(colunas: dict) -> list:
+    df = pd.DataFrame(colunas)
+    df["valor"] = df["credito"] - df["debito"]
+    return df.to_dict(orient="records")
 
 
 def salvar_movimentacoes_extrato(db: Session, df: pd.DataFrame, empresa_id: int, execucao_id: int):
-    """Salva no banco os movimentos do extrato ligados a uma execução específica."""
-    for _, row in df.iterrows():
-        mov = MovimentacaoBAI(
-            empresa_id=empresa_id,
-            execucao_id=execucao_id,
-            data_mov=row.get("data mov.") or row.get("data_mov"),
-            data_valor=row.get("data valor") or row.get("data_valor"),
-            descritivo=row.get("descritivo"),
-            debito=_parse_float(row.get("débito") or row.get("debito")),
-            credito=_parse_float(row.get("crédito") or row.get("credito")),
-            saldo=_parse_float(row.get("movimento") or row.get("saldo_disponivel")),
-        )
-        db.add(mov)
-    db.commit()
+    """Insere em massa os movimentos do extrato ligados a uma execução (sem commit)."""
+    registros = _registros_movimentos({
+        "empresa_id": empresa_id,
+        "execucao_id": execucao_id,
+        "data_mov": _coluna_data(df, "data mov.", "data_mov"),
+        "data_valor": _coluna_data(df, "data valor", "data_valor"),
+        "descritivo": _coluna(df, "descritivo"),
+        "debito": _coluna_valor(df, "débito", "debito"),
+        "credito": _coluna_valor(df, "crédito", "credito"),
+        "saldo": _coluna_valor(df, "movimento", "saldo_disponivel"),
+    })
+    return inserir_em_lotes(db, MovimentacaoBAI, registros)
 
 def salvar_movimentacoes_contabilidade(db: Session, df: pd.DataFrame, empresa_id: int, execucao_id: int):
-    """Salva no banco os movimentos da contabilidade ligados a uma execução específica."""
-    for _, row in df.iterrows():
-        mov = MovimentacaoContabilidade(
-            empresa_id=empresa_id,
-            execucao_id=execucao_id,
-            data_mov=row.get("data_movimento"),
-            data_valor=row.get("data_valor"),
-            numero_operacao=str(row.get("numero_operacao")),
-            descritivo=row.get("descritivo"),
-            debito=_parse_float(row.get("debito")),
-            credito=_parse_float(row.get("credito")),
-            saldo=_parse_float(row.get("saldo_disponivel")),
-        )
-        db.add(mov)
-    db.commit()
-
-def _parse_float(value):
-    """Converte valores em float de forma segura."""
-    if value in (None, "", "NaN"):
-        return 0.0
-    try:
-        return float(str(value).replace(",", ".").replace(" ", ""))
-    except:
-        return 0.0
+    """Insere em massa os movimentos da contabilidade ligados a uma execução (sem commit)."""
+    registros = _registros_movimentos({
+        "empresa_id": empresa_id,
+        "execucao_id": execucao_id,
+        "data_mov": _coluna_data(df, "data_movimento"),
+        "data_valor": _coluna_data(df, "data_valor"),
+        "numero_operacao": _coluna(df, "numero_operacao").map(str),
+        "descritivo": _coluna(df, "descritivo"),
+        "debito": _coluna_valor(df, "debito"),
+        "credito": _coluna_valor(df, "credito"),
+        "saldo": _coluna_valor(df, "saldo_disponivel"),
+    })
+    return inserir_em_lotes(db, MovimentacaoContabilidade, registros)
+
+
+CATEGORIAS_CONTABIL = ("conciliados", "somente_extrato", "somente_contabilidade")
+
+
+def filtro_contabil(status: Optional[str] = None, data_inicio: Optional[str] = None,
+                    data_fim: Optional[str] = None):
+    """
+    Filtro para as listas guardadas: status (só itens conciliados têm status) e intervalo
+    de data_mov em ISO (AAAA-MM-DD, comparável como texto). None se não houver critérios.
+    """
+    if not (status or data_inicio or data_fim):
+        return None
+
+    def filtro(item) -> bool:
+        if status and item.get("status") != status:
+            return False
+        if data_inicio or data_fim:
+            data = item.get("data_mov") or item.get("extrato_data_mov") or item.get("contab_data_mov")
+            if not data:
+                return False
+            if data_inicio and data < data_inicio:
+                return False
+            if data_fim and data > data_fim:
+                return False
+        return True
+
+    return filtro
@@ -1,12 +1,23 @@
+import logging
 import os
+import sys
 import uuid
+from functools import lru_cache
+from typing import Optional
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
 from models.user_model import ReconciliacaoFiscal
-import shutil
+import numpy as np
 import pandas as pd
-from fastapi.encoders import jsonable_encoder
 import unicodedata
+from difflib import SequenceMatcher
+from utils.cache import escopo_execucao, memoizar, par_nao_ordenado
+from utils.uploads import gravar_upload
+from utils import cache_ficheiros
+from utils.resultados import guardar_resultado
+from utils.json_rapido import registos
+
+logger = logging.getLogger(__name__)
 
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "../uploads/fiscal")
 
@@ -15,9 +26,7 @@ async def salvar_ficheiro(ficheiro: UploadFile, tipo: str) -> str:
     filename = f"{tipo}_{uuid.uuid4().hex}_{ficheiro.filename}"
     full_path = os.path.join(UPLOAD_DIR, filename)
 
-    with open(full_path, "wb") as f:
-        content = await ficheiro.read()
-        f.write(content)
+    await gravar_upload(ficheiro, full_path)
 
     # Caminho relativo com barras normalizadas
     relative_path = os.path.relpath(full_path, start=os.getcwd()).replace("\\", "/")
@@ -53,122 +62,343 @@ async def processar_ficheiros(
         "criado_em": nova_reconciliacao.criado_em,
     }
 
-def limpar_nome(nome):
-    if pd.isna(nome):
-        return ""
-    nome = str(nome).upper().strip()
-    nome = unicodedata.normalize('NFKD', nome)
-    nome = ''.join([c for c in nome if not unicodedata.combining(c)])
-    nome = nome.replace("-", " ").replace(",", "").replace(".", "")
-    nome = " ".join(nome.split())  # remove espaços duplicados
-    return nome
+@lru_cache(maxsize=1)
+def _tabela_sem_combinantes() -> dict:
+    """Tabela de str.translate que remove todos os caracteres combinantes (acentos após NFKD)."""
+    return {cp: None for cp in range(sys.maxunicode + 1) if unicodedata.combining(chr(cp))}
+
+
+def limpar_nomes(nomes: pd.Series) -> pd.Series:
+    """
+    Nome em maiúsculas, sem acentos, hífenes, vírgulas, pontos nem espaços repetidos ("" para
+    nulos). Cada nome distinto é normalizado uma vez (métodos .str do pandas) e o resultado é
+    reposto em todas as linhas.
+    """
+    codigos, unicos = pd.factorize(nomes)  # nulos ficam com código -1
+    u = pd.Series(unicos, dtype=object).astype(str)
+    u = u.str.upper().str.strip().str.normalize("NFKD").str.translate(_tabela_sem_combinantes())
+    u = u.str.replace("-", " ", regex=False).str.replace(",", "", regex=False).str.replace(".", "", regex=False)
+    u = u.str.split().str.join(" ")  # remove espaços duplicados
+    limpos = np.append(u.to_numpy(dtype=object), "")
+    return pd.Series(limpos[codigos], index=nomes.index, dtype=str)
+
+
+CHAVES_DOCUMENTO = ["nif", "numero_documento", "valor_documento"]
+
+
+def _codigos_chave(agt_df: pd.DataFrame, cont_df: pd.DataFrame, colunas):
+    """
+    Códigos inteiros comuns aos dois mapas para a chave composta `colunas`
+    (NaN tem código próprio e casa com NaN, como no pd.merge).
+    """
+    n = len(agt_df)
+    codigos = np.zeros(n + len(cont_df), dtype=np.int64)
+    for col in colunas:
+        valores = pd.concat([agt_df[col], cont_df[col]], ignore_index=True)
+        cod_col, unicos = pd.factorize(valores, use_na_sentinel=False)
+        codigos, _ = pd.factorize(codigos * len(unicos) + cod_col)
+    return codigos[:n], codigos[n:]
+
+
+def _juntar_linhas(esq: pd.DataFrame, dir_: pd.DataFrame, ie, idir, chaves, sufixos) -> pd.DataFrame:
+    """
+    Monta as linhas esq[ie] + dir_[idir] com as mesmas colunas que pd.merge(on=chaves, suffixes=sufixos).
+    idir=None dá as colunas da direita vazias (linhas 'left_only').
+    """
+    sobrepostas = (set(esq.columns) & set(dir_.columns)) - set(chaves)
+    e = esq.take(ie).reset_index(drop=True)
+    e = e.rename(columns={c: f"{c}{sufixos[0]}" for c in sobrepostas})
+    d = dir_.drop(columns=chaves)
+    if idir is None:
+        d = d.iloc[:0].reindex(range(len(e)))
+    else:
+        d = d.take(idir).reset_index(drop=True)
+    d = d.rename(columns={c: f"{c}{sufixos[1]}" for c in sobrepostas})
+    return pd.concat([e, d], axis=1)
+
+
+# 2.ª passagem (aproximada) sobre as sobras, só entre documentos do mesmo NIF.
+# Tolerâncias ao cêntimo por omissão: diferenças maiores no IVA continuam divergentes
+TOLERANCIA_VALOR = float(os.getenv("FISCAL_TOLERANCIA_VALOR", "0.01"))
+TOLERANCIA_IVA = float(os.getenv("FISCAL_TOLERANCIA_IVA", "0.01"))
+LIMIAR_DOCUMENTO = float(os.getenv("FISCAL_LIMIAR_DOCUMENTO", "0.9"))
+NIFS_INVALIDOS = {"", "NAN", "NONE", "NAT"}
+
+
+def normalizar_documentos(documentos: pd.Series) -> pd.Series:
+    """Nº de documento só com letras e dígitos: "FT 2025/12" e "FT2025/12" ficam iguais."""
+    return documentos.astype(str).str.upper().str.replace(r"[^0-9A-Z]", "", regex=True)
+
+
+@memoizar("similaridade_documento", chave=par_nao_ordenado)
+def similaridade_documento(a, b):
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    if b < a:  # ordem canónica: o ratio não é exatamente simétrico
+        a, b = b, a
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def _dentro_tolerancia(a, b, tolerancia: float):
+    return (np.abs(a - b) <= tolerancia + 1e-9) | (pd.isna(a) & pd.isna(b))
+
+
+def _pares_aproximados(agt_df: pd.DataFrame, cont_df: pd.DataFrame, livres_agt, livres_cont,
+                       tolerancia_valor: float, tolerancia_iva: float, limiar_documento: float):
+    """
+    Emparelha sobras AGT/contabilidade com o mesmo NIF (bloqueio), valor e IVA dentro da
+    tolerância e nº de documento normalizado semelhante (>= limiar_documento).
+    Atribuição gulosa 1-para-1 pela melhor similaridade. Devolve (ia, ic, similaridade).
+    """
+    vazio = (np.array([], dtype=np.int64),) * 2 + (np.array([], dtype=float),)
+    nif_a = agt_df["nif"].to_numpy()[livres_agt]
+    nif_c = cont_df["nif"].to_numpy()[livres_cont]
+    nifs = pd.Series(nif_a, dtype=object)
+    validos_a = ~(nifs.isna() | nifs.str.upper().isin(NIFS_INVALIDOS)).to_numpy()
+    candidatos = pd.merge(
+        pd.DataFrame({"nif": nif_a[validos_a], "ia": livres_agt[validos_a]}),
+        pd.DataFrame({"nif": nif_c, "ic": livres_cont}),
+        on="nif", how="inner"
+    )
+    if candidatos.empty:
+        return vazio
+    ia = candidatos["ia"].to_numpy(dtype=np.int64)
+    ic = candidatos["ic"].to_numpy(dtype=np.int64)
+
+    valor_a = agt_df["valor_documento"].to_numpy(dtype=float)
+    valor_c = cont_df["valor_documento"].to_numpy(dtype=float)
+    iva_a = agt_df["iva_dedutivel"].to_numpy(dtype=float)
+    iva_c = cont_df["iva_dedutivel"].to_numpy(dtype=float)
+    ok = (_dentro_tolerancia(valor_a[ia], valor_c[ic], tolerancia_valor)
+          & _dentro_tolerancia(iva_a[ia], iva_c[ic], tolerancia_iva))
+    ia, ic = ia[ok], ic[ok]
+    if len(ia) == 0:
+        return vazio
+
+    doc_a = normalizar_documentos(agt_df["numero_documento"]).to_numpy(dtype=object)
+    doc_c = normalizar_documentos(cont_df["numero_documento"]).to_numpy(dtype=object)
+    with escopo_execucao():
+        sim = np.fromiter((similaridade_documento(doc_a[i], doc_c[j]) for i, j in zip(ia, ic)),
+                          dtype=float, count=len(ia))
+    ok = sim >= limiar_documento
+    ia, ic, sim = ia[ok], ic[ok], sim[ok]
+
+    # Gulosa: maior similaridade, depois menor diferença de valor; empates pela ordem das linhas
+    dif = np.nan_to_num(np.abs(valor_a[ia] - valor_c[ic]))
+    ordem = np.lexsort((ic, ia, dif, -sim))
+    usados_a, usados_c = set(), set()
+    escolhidos = []
+    for k in ordem:
+        i, j = ia[k], ic[k]
+        if i in usados_a or j in usados_c:
+            continue
+        usados_a.add(i)
+        usados_c.add(j)
+        escolhidos.append(k)
+    escolhidos = np.sort(np.array(escolhidos, dtype=np.int64))
+    return ia[escolhidos], ic[escolhidos], sim[escolhidos]
+
+
+def _classificar(agt_df: pd.DataFrame, cont_df: pd.DataFrame, aproximar: bool = True,
+                 tolerancia_valor: float = TOLERANCIA_VALOR, tolerancia_iva: float = TOLERANCIA_IVA,
+                 limiar_documento: float = LIMIAR_DOCUMENTO):
+    """
+    Conciliados, divergentes de IVA, só AGT e só contabilidade a partir de um único
+    merge interno sobre códigos inteiros de nif/nº documento/valor: os pares dão os
+    conciliados e os divergentes, e as linhas sem par com o mesmo IVA ficam nas sobras.
+    Com aproximar=True as sobras passam ainda por _pares_aproximados; os pares
+    encontrados saem de só AGT/só contabilidade para conciliados_aproximados. Os pares
+    da chave exata com IVA diferente só por arredondamento (dentro de tolerancia_iva)
+    entram nessa passagem e deixam de contar como divergentes de IVA.
+    """
+    ka, kc = _codigos_chave(agt_df, cont_df, CHAVES_DOCUMENTO)
+    pares = pd.merge(
+        pd.DataFrame({"k": ka, "ia": np.arange(len(ka))}),
+        pd.DataFrame({"k": kc, "ic": np.arange(len(kc))}),
+        on="k", how="inner"
+    )
+    ia = pares["ia"].to_numpy(dtype=np.int64)
+    ic = pares["ic"].to_numpy(dtype=np.int64)
+    ordem = np.lexsort((ic, ia))  # ordem do merge inner: linha AGT, depois linha contabilidade
+    ia, ic = ia[ordem], ic[ordem]
+
+    iva_agt = agt_df["iva_dedutivel"].to_numpy()[ia]
+    iva_cont = cont_df["iva_dedutivel"].to_numpy()[ic]
+    # Igualdade de chave de merge (NaN casa com NaN) vs. comparação != (NaN difere de tudo)
+    iva_igual = (iva_agt == iva_cont) | (pd.isna(iva_agt) & pd.isna(iva_cont))
+    iva_diferente = ~(iva_agt == iva_cont)
+    # Só arredondamento: sai dos divergentes e é emparelhado pela passagem aproximada
+    arredondamento = iva_diferente & ~iva_igual & aproximar & _dentro_tolerancia(
+        iva_agt.astype(float), iva_cont.astype(float), tolerancia_iva)
+    divergente = iva_diferente & ~arredondamento
+
+    chaves = CHAVES_DOCUMENTO + ["iva_dedutivel"]
+    conciliados = _juntar_linhas(agt_df, cont_df, ia[iva_igual], ic[iva_igual], chaves, ("_x", "_y"))
+    divergentes_iva = _juntar_linhas(
+        agt_df, cont_df, ia[divergente], ic[divergente], CHAVES_DOCUMENTO, ("_agt", "_cont"))
+
+    livres_agt = np.ones(len(agt_df), dtype=bool)
+    livres_agt[ia[iva_igual]] = False
+    livres_cont = np.ones(len(cont_df), dtype=bool)
+    livres_cont[ic[iva_igual]] = False
+    # Os divergentes de IVA continuam em só AGT/só contabilidade (como no merge original),
+    # mas já têm par pela chave exata: não entram na passagem aproximada, a não ser que
+    # a mesma linha tenha também um par só com diferença de arredondamento
+    sem_par_agt, sem_par_cont = livres_agt.copy(), livres_cont.copy()
+    sem_par_agt[ia[divergente]] = False
+    sem_par_cont[ic[divergente]] = False
+    sem_par_agt[ia[arredondamento]] = livres_agt[ia[arredondamento]]
+    sem_par_cont[ic[arredondamento]] = livres_cont[ic[arredondamento]]
+    livres_agt, livres_cont = np.flatnonzero(livres_agt), np.flatnonzero(livres_cont)
+
+    ia_aprox, ic_aprox, sim = (np.array([], dtype=np.int64),) * 2 + (np.array([], dtype=float),)
+    if aproximar:
+        ia_aprox, ic_aprox, sim = _pares_aproximados(
+            agt_df, cont_df, np.flatnonzero(sem_par_agt), np.flatnonzero(sem_par_cont),
+            tolerancia_valor, tolerancia_iva, limiar_documento)
+        livres_agt = livres_agt[~np.isin(livres_agt, ia_aprox)]
+        livres_cont = livres_cont[~np.isin(livres_cont, ic_aprox)]
+    aproximados = _juntar_linhas(agt_df, cont_df, ia_aprox, ic_aprox, ["nif"], ("_agt", "_cont"))
+    aproximados["similaridade_documento"] = np.round(sim, 3)
+    aproximados["diferenca_valor"] = (aproximados["valor_documento_agt"] - aproximados["valor_documento_cont"]).round(2)
+    aproximados["diferenca_iva"] = (aproximados["iva_dedutivel_agt"] - aproximados["iva_dedutivel_cont"]).round(2)
+
+    so_agt = _juntar_linhas(agt_df, cont_df, livres_agt, None, chaves, ("_x", "_y"))
+    so_cont = _juntar_linhas(cont_df, agt_df, livres_cont, None, chaves, ("_x", "_y"))
+    return conciliados, divergentes_iva, aproximados, so_agt, so_cont
+
+
+# Incrementar sempre que mudar a leitura/normalização dos mapas (invalida o cache de ficheiros)
+VERSAO_NORMALIZACAO = "1"
+
+COLUNAS_MAPA = {
+    "agt": {
+        "skiprows": 2,
+        "nome_col": "Nome / Firma",
+        "colunas": {
+            "Nº de Identificação Fiscal": "nif",
+            "Nº do Documento": "numero_documento",
+            "Valor do Documento": "valor_documento",
+            "IVA Dedutível - Valor": "iva_dedutivel"
+        },
+    },
+    "cont": {
+        "skiprows": 1,
+        "nome_col": "NOME / DENOMINAÇÃO",
+        "colunas": {
+            "NIF": "nif",
+            "NÚMERO DO DOCUMENTO": "numero_documento",
+            "VALOR DO DOCUMENTO": "valor_documento",
+            "IVA DEDUTÍVEL VALOR": "iva_dedutivel"
+        },
+    },
+}
+
+
+def normalizar(df, origem):
+    df["nif"] = df["nif"].astype(str).str.strip()
+    df["numero_documento"] = df["numero_documento"].astype(str).str.strip().str.upper()
+    df["valor_documento"] = pd.to_numeric(df["valor_documento"], errors="coerce").round(2)
+    df["iva_dedutivel"] = pd.to_numeric(df["iva_dedutivel"], errors="coerce").round(2)
+
+    nome_col = COLUNAS_MAPA[origem]["nome_col"]
+    if nome_col in df.columns:
+        df["nome_normalizado"] = limpar_nomes(df[nome_col])
+    else:
+        df["nome_normalizado"] = ""
+
+    return df
+
+
+def ler_mapa(path: str, origem: str) -> pd.DataFrame:
+    """Lê um mapa Excel (origem "agt" ou "cont"), uniformiza as colunas e normaliza."""
+    config = COLUNAS_MAPA[origem]
+    df = pd.read_excel(path, skiprows=config["skiprows"])
+    logger.debug("🧾 %s columns: %s", origem, list(df.columns))
+
+    df.columns = df.columns.str.strip().str.replace(r"\s+", " ", regex=True)
+    df = df.rename(columns=config["colunas"])
+    return normalizar(df, origem)
 
 
-def reconciliar_fiscal(path_agt, path_fornecedores):
+def reconciliar_fiscal(
+    path_agt,
+    path_fornecedores,
+    tolerancia_valor: float = TOLERANCIA_VALOR,
+    tolerancia_iva: float = TOLERANCIA_IVA,
+    limiar_documento: float = LIMIAR_DOCUMENTO
+):
     try:
         abs_agt = os.path.join(os.getcwd(), path_agt)
         abs_forn = os.path.join(os.getcwd(), path_fornecedores)
 
-        print(f"📄 Caminho Mapa AGT: {abs_agt}")
-        print(f"📄 Caminho Mapa Fornecedores: {abs_forn}")
+        logger.info("📄 Caminho Mapa AGT: %s", abs_agt)
+        logger.info("📄 Caminho Mapa Fornecedores: %s", abs_forn)
 
-        agt_df = pd.read_excel(abs_agt, skiprows=2)
-        cont_df = pd.read_excel(abs_forn, skiprows=1)
+        # Mapas já lidos (mesmo caminho, mtime e tamanho) vêm do cache em memória/disco
+        agt_df = cache_ficheiros.obter_ou_ler(
+            abs_agt, "fiscal_agt", lambda p: ler_mapa(p, "agt"), versao=VERSAO_NORMALIZACAO)
+        cont_df = cache_ficheiros.obter_ou_ler(
+            abs_forn, "fiscal_cont", lambda p: ler_mapa(p, "cont"), versao=VERSAO_NORMALIZACAO)
 
-        print("🧾 AGT columns:", list(agt_df.columns))
-        print("🧾 Fornecedores columns:", list(cont_df.columns))
+        logger.debug("🔍 AGT Columns Normalized: %s", list(agt_df.columns))
+        logger.debug("🔍 Fornecedores Columns Normalized: %s", list(cont_df.columns))
 
-        agt_df.columns = agt_df.columns.str.strip().str.replace(r"\s+", " ", regex=True)
-        cont_df.columns = cont_df.columns.str.strip().str.replace(r"\s+", " ", regex=True)
+        conciliados, divergentes_iva, aproximados, so_agt, so_cont = _classificar(
+            agt_df, cont_df,
+            tolerancia_valor=tolerancia_valor,
+            tolerancia_iva=tolerancia_iva,
+            limiar_documento=limiar_documento,
+        )
 
-        agt_df = agt_df.rename(columns={
-            "Nº de Identificação Fiscal": "nif",
-            "Nº do Documento": "numero_documento",
-            "Valor do Documento": "valor_documento",
-            "IVA Dedutível - Valor": "iva_dedutivel"
-        })
+        logger.info("✅ Conciliados: %s", len(conciliados))
+        logger.info("⚠️ Divergentes no IVA: %s", len(divergentes_iva))
+        logger.info("🔎 Conciliados aproximados: %s", len(aproximados))
+        logger.info("📄 Só no mapa AGT: %s", len(so_agt))
+        logger.info("📄 Só na contabilidade: %s", len(so_cont))
 
-        cont_df = cont_df.rename(columns={
-            "NIF": "nif",
-            "NÚMERO DO DOCUMENTO": "numero_documento",
-            "VALOR DO DOCUMENTO": "valor_documento",
-            "IVA DEDUTÍVEL VALOR": "iva_dedutivel"
-        })
-
-        def normalizar(df, origem):
-            df["nif"] = df["nif"].astype(str).str.strip()
-            df["numero_documento"] = df["numero_documento"].astype(str).str.strip().str.upper()
-            df["valor_documento"] = pd.to_numeric(df["valor_documento"], errors="coerce").round(2)
-            df["iva_dedutivel"] = pd.to_numeric(df["iva_dedutivel"], errors="coerce").round(2)
+        # Registos com tipos nativos e None no lugar de NaN, convertidos coluna a coluna
+        return {
+            "conciliados": registos(conciliados),
+            "divergentes_iva": registos(divergentes_iva),
+            "conciliados_aproximados": registos(aproximados),
+            "so_agt": registos(so_agt),
+            "so_contabilidade": registos(so_cont),
+        }
 
-            if origem == "agt":
-                nome_col = "Nome / Firma"
-            else:
-                nome_col = "NOME / DENOMINAÇÃO"
+    except Exception:
+        logger.exception("❌ Erro durante a reconciliação")
+        raise
 
-            if nome_col in df.columns:
-                df["nome_normalizado"] = df[nome_col].apply(limpar_nome)
-            else:
-                df["nome_normalizado"] = ""
 
-            return df
+CATEGORIAS_FISCAL = ("conciliados", "divergentes_iva", "conciliados_aproximados", "so_agt", "so_contabilidade")
 
 
-        agt_df = normalizar(agt_df, origem="agt")
-        cont_df = normalizar(cont_df, origem="cont")
+def reconciliar_e_guardar(reconciliacao_id: int, path_agt, path_fornecedores, **parametros) -> dict:
+    """Reconcilia, guarda as listas por reconciliação (lidas por página) e devolve só o resumo."""
+    resultado = reconciliar_fiscal(path_agt, path_fornecedores, **parametros)
+    guardar_resultado(reconciliacao_id, resultado, tipo="fiscal")
+    return {
+        "reconciliacao_id": reconciliacao_id,
+        "summary": {categoria: len(resultado.get(categoria, [])) for categoria in CATEGORIAS_FISCAL},
+    }
 
 
-        print("🔍 AGT Columns Normalized:", list(agt_df.columns))
-        print("🔍 Fornecedores Columns Normalized:", list(cont_df.columns))
+def filtro_fiscal(nif: Optional[str] = None, documento: Optional[str] = None):
+    """Filtro por NIF exato e/ou parte do nº de documento (AGT ou contabilidade). None sem critérios."""
+    if not (nif or documento):
+        return None
+    documento = documento.upper() if documento else None
 
-        # Conciliados: registros totalmente iguais
-        conciliados = pd.merge(
-            agt_df,
-            cont_df,
-            on=["nif", "numero_documento", "valor_documento", "iva_dedutivel"],
-            how="inner"
-        )
+    def filtro(item) -> bool:
+        if nif and str(item.get("nif")) != nif:
+            return False
+        if documento:
+            docs = (item.get("numero_documento"), item.get("numero_documento_agt"), item.get("numero_documento_cont"))
+            if not any(d and documento in str(d).upper() for d in docs):
+                return False
+        return True
 
-        # Divergência no IVA: mesmo NIF, nº doc, valor doc — IVA diferente
-        merged_all = pd.merge(
-            agt_df,
-            cont_df,
-            on=["nif", "numero_documento", "valor_documento"],
-            how="inner",
-            suffixes=('_agt', '_cont')
-        )
-        divergentes_iva = merged_all[merged_all["iva_dedutivel_agt"] != merged_all["iva_dedutivel_cont"]]
-
-        # Só no AGT (apenas documentos do AGT que não estão 100% no contabilidade)
-        so_agt = agt_df.merge(
-            cont_df,
-            on=["nif", "numero_documento", "valor_documento", "iva_dedutivel"],
-            how="left",
-            indicator=True
-        )
-        so_agt = so_agt[so_agt["_merge"] == "left_only"].drop(columns=["_merge"])
-
-        # Só na contabilidade
-        so_cont = cont_df.merge(
-            agt_df,
-            on=["nif", "numero_documento", "valor_documento", "iva_dedutivel"],
-            how="left",
-            indicator=True
-        )
-        so_cont = so_cont[so_cont["_merge"] == "left_only"].drop(columns=["_merge"])
-
-        print(f"✅ Conciliados: {len(conciliados)}")
-        print(f"⚠️ Divergentes no IVA: {len(divergentes_iva)}")
-        print(f"📄 Só no mapa AGT: {len(so_agt)}")
-        print(f"📄 Só na contabilidade: {len(so_cont)}")
-
-        return jsonable_encoder({
-            "conciliados": conciliados.where(pd.notnull(conciliados), None).to_dict(orient="records"),
-            "divergentes_iva": divergentes_iva.where(pd.notnull(divergentes_iva), None).to_dict(orient="records"),
-            "so_agt": so_agt.where(pd.notnull(so_agt), None).to_dict(orient="records"),
-            "so_contabilidade": so_cont.where(pd.notnull(so_cont), None).to_dict(orient="records")
-        }, custom_encoder={float: lambda x: None if pd.isna(x) else x})
-
-    except Exception as e:
-        print("❌ Erro durante a reconciliação:", str(e))
-        raise e
+    return filtro
@@ -0,0 +1,9 @@
+# tests/conftest.py
+import os
+import sys
+
+# os módulos do backend importam-se a partir de backend/ (utils, services, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pickles assinados (utils.pickle_assinado) com uma chave fixa: os testes não criam a chave em ~/
+os.environ.setdefault("CACHE_HMAC_CHAVE", "chave-dos-testes")
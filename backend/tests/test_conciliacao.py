@@ -0,0 +1,25 @@
+# tests/test_conciliacao.py
+"""conciliar_listas: o índice por data/valor dá o mesmo resultado que a varredura completa."""
+import pytest
+
+from benchmarks.dados import gerar_contabil
+from benchmarks.equivalencia_similaridade import listas_conciliacao
+from utils.conciliacao import conciliar_listas
+
+
+def conciliar(extrato, contab, **opcoes) -> dict:
+    ext, cont = listas_conciliacao(extrato, contab)  # listas novas: conciliar_listas acrescenta valor_liq
+    resultado = conciliar_listas(ext, cont, paralelo=False, usar_motor_similaridade=False, **opcoes)
+    resultado.pop("cache")
+    return resultado
+
+
+@pytest.mark.parametrize("seed", [3, 17])
+@pytest.mark.parametrize("valor_tolerancia", [0.01, 5.0])
+def test_indice_igual_a_varredura_completa(seed, valor_tolerancia):
+    extrato, contab = gerar_contabil(400, seed=seed)
+    com_indice = conciliar(extrato, contab, usar_indice=True, valor_tolerancia=valor_tolerancia)
+    sem_indice = conciliar(extrato, contab, usar_indice=False, valor_tolerancia=valor_tolerancia)
+
+    assert com_indice["conciliados"]  # os dados têm pares: a comparação não é trivial
+    assert com_indice == sem_indice
@@ -0,0 +1,119 @@
+# tests/test_fiscal_aproximado.py
+"""Passagem aproximada da reconciliação fiscal: bloqueio por NIF, tolerâncias e atribuição 1-para-1."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.dados import gerar_fiscal
+from services.reconciliacao_fiscal_service import (
+    COLUNAS_MAPA, TOLERANCIA_IVA, TOLERANCIA_VALOR, _classificar, normalizar,
+)
+
+
+def mapa(*linhas, origem="agt") -> pd.DataFrame:
+    """Mapa já normalizado a partir de tuplos (nif, nº documento, valor, iva)."""
+    df = pd.DataFrame(linhas, columns=["nif", "numero_documento", "valor_documento", "iva_dedutivel"])
+    return normalizar(df, origem)
+
+
+def classificar(agt, cont, **parametros) -> dict:
+    nomes = ("conciliados", "divergentes_iva", "conciliados_aproximados", "so_agt", "so_contabilidade")
+    return dict(zip(nomes, _classificar(agt, cont, **parametros)))
+
+
+def test_documento_escrito_de_outra_forma_no_mesmo_nif():
+    r = classificar(mapa(("5000000001", "FT 2025/12", 1000.0, 140.0)),
+                    mapa(("5000000001", "FT2025/12", 1000.0, 140.0), origem="cont"))
+    assert len(r["conciliados_aproximados"]) == 1
+    par = r["conciliados_aproximados"].iloc[0]
+    assert (par["numero_documento_agt"], par["numero_documento_cont"]) == ("FT 2025/12", "FT2025/12")
+    assert par["similaridade_documento"] == 1.0
+    assert r["so_agt"].empty and r["so_contabilidade"].empty
+
+
+def test_sem_par_entre_nifs_diferentes():
+    r = classificar(mapa(("5000000001", "FT 2025/12", 1000.0, 140.0)),
+                    mapa(("5000000002", "FT2025/12", 1000.0, 140.0), origem="cont"))
+    assert r["conciliados_aproximados"].empty
+    assert len(r["so_agt"]) == 1 and len(r["so_contabilidade"]) == 1
+
+
+@pytest.mark.parametrize("nif", ["", None, "nan"])
+def test_sem_par_com_nif_invalido(nif):
+    r = classificar(mapa((nif, "FT 2025/12", 1000.0, 140.0)),
+                    mapa((nif, "FT2025/12", 1000.0, 140.0), origem="cont"))
+    assert r["conciliados_aproximados"].empty
+    assert len(r["so_agt"]) == 1 and len(r["so_contabilidade"]) == 1
+
+
+@pytest.mark.parametrize("coluna, tolerancia", [(2, TOLERANCIA_VALOR), (3, TOLERANCIA_IVA)])
+@pytest.mark.parametrize("excesso, emparelha", [(0.0, True), (0.01, False)])
+def test_limites_da_tolerancia(coluna, tolerancia, excesso, emparelha):
+    linha = ["5000000001", "FT2025/12", 1000.0, 140.0]
+    linha[coluna] += tolerancia + excesso
+    r = classificar(mapa(("5000000001", "FT 2025/12", 1000.0, 140.0)), mapa(tuple(linha), origem="cont"))
+    assert len(r["conciliados_aproximados"]) == int(emparelha)
+
+
+def test_atribuicao_gulosa_um_para_um():
+    # A contabilidade FT2025/12 é o melhor par das duas linhas AGT: fica com a de menor diferença
+    # de valor; a outra AGT só pode ficar com o documento menos semelhante
+    agt = mapa(("5000000001", "FT 2025/12", 1000.5, 140.0), ("5000000001", "FT 2025/12", 1000.0, 140.0))
+    cont = mapa(("5000000001", "FT2025/12", 1000.0, 140.0), ("5000000001", "FT2025/1", 1000.0, 140.0),
+                origem="cont")
+    r = classificar(agt, cont, tolerancia_valor=1.0, limiar_documento=0.5)
+    aprox = r["conciliados_aproximados"]
+    assert sorted(zip(aprox["valor_documento_agt"], aprox["numero_documento_cont"])) == [
+        (1000.0, "FT2025/12"), (1000.5, "FT2025/1")]
+    assert r["so_agt"].empty and r["so_contabilidade"].empty
+
+
+def test_chave_exata_com_iva_arredondado():
+    agt = mapa(("5000000001", "FT 2025/12", 1000.0, 140.0), ("5000000001", "FT 2025/13", 500.0, 70.0))
+    cont = mapa(("5000000001", "FT 2025/12", 1000.0, 140.5), ("5000000001", "FT 2025/13", 500.0, 84.0),
+                origem="cont")
+    r = classificar(agt, cont, tolerancia_iva=1.0)
+    assert list(r["conciliados_aproximados"]["diferenca_iva"]) == [-0.5]
+    # Só a diferença acima da tolerância é divergente (e fica nas sobras, como no merge original)
+    assert list(r["divergentes_iva"]["numero_documento"]) == ["FT 2025/13"]
+    assert list(r["so_agt"]["numero_documento"]) == ["FT 2025/13"]
+    assert list(r["so_contabilidade"]["numero_documento"]) == ["FT 2025/13"]
+
+    sem_aproximar = classificar(agt, cont, aproximar=False)
+    assert len(sem_aproximar["divergentes_iva"]) == 2
+    assert sem_aproximar["conciliados_aproximados"].empty
+
+
+def test_diferenca_de_iva_de_50_centimos_e_divergente_por_omissao():
+    agt = mapa(("5000000001", "FT 2025/12", 1000.0, 140.0), ("5000000001", "FT 2025/13", 500.0, 70.0))
+    cont = mapa(("5000000001", "FT 2025/12", 1000.0, 140.5), ("5000000001", "FT 2025/13", 500.0, 70.01),
+                origem="cont")
+    r = classificar(agt, cont)
+    assert list(r["divergentes_iva"]["numero_documento"]) == ["FT 2025/12"]
+    # só o cêntimo de arredondamento é conciliado aproximadamente
+    assert list(r["conciliados_aproximados"]["numero_documento_agt"]) == ["FT 2025/13"]
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_categorias_disjuntas_nos_dados_sinteticos(seed):
+    agt, cont = gerar_fiscal(3_000, seed=seed)
+    agt = normalizar(agt.rename(columns=COLUNAS_MAPA["agt"]["colunas"]), "agt")
+    cont = normalizar(cont.rename(columns=COLUNAS_MAPA["cont"]["colunas"]), "cont")
+    r = classificar(agt, cont)
+
+    aprox = r["conciliados_aproximados"]
+    chave = ["nif", "numero_documento", "valor_documento"]
+    assert not aprox.duplicated(["nif", "numero_documento_agt", "valor_documento_agt"]).any()
+    assert not aprox.duplicated(["nif", "numero_documento_cont", "valor_documento_cont"]).any()
+    # Cada linha fica numa só categoria: por chave, sobras + pares aproximados <= linhas do mapa
+    for lado, mapa_df, sobras in (("agt", agt, r["so_agt"]), ("cont", cont, r["so_contabilidade"])):
+        emparelhados = aprox.rename(columns={f"{c}_{lado}": c for c in chave[1:]})[chave]
+        usados = pd.concat([sobras[chave], emparelhados]).value_counts()
+        assert (usados <= mapa_df[chave].value_counts().reindex(usados.index)).all()
+
+    diferenca = (r["divergentes_iva"]["iva_dedutivel_agt"] - r["divergentes_iva"]["iva_dedutivel_cont"]).abs()
+    assert (diferenca > TOLERANCIA_IVA).all()
+    # Nenhuma sobra tem par pela chave exata só com diferença de arredondamento no IVA
+    juntos = r["so_agt"][chave + ["iva_dedutivel"]].merge(
+        r["so_contabilidade"][chave + ["iva_dedutivel"]], on=chave, suffixes=("_agt", "_cont"))
+    assert not (np.abs(juntos["iva_dedutivel_agt"] - juntos["iva_dedutivel_cont"]) <= TOLERANCIA_IVA).any()
@@ -0,0 +1,49 @@
+# tests/test_fiscal_classificacao.py
+"""O merge externo único de _classificar dá as mesmas quatro listas que os quatro merges originais."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.dados import gerar_fiscal
+from services.reconciliacao_fiscal_service import COLUNAS_MAPA, _classificar, normalizar
+from utils.json_rapido import registos
+
+CHAVES = ["nif", "numero_documento", "valor_documento", "iva_dedutivel"]
+
+
+def quatro_merges(agt_df: pd.DataFrame, cont_df: pd.DataFrame) -> dict:
+    """Classificação original: um merge por categoria."""
+    conciliados = pd.merge(agt_df, cont_df, on=CHAVES, how="inner")
+    merged_all = pd.merge(agt_df, cont_df, on=CHAVES[:3], how="inner", suffixes=("_agt", "_cont"))
+    divergentes_iva = merged_all[merged_all["iva_dedutivel_agt"] != merged_all["iva_dedutivel_cont"]]
+    so_agt = agt_df.merge(cont_df, on=CHAVES, how="left", indicator=True)
+    so_agt = so_agt[so_agt["_merge"] == "left_only"].drop(columns=["_merge"])
+    so_cont = cont_df.merge(agt_df, on=CHAVES, how="left", indicator=True)
+    so_cont = so_cont[so_cont["_merge"] == "left_only"].drop(columns=["_merge"])
+    return {"conciliados": conciliados, "divergentes_iva": divergentes_iva,
+            "so_agt": so_agt, "so_contabilidade": so_cont}
+
+
+def mapas(seed: int):
+    agt, cont = gerar_fiscal(1_500, seed=seed)
+    agt = normalizar(agt.rename(columns=COLUNAS_MAPA["agt"]["colunas"]), "agt")
+    cont = normalizar(cont.rename(columns=COLUNAS_MAPA["cont"]["colunas"]), "cont")
+    # valores/IVA em falta nos dois mapas (NaN casa com NaN no merge, mas difere no !=)
+    rng = np.random.default_rng(seed)
+    for df in (agt, cont):
+        for coluna in ("valor_documento", "iva_dedutivel"):
+            df.loc[rng.random(len(df)) < 0.03, coluna] = np.nan
+    return agt, cont
+
+
+@pytest.mark.parametrize("seed", [4, 8])
+def test_merge_unico_igual_aos_quatro_merges(seed):
+    agt, cont = mapas(seed)
+    conciliados, divergentes_iva, _, so_agt, so_cont = _classificar(agt, cont, aproximar=False)
+    obtido = {"conciliados": conciliados, "divergentes_iva": divergentes_iva,
+              "so_agt": so_agt, "so_contabilidade": so_cont}
+
+    for categoria, esperado in quatro_merges(agt, cont).items():
+        assert len(esperado), categoria
+        assert list(obtido[categoria].columns) == list(esperado.columns), categoria
+        assert registos(obtido[categoria]) == registos(esperado), categoria
@@ -0,0 +1,69 @@
+# tests/test_jobs.py
+"""Estado dos jobs em disco: um job deixado a meio por um processo que acabou fica com erro."""
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from utils.jobs import ERRO_INTERROMPIDO, GestorJobs, Job
+
+
+def _esperar(gestor, job, timeout=5):
+    terminou = threading.Event()
+    gestor._pool.submit(terminou.set)
+    assert terminou.wait(timeout)
+    return gestor.obter(job.id)
+
+
+@pytest.fixture
+def pasta(tmp_path):
+    return str(tmp_path / "jobs")
+
+
+def test_job_concluido_fica_visivel_para_outro_gestor(pasta):
+    gestor = GestorJobs(max_workers=1, pasta=pasta)
+    job = _esperar(gestor, gestor.submeter("teste", lambda job, x: {"dobro": 2 * x}, 21))
+    assert job.estado == "concluido"
+
+    outro = GestorJobs(max_workers=1, pasta=pasta).obter(job.id)
+    assert outro.estado == "concluido"
+    assert outro.resultado == {"dobro": 42}
+
+
+def test_erro_do_job_fica_registado(pasta):
+    def falhar(job):
+        raise ValueError("ficheiro inválido")
+
+    gestor = GestorJobs(max_workers=1, pasta=pasta)
+    job = _esperar(gestor, gestor.submeter("teste", falhar))
+    assert (job.estado, job.erro) == ("erro", "ficheiro inválido")
+
+
+def test_job_de_processo_terminado_e_marcado_como_erro(pasta):
+    processo = subprocess.Popen([sys.executable, "-c", "pass"])
+    processo.wait()
+    job = Job("teste")
+    job.estado, job.pid, job.instancia = "em_execucao", processo.pid, "anterior"
+    GestorJobs(pasta=pasta)._persistir(job)
+
+    gestor = GestorJobs(pasta=pasta)
+    assert gestor.recuperar_interrompidos() == 1
+    recuperado = gestor.obter(job.id)
+    assert (recuperado.estado, recuperado.erro) == ("erro", ERRO_INTERROMPIDO)
+
+
+def test_reinicio_com_o_mesmo_pid_tambem_interrompe(pasta):
+    anterior = GestorJobs(pasta=pasta)
+    job = Job("teste")
+    job.estado, job.instancia = "em_execucao", anterior._instancia
+    anterior._persistir(job)
+
+    assert anterior.obter(job.id).estado == "em_execucao"  # ainda é o mesmo arranque
+    assert GestorJobs(pasta=pasta).obter(job.id).estado == "erro"
+
+
+def test_job_desconhecido(pasta):
+    gestor = GestorJobs(pasta=pasta)
+    assert gestor.obter("0" * 32) is None
+    assert gestor.obter("../../etc/passwd") is None
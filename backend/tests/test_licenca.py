@@ -0,0 +1,22 @@
+# tests/test_licenca.py
+"""A data confiável vem da memória: o pedido nunca espera pelo atualizador em segundo plano."""
+import time
+from datetime import datetime
+
+from services import licenca_service
+
+
+def test_data_confiavel_nao_espera_pela_rede(tmp_path, monkeypatch):
+    monkeypatch.setattr(licenca_service, "_tempo_confiavel", None)
+    monkeypatch.setattr(licenca_service, "iniciar_atualizador_tempo", lambda: None)  # sem thread nem rede
+    monkeypatch.setattr(licenca_service, "LICENCAS_DIR", str(tmp_path))
+    monkeypatch.setattr(licenca_service, "ULTIMA_DATA_PATH", str(tmp_path / "ultima_execucao.json"))
+
+    inicio = time.perf_counter()
+    assert licenca_service.data_confiavel_em_cache() is None  # ainda sem data externa: usa a local
+    assert time.perf_counter() - inicio < 0.5
+
+    monkeypatch.setattr(licenca_service, "obter_tempo_externo", lambda: datetime(2030, 5, 17, 12))
+    assert licenca_service.atualizar_tempo_confiavel()
+    assert licenca_service.data_confiavel_em_cache() == datetime(2030, 5, 17).date()
+    assert (tmp_path / "ultima_execucao.json").exists()
@@ -0,0 +1,31 @@
+# tests/test_limpar_nomes.py
+"""limpar_nomes (vetorizada) dá o mesmo que a normalização nome a nome que substituiu."""
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from services.reconciliacao_fiscal_service import limpar_nomes
+
+
+def limpar_nome(nome):
+    """Implementação de referência (a original, aplicada a cada linha)."""
+    if pd.isna(nome):
+        return ""
+    nome = str(nome).upper().strip()
+    nome = unicodedata.normalize('NFKD', nome)
+    nome = ''.join([c for c in nome if not unicodedata.combining(c)])
+    nome = nome.replace("-", " ").replace(",", "").replace(".", "")
+    nome = " ".join(nome.split())  # remove espaços duplicados
+    return nome
+
+
+def test_igual_a_referencia():
+    rng = np.random.default_rng(7)
+    alfabeto = list("abcXYZ çãéÔü-,.  \tÅﬁ²")
+    nomes = ["".join(rng.choice(alfabeto, rng.integers(0, 20))) for _ in range(2_000)]
+    nomes += [None, np.nan, 123, 4.5, "  Sociedade Comercial, Lda.  ", "JOSÉ-MARIA  S.A."]
+    serie = pd.Series(nomes * 2, dtype=object)
+
+    esperado = [limpar_nome(n) for n in serie]
+    assert limpar_nomes(serie).tolist() == esperado
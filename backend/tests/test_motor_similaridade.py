@@ -0,0 +1,57 @@
+# tests/test_motor_similaridade.py
+"""O MotorSimilaridade só corta pares abaixo do limiar: os matchers dão o mesmo com e sem ele."""
+import numpy as np
+import pytest
+
+from benchmarks.dados import gerar_contabil
+from benchmarks.equivalencia_similaridade import pares_conciliacao, pares_reconciliador
+from utils.cache import escopo_execucao
+from utils.conciliacao import similaridade_desc
+from utils.reconciliador import desc_similarity
+from utils.similaridade import MotorSimilaridade, clean_text, texto_bruto
+
+
+@pytest.fixture(scope="module")
+def dados():
+    return gerar_contabil(1_000, seed=11)
+
+
+@pytest.mark.parametrize("exata, normalizar", [
+    (similaridade_desc, texto_bruto),
+    (desc_similarity, clean_text),
+])
+def test_limite_majora_o_score_exato(dados, exata, normalizar):
+    extrato, contab = dados
+    textos = [d.upper() for d in extrato["descritivo"][:60]] + [d.upper() for d in contab["descritivo"][:60]]
+    motor = MotorSimilaridade(textos, exata=exata, normalizar=normalizar)
+    js = np.arange(60, 120)
+    with escopo_execucao():
+        for i in range(60):
+            exatos = np.array([exata(textos[i], textos[j]) for j in js])
+            assert (motor.limite(i, js) >= exatos - 1e-9).all()
+
+            pontuados = motor.pontuar(i, js, 0.6)
+            acima = exatos >= 0.6
+            np.testing.assert_array_equal(pontuados[acima], exatos[acima])
+            assert (pontuados[~acima] < 0.6).all()
+
+
+def _montantes_repetidos(extrato, contab):
+    """Poucos montantes distintos: blocos de candidatos grandes, onde o motor corta de facto."""
+    extrato, contab = extrato.copy(), contab.copy()
+    extrato["débito"] = np.where(extrato["débito"] != "", "1.000,00", "")
+    extrato["crédito"] = np.where(extrato["crédito"] != "", "2.000,00", "")
+    contab["debito"] = np.where(contab["debito"] > 0, 1000.0, 0.0)
+    contab["credito"] = np.where(contab["credito"] > 0, 2000.0, 0.0)
+    return extrato, contab
+
+
+@pytest.mark.parametrize("repetidos", [False, True])
+def test_matchers_iguais_com_e_sem_motor(dados, repetidos):
+    extrato, contab = _montantes_repetidos(*dados) if repetidos else dados
+    espelho = contab.rename(columns={"debito": "credito", "credito": "debito"})
+
+    assert (pares_conciliacao(extrato, contab, usar_motor_similaridade=True)
+            == pares_conciliacao(extrato, contab, usar_motor_similaridade=False))
+    assert (pares_reconciliador(extrato, espelho, use_similarity_engine=True)
+            == pares_reconciliador(extrato, espelho, use_similarity_engine=False))
@@ -0,0 +1,34 @@
+# tests/test_normalizar_valor.py
+"""Separadores de milhar e decimais dos valores dos extratos e da contabilidade."""
+from decimal import Decimal
+
+import pytest
+
+from utils.extratores import normalizar_valor
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("1.500", "1500.00"),
+    ("1.500,00", "1500.00"),
+    ("1500,5", "1500.50"),
+    ("-1.234.567", "-1234567.00"),
+    ("2.507,55", "2507.55"),
+    ("2 507,55", "2507.55"),
+    ("-10.5", "-10.50"),
+    ("1500.25", "1500.25"),
+    ("1.500 Kz", "1500.00"),
+    ("", "0.00"),
+    ("-", "0.00"),
+])
+def test_normalizar_valor_texto(texto, esperado):
+    assert normalizar_valor(texto) == Decimal(esperado)
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    (1500, "1500.00"),
+    (10.5, "10.50"),
+    (None, "0.00"),
+    (float("nan"), "0.00"),
+])
+def test_normalizar_valor_numeros(valor, esperado):
+    assert normalizar_valor(valor) == Decimal(esperado)
@@ -0,0 +1,41 @@
+# tests/test_paginacao.py
+"""Paginação por cursor: o total filtrado é contado uma vez por lista/filtro, não a cada página."""
+import pytest
+
+from utils import paginacao
+from utils.paginacao import paginar
+
+
+@pytest.fixture(autouse=True)
+def totais_limpos():
+    paginacao._totais_filtrados.clear()
+
+
+def test_total_filtrado_contado_uma_vez():
+    itens = [{"n": i} for i in range(50)]
+    chamadas = []
+
+    def pares(item):
+        chamadas.append(item["n"])
+        return item["n"] % 2 == 0
+
+    cursor, vistos, paginas = None, [], 0
+    while True:
+        paginas += 1
+        pagina = paginar(itens, cursor, limite=10, filtro=pares, chave_total=("teste", 1, "v1", "pares"))
+        assert pagina["total"] == 50 and pagina["total_filtrado"] == 25
+        vistos += [item["n"] for item in pagina["itens"]]
+        cursor = pagina["proximo_cursor"]
+        if cursor is None:
+            break
+    assert vistos == list(range(0, 50, 2))
+    # uma passagem para as páginas (o item no cursor é revisto em cada página) e outra,
+    # só no primeiro pedido, para o total
+    assert len(chamadas) <= 2 * len(itens) + paginas
+
+
+def test_sem_chave_conta_sempre():
+    itens = [{"n": i} for i in range(5)]
+    assert paginar(itens, filtro=lambda item: item["n"] > 2)["total_filtrado"] == 2
+    assert paginar(itens, filtro=lambda item: item["n"] > 3)["total_filtrado"] == 1
+    assert paginar(itens)["total_filtrado"] == 5
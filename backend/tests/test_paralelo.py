@@ -0,0 +1,47 @@
+# tests/test_paralelo.py
+"""Os dois matchers dão o mesmo resultado em modo paralelo (partições de datas) e sequencial."""
+import pytest
+
+from benchmarks.dados import gerar_contabil
+from benchmarks.equivalencia_similaridade import listas_conciliacao
+from utils.conciliacao import conciliar_listas
+from utils.reconciliador import reconcile_movements
+
+# partições pequenas: várias por worker e linhas da contabilidade partilhadas entre vizinhas
+OPCOES_PARALELO = {"max_workers": 2}
+TAMANHO_PARTICAO = 40
+
+
+@pytest.fixture(scope="module")
+def dados():
+    return gerar_contabil(400, seed=29)
+
+
+def _sem_cache(resultado: dict) -> dict:
+    resultado.pop("cache")
+    return resultado
+
+
+@pytest.mark.parametrize("usar_motor_similaridade", [True, False])
+def test_conciliar_listas_paralelo_igual_a_sequencial(dados, usar_motor_similaridade):
+    resultados = []
+    for paralelo in (True, False):
+        ext, cont = listas_conciliacao(*dados)
+        resultados.append(_sem_cache(conciliar_listas(
+            ext, cont, paralelo=paralelo, tamanho_particao=TAMANHO_PARTICAO,
+            usar_motor_similaridade=usar_motor_similaridade, **OPCOES_PARALELO)))
+    assert resultados[0]["conciliados"]
+    assert resultados[0] == resultados[1]
+
+
+@pytest.mark.parametrize("use_similarity_engine", [True, False])
+def test_reconcile_movements_paralelo_igual_a_sequencial(dados, use_similarity_engine):
+    extrato, contab = dados
+    espelho = contab.rename(columns={"debito": "credito", "credito": "debito"})
+    paralelo, sequencial = (
+        _sem_cache(reconcile_movements(extrato, espelho, parallel=modo, partition_size=TAMANHO_PARTICAO,
+                                       use_similarity_engine=use_similarity_engine, **OPCOES_PARALELO))
+        for modo in (True, False)
+    )
+    assert paralelo["potential"] and any(m["status"] == "matched_fuzzy" for m in paralelo["matches"])
+    assert paralelo == sequencial
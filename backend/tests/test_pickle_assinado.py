@@ -0,0 +1,77 @@
+# tests/test_pickle_assinado.py
+"""Caches e resultados em disco só são lidos com a assinatura HMAC deste servidor."""
+import os
+import pickle
+import stat
+
+import pandas as pd
+import pytest
+
+from utils import cache_extracao, pickle_assinado, resultados
+
+
+class _Explosivo:
+    def __reduce__(self):
+        return (pytest.fail, ("o pickle não assinado foi executado",))
+
+
+@pytest.fixture(autouse=True)
+def chave(monkeypatch):
+    monkeypatch.setenv(pickle_assinado.CHAVE_ENV, "chave-de-teste")
+    monkeypatch.setattr(pickle_assinado, "_chave", None)
+
+
+def test_ida_e_volta(tmp_path):
+    caminho = str(tmp_path / "x.pkl")
+    pickle_assinado.gravar(caminho, {"a": [1, 2]})
+    assert pickle_assinado.ler(caminho) == {"a": [1, 2]}
+    assert stat.S_IMODE(os.stat(caminho).st_mode) == 0o600
+
+
+def test_pickle_alheio_nao_e_executado(tmp_path):
+    caminho = str(tmp_path / "x.pkl")
+    with open(caminho, "wb") as f:
+        pickle.dump(_Explosivo(), f)
+    with pytest.raises(pickle_assinado.AssinaturaInvalida):
+        pickle_assinado.ler(caminho)
+
+    pickle_assinado.gravar(caminho, 1)
+    with open(caminho, "r+b") as f:  # conteúdo alterado depois de assinado
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\x00")
+    with pytest.raises(pickle_assinado.AssinaturaInvalida):
+        pickle_assinado.ler(caminho)
+
+
+def test_chave_gerada_uma_vez_com_permissoes_restritas(tmp_path, monkeypatch):
+    monkeypatch.delenv(pickle_assinado.CHAVE_ENV)
+    monkeypatch.setattr(pickle_assinado, "FICHEIRO_CHAVE", str(tmp_path / "chaves" / "cache.key"))
+    primeira = pickle_assinado._carregar_chave()
+    assert pickle_assinado._carregar_chave() == primeira
+    assert stat.S_IMODE(os.stat(pickle_assinado.FICHEIRO_CHAVE).st_mode) == 0o600
+
+
+def test_cache_extracao_descarta_entrada_nao_assinada(tmp_path, monkeypatch):
+    pasta = tmp_path / "cache"
+    monkeypatch.setattr(cache_extracao, "CACHE_DIR", str(pasta))
+    df = pd.DataFrame({"valor": [1.0, 2.0]})
+    cache_extracao.guardar("abc", "bai", df)
+    pd.testing.assert_frame_equal(cache_extracao.obter("abc", "bai"), df)
+    assert stat.S_IMODE(os.stat(pasta).st_mode) == 0o700
+
+    caminho = cache_extracao._caminho("abc", "bai")
+    with open(caminho, "wb") as f:
+        pickle.dump(_Explosivo(), f)
+    assert cache_extracao.obter("abc", "bai") is None
+    assert not os.path.exists(caminho)
+
+
+def test_resultado_nao_assinado_conta_como_inexistente(tmp_path, monkeypatch):
+    monkeypatch.setattr(resultados, "RESULTADOS_DIR", str(tmp_path))
+    resultados._memoria.clear()
+    with open(resultados._caminho(5, "fiscal"), "wb") as f:
+        pickle.dump(_Explosivo(), f)
+    assert resultados.carregar_resultado(5, tipo="fiscal") is None
+
+    resultados.guardar_resultado(5, {"ok": True}, tipo="fiscal")
+    assert resultados.carregar_resultado(5, tipo="fiscal")[0] == {"ok": True}
@@ -0,0 +1,128 @@
+# tests/test_reconciliador.py
+"""reconcile_movements contra uma implementação de referência linha a linha (dados sintéticos com seed)."""
+import pandas as pd
+import pytest
+
+from benchmarks.dados import gerar_contabil
+from utils.reconciliador import desc_similarity, normalize_contabilidade, normalize_extrato_bai, reconcile_movements
+
+
+def espelho(contab: pd.DataFrame) -> pd.DataFrame:
+    """reconcile_movements usa o sinal da contabilidade em espelho (débito = entrada)."""
+    return contab.rename(columns={"debito": "credito", "credito": "debito"})
+
+
+def _mesma_data(a, b) -> bool:
+    return (pd.isna(a) and pd.isna(b)) or a == b
+
+
+def exatos_referencia(ext: pd.DataFrame, cont: pd.DataFrame) -> list:
+    """Stage 1: cada linha do extrato fica com a primeira linha livre de mesmo valor e mesma data."""
+    usados, pares = set(), []
+    datas_cont = list(cont["date_mov"].dt.date)
+    for e_idx, amount, data in zip(ext["orig_index"], ext["amount"], ext["date_mov"].dt.date):
+        for c, (c_idx, c_amount) in enumerate(zip(cont["orig_index"], cont["amount"])):
+            if c_idx not in usados and c_amount == amount and _mesma_data(datas_cont[c], data):
+                usados.add(c_idx)
+                pares.append((int(e_idx), int(c_idx)))
+                break
+    return pares
+
+
+def aproximados_referencia(ext: pd.DataFrame, cont: pd.DataFrame, exatos: list,
+                           amount_tolerance: float = 0.01, desc_similarity_threshold: float = 0.55) -> list:
+    """
+    Stage 2 linha a linha: as sobras do extrato procuram, entre as linhas da contabilidade sem
+    par (nem do Stage 1 nem de um matched_fuzzy anterior), o melhor score dentro da tolerância.
+    Abaixo do threshold sugere o candidato de data mais próxima (potential, não fica usado).
+    """
+    ext_exatos = {e for e, _ in exatos}
+    usados = {c for _, c in exatos}
+    linhas_cont = list(zip(cont["orig_index"], cont["amount"], cont["date_mov"], cont["desc"]))
+    resultado = []
+    for e_idx, amount, data, desc in zip(ext["orig_index"], ext["amount"], ext["date_mov"], ext["desc"]):
+        if e_idx in ext_exatos:
+            continue
+        candidatos = []
+        for c_idx, c_amount, c_data, c_desc in linhas_cont:
+            if c_idx in usados or not amount - amount_tolerance <= c_amount <= amount + amount_tolerance:
+                continue
+            dd = abs((data.date() - c_data.date()).days) if pd.notna(data) and pd.notna(c_data) else None
+            sim = desc_similarity(desc, c_desc)
+            candidatos.append((c_idx, sim, dd, sim - 0.01 * (dd or 0)))
+        if not candidatos:
+            continue
+        melhor = max(candidatos, key=lambda c: c[3])  # max devolve o primeiro em caso de empate
+        if melhor[3] >= desc_similarity_threshold:
+            usados.add(melhor[0])
+            status = "matched_fuzzy"
+        else:
+            melhor = min(candidatos, key=lambda c: 999999 if c[2] is None else c[2])
+            status = "potential"
+        c_idx, sim, dd, _ = melhor
+        resultado.append((int(e_idx), int(c_idx), status, sim, dd))
+    return resultado
+
+
+def pares_exatos(resultado: dict) -> list:
+    return [(m["ext_idx"], m["cont_idx"]) for m in resultado["matches"] if m["status"] == "matched_exact"]
+
+
+@pytest.fixture(scope="module", params=[5, 23])
+def dados(request):
+    extrato, contab = gerar_contabil(300, seed=request.param)
+    return extrato, espelho(contab)
+
+
+def test_exatos_iguais_a_referencia(dados):
+    extrato, contab = dados
+    resultado = reconcile_movements(extrato, contab, parallel=False)
+    esperado = exatos_referencia(normalize_extrato_bai(extrato), normalize_contabilidade(contab))
+    assert esperado
+    assert sorted(pares_exatos(resultado)) == sorted(esperado)
+
+
+@pytest.mark.parametrize("use_similarity_engine", [True, False])
+def test_aproximados_iguais_a_referencia(dados, use_similarity_engine):
+    extrato, contab = dados
+    resultado = reconcile_movements(extrato, contab, parallel=False, use_similarity_engine=use_similarity_engine)
+    ext, cont = normalize_extrato_bai(extrato), normalize_contabilidade(contab)
+    esperado = aproximados_referencia(ext, cont, exatos_referencia(ext, cont))
+
+    obtido = [(m["ext_idx"], m["cont_idx"], m["status"], m["desc_similarity"], m["date_diff_days"])
+              for m in resultado["matches"] + resultado["potential"] if m["status"] != "matched_exact"]
+    assert {s for *_, s, _, _ in esperado} == {"matched_fuzzy", "potential"}
+    assert sorted(obtido) == sorted(esperado)
+
+
+def test_contabilidade_do_stage_1_nao_volta_a_ser_usada():
+    # a linha 0 da contabilidade é o par exato do extrato 0; o extrato 1 (mesmo descritivo,
+    # valor a 0,01) não a volta a usar: sem outra linha livre fica sem par nem sugestão
+    extrato = pd.DataFrame({
+        "data mov.": ["02-01-2025"] * 2, "data valor": ["02-01-2025"] * 2,
+        "descritivo": ["TRF A", "TRF A"], "débito": ["", ""], "crédito": ["100,00", "100,01"],
+    })
+    contab = pd.DataFrame({
+        "data movimento": ["02-01-2025"], "data valor": ["02-01-2025"],
+        "descritivo": ["TRF A"], "debito": [100.0], "credito": [0.0],
+    })
+    resultado = reconcile_movements(extrato, contab, parallel=False)
+    assert pares_exatos(resultado) == [(0, 0)]
+    assert [m["status"] for m in resultado["matches"]] == ["matched_exact"]
+    assert resultado["potential"] == []
+    assert [r["orig_index"] for r in resultado["unmatched_extrato"]] == [1]
+
+
+def test_exatos_duplicados_um_para_um():
+    # dois movimentos iguais no extrato e três na contabilidade: pares pela ordem de ocorrência
+    extrato = pd.DataFrame({
+        "data mov.": ["02-01-2025"] * 2, "data valor": ["02-01-2025"] * 2,
+        "descritivo": ["TRF A", "TRF B"], "débito": ["", ""], "crédito": ["100,00", "100,00"],
+    })
+    contab = pd.DataFrame({
+        "data movimento": ["02-01-2025"] * 3, "data valor": ["02-01-2025"] * 3,
+        "descritivo": ["TRF A", "TRF B", "TRF C"], "debito": [100.0] * 3, "credito": [0.0] * 3,
+    })
+    resultado = reconcile_movements(extrato, contab, parallel=False)
+    assert pares_exatos(resultado) == [(0, 0), (1, 1)]
+    assert [r["orig_index"] for r in resultado["unmatched_contabilidade"]] == [2]
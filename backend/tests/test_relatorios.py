@@ -0,0 +1,54 @@
+# tests/test_relatorios.py
+"""PDF desenhado por partes: as partes são juntas num único ficheiro e os temporários removidos."""
+import pickle
+
+import pypdfium2
+import pytest
+
+from utils import relatorios, resultados
+from utils.resultados import ResultadoEmCalculo
+
+CABECALHO = {"id": 1, "empresa_id": 1, "criado_em": "2025-01-01"}
+
+
+def conciliacao(n: int) -> dict:
+    movimento = lambda i: {"data_mov": "2025-01-02", "descritivo": f"MOV {i}", "debito": 1.0, "credito": 0,
+                           "valor_liq": -1.0}
+    return {
+        "summary": {"total_extrato": n, "total_contabilidade": n, "conciliados": n,
+                    "somente_extrato": n, "somente_contabilidade": n},
+        "conciliados": [{"extrato_data_mov": "2025-01-01", "contab_data_mov": None,
+                         "extrato_descritivo": f"TRF {i}", "contab_descritivo": f"PAG {i}",
+                         "extrato_valor_liq": 10.0, "contab_valor_liq": 10.0, "status": "conciliado"}
+                        for i in range(n)],
+        "somente_extrato": [movimento(i) for i in range(n)],
+        "somente_contabilidade": [movimento(i) for i in range(n)],
+    }
+
+
+def paginas(caminho) -> int:
+    pdf = pypdfium2.PdfDocument(str(caminho))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def test_partes_juntas_num_so_pdf(tmp_path):
+    dados = conciliacao(400)
+    inteiro, partido = tmp_path / "inteiro.pdf", tmp_path / "partido.pdf"
+    relatorios.renderizar_pdf_conciliacao(str(inteiro), CABECALHO, conciliacao=dados, elementos_por_parte=10_000)
+    relatorios.renderizar_pdf_conciliacao(str(partido), CABECALHO, conciliacao=dados, elementos_por_parte=7)
+
+    # cada parte começa numa página nova: no máximo uma página a mais por parte
+    assert paginas(inteiro) <= paginas(partido) <= paginas(inteiro) + 10
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["inteiro.pdf", "partido.pdf"]
+
+
+def test_resultado_em_falta_no_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(resultados, "RESULTADOS_DIR", str(tmp_path))
+    with pytest.raises(ResultadoEmCalculo) as erro:
+        relatorios.renderizar_pdf_conciliacao(str(tmp_path / "r.pdf"), CABECALHO, execucao_id=5)
+    # chega intacta ao processo principal (o pool devolve a exceção em pickle)
+    copia = pickle.loads(pickle.dumps(erro.value))
+    assert copia.execucao_id == 5 and str(copia) == str(erro.value)
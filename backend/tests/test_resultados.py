@@ -0,0 +1,57 @@
+# tests/test_resultados.py
+"""Resultados guardados: um cálculo por execução, nenhum pedido recalcula enquanto o job corre."""
+import threading
+import time
+
+import pytest
+
+import utils.conciliacao
+from utils import resultados
+from utils.cache import LocksPorChave
+
+
+@pytest.fixture(autouse=True)
+def pasta_resultados(tmp_path, monkeypatch):
+    monkeypatch.setattr(resultados, "RESULTADOS_DIR", str(tmp_path))
+    resultados._memoria.clear()
+
+
+def test_locks_por_chave_sao_descartados():
+    locks = LocksPorChave()
+    with locks.segurar("a") as adquirido:
+        assert adquirido
+        with locks.segurar("a", bloquear=False) as outro:
+            assert not outro
+        assert len(locks) == 1
+    assert len(locks) == 0
+
+
+def test_pedido_durante_o_job_nao_recalcula(monkeypatch):
+    monkeypatch.setattr(utils.conciliacao, "conciliar_movimentos_db",
+                        lambda db, execucao_id: pytest.fail("não devia recalcular"))
+    with resultados.calculo_resultado(7):
+        with pytest.raises(resultados.ResultadoEmCalculo):
+            resultados.obter_ou_calcular(None, 7)
+        resultados.guardar_resultado(7, {"conciliados": [1]})
+
+    conciliacao, _ = resultados.obter_ou_calcular(None, 7)
+    assert conciliacao == {"conciliados": [1]}
+    assert len(resultados._locks) == 0
+
+
+def test_pedidos_simultaneos_calculam_uma_vez(monkeypatch):
+    chamadas = []
+
+    def conciliar(db, execucao_id):
+        chamadas.append(execucao_id)
+        time.sleep(0.2)
+        return {"conciliados": []}
+
+    monkeypatch.setattr(utils.conciliacao, "conciliar_movimentos_db", conciliar)
+    threads = [threading.Thread(target=resultados.obter_ou_calcular, args=(None, 3)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert chamadas == [3]
+    assert len(resultados._locks) == 0
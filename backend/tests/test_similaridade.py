@@ -0,0 +1,53 @@
+# tests/test_similaridade.py
+"""Os scores memoizados têm de ser iguais ao SequenceMatcher sem cache, nas duas ordens."""
+from difflib import SequenceMatcher
+
+import pytest
+
+from benchmarks.dados import gerar_contabil
+from utils.cache import escopo_execucao
+from utils.conciliacao import similaridade_desc
+from utils.reconciliador import desc_similarity
+from utils.similaridade import clean_text
+
+
+def _desc_similarity_base(a, b):
+    a_c, b_c = clean_text(a), clean_text(b)
+    if not a_c or not b_c:
+        return 0.0
+    jaccard = len(set(a_c.split()) & set(b_c.split())) / max(1, len(set(a_c.split()) | set(b_c.split())))
+    return max(SequenceMatcher(None, a_c, b_c).ratio(), jaccard)
+
+
+def _similaridade_desc_base(a, b):
+    return SequenceMatcher(None, a, b).ratio() if a and b else 0
+
+
+@pytest.fixture(scope="module")
+def pares():
+    extrato, contab = gerar_contabil(300, seed=3)
+    ext = [d.upper() for d in extrato["descritivo"]]
+    cont = [d.upper() for d in contab["descritivo"]]
+    return [(a, b) for a in ext[:40] for b in cont[:40]]
+
+
+@pytest.mark.parametrize("memoizada, base", [
+    (similaridade_desc, _similaridade_desc_base),
+    (desc_similarity, _desc_similarity_base),
+])
+def test_memoizada_igual_a_base_nas_duas_ordens(pares, memoizada, base):
+    with escopo_execucao():
+        for a, b in pares:
+            # a segunda chamada de cada par vem do cache, na ordem inversa
+            assert memoizada(a, b) == base(a, b)
+            assert memoizada(b, a) == base(b, a)
+            assert memoizada(a, b) == base(a, b)
+
+
+def test_par_assimetrico_mantem_os_dois_scores():
+    a, b = "PAG SERV UNITEL 123456", "TRF JOAO MANUEL REF 1"
+    assert SequenceMatcher(None, a, b).ratio() != SequenceMatcher(None, b, a).ratio()
+    with escopo_execucao() as escopo:
+        assert similaridade_desc(b, a) == _similaridade_desc_base(b, a)
+        assert similaridade_desc(a, b) == _similaridade_desc_base(a, b)
+        assert escopo.cache("similaridade_desc").estatisticas()["tamanho"] == 2
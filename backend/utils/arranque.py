@@ -0,0 +1,44 @@
+# utils/arranque.py
+"""
+Aquecimento em segundo plano: os módulos com bibliotecas pesadas (pandas, numpy, camelot,
+reportlab, openpyxl) não são importados no arranque; uma thread importa-os logo a seguir,
+para o primeiro pedido que precise deles já os encontrar carregados.
+"""
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+MODULOS_PESADOS = (
+    "services.reconciliacao_contabil_service",
+    "services.reconciliacao_fiscal_service",
+    "utils.relatorios",
+)
+# AQUECER_MODULOS=0 desliga o aquecimento (os módulos carregam no primeiro pedido)
+AQUECER_MODULOS = os.getenv("AQUECER_MODULOS", "1") != "0"
+
+
+def _importar(modulos: Sequence[str]) -> None:
+    inicio = time.perf_counter()
+    for nome in modulos:
+        t = time.perf_counter()
+        try:
+            importlib.import_module(nome)
+        except Exception as e:  # o erro volta a aparecer (com contexto) no pedido que usar o módulo
+            logger.warning("⚠ Aquecimento de %s falhou: %s", nome, e)
+            continue
+        logger.info("🔥 %s carregado em %.2fs", nome, time.perf_counter() - t)
+    logger.info("🔥 Aquecimento concluído em %.2fs", time.perf_counter() - inicio)
+
+
+def aquecer_modulos(modulos: Sequence[str] = MODULOS_PESADOS) -> Optional[threading.Thread]:
+    """Importa `modulos` numa thread daemon; devolve a thread (None se o aquecimento estiver desligado)."""
+    if not AQUECER_MODULOS:
+        return None
+    thread = threading.Thread(target=_importar, args=(modulos,), name="aquecimento", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,147 @@
+# utils/cache.py
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+_SEM_VALOR = object()
+
+
+class CacheLRU:
+    """Cache LRU limitado a maxsize entradas, com contadores de hits/misses."""
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._dados: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, chave: Hashable, default: Any = None) -> Any:
+        try:
+            valor = self._dados[chave]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._dados.move_to_end(chave)
+        self.hits += 1
+        return valor
+
+    def put(self, chave: Hashable, valor: Any) -> None:
+        self._dados[chave] = valor
+        self._dados.move_to_end(chave)
+        if len(self._dados) > self.maxsize:
+            self._dados.popitem(last=False)
+
+    def pop(self, chave: Hashable, default: Any = None) -> Any:
+        return self._dados.pop(chave, default)
+
+    def clear(self) -> None:
+        self._dados.clear()
+
+    def __len__(self) -> int:
+        return len(self._dados)
+
+    def estatisticas(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "tamanho": len(self._dados)}
+
+
+class LocksPorChave:
+    """
+    Um lock por chave (ex.: por execução), criado no primeiro uso e descartado quando deixa
+    de ter quem o segure ou espere: o dicionário não cresce com o número de chaves já usadas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks: Dict[Hashable, List[Any]] = {}  # chave -> [lock, quantos o seguram/esperam]
+
+    @contextmanager
+    def segurar(self, chave: Hashable, bloquear: bool = True) -> Iterator[bool]:
+        """Segura o lock da chave; com bloquear=False não espera e devolve False se estiver ocupado."""
+        with self._lock:
+            entrada = self._locks.setdefault(chave, [threading.Lock(), 0])
+            entrada[1] += 1
+        adquirido = entrada[0].acquire(blocking=bloquear)
+        try:
+            yield adquirido
+        finally:
+            if adquirido:
+                entrada[0].release()
+            with self._lock:
+                entrada[1] -= 1
+                if entrada[1] == 0:
+                    del self._locks[chave]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._locks)
+
+
+class EscopoCache:
+    """Conjunto de caches (um por nome) que vive durante uma execução de reconciliação."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.caches: Dict[str, CacheLRU] = {}
+
+    def cache(self, nome: str) -> CacheLRU:
+        c = self.caches.get(nome)
+        if c is None:
+            c = self.caches[nome] = CacheLRU(self.maxsize)
+        return c
+
+    def estatisticas(self) -> Dict[str, Dict[str, int]]:
+        return {nome: c.estatisticas() for nome, c in self.caches.items()}
+
+
+_escopo_atual: ContextVar[Optional[EscopoCache]] = ContextVar("escopo_cache", default=None)
+
+
+@contextmanager
+def escopo_execucao(maxsize: int = 100_000):
+    """
+    Ativa os caches de memoização para o bloco. Se já houver um escopo ativo
+    (execução que chama outra), o escopo exterior é reutilizado.
+    """
+    atual = _escopo_atual.get()
+    if atual is not None:
+        yield atual
+        return
+    escopo = EscopoCache(maxsize)
+    token = _escopo_atual.set(escopo)
+    try:
+        yield escopo
+    finally:
+        _escopo_atual.reset(token)
+
+
+def par_nao_ordenado(a: Any, b: Any) -> Hashable:
+    return frozenset((a, b))
+
+
+def memoizar(nome: str, chave: Optional[Callable[..., Hashable]] = None):
+    """
+    Memoiza a função no escopo de execução ativo; fora de um escopo a função
+    é chamada diretamente (sem crescimento de memória entre execuções).
+    Chamadas com argumentos nomeados também passam direto: a chave é feita só dos posicionais.
+    """
+    def decorador(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            escopo = _escopo_atual.get()
+            if escopo is None or kwargs:
+                return func(*args, **kwargs)
+            cache = escopo.cache(nome)
+            try:
+                k = chave(*args) if chave else args
+                valor = cache.get(k, _SEM_VALOR)
+            except TypeError:  # argumento não hashable
+                return func(*args)
+            if valor is _SEM_VALOR:
+                valor = func(*args)
+                cache.put(k, valor)
+            return valor
+        return wrapper
+    return decorador
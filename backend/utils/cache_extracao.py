@@ -0,0 +1,89 @@
+# utils/cache_extracao.py
+import logging
+import os
+from typing import Callable, Optional
+
+import pandas as pd
+
+from utils import pickle_assinado
+
+CACHE_DIR = os.getenv("CACHE_EXTRACAO_DIR", "uploads/cache/extracao")
+# Incrementar sempre que mudar a extração/normalização (extratores, filtros de linhas)
+VERSAO_PARSER = "1"
+TAMANHO_MAX_BYTES = int(os.getenv("CACHE_EXTRACAO_MAX_MB", "512")) * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _caminho(conteudo_hash: str, tipo: str) -> str:
+    return os.path.join(CACHE_DIR, f"{tipo}_{conteudo_hash}_v{VERSAO_PARSER}.pkl")
+
+
+def _completa(df: pd.DataFrame) -> bool:
+    """Extrações com páginas que falharam (df.attrs["paginas_com_erro"]) não vão para o cache."""
+    return not df.attrs.get("paginas_com_erro")
+
+
+def obter(conteudo_hash: str, tipo: str) -> Optional[pd.DataFrame]:
+    caminho = _caminho(conteudo_hash, tipo)
+    try:
+        df = pickle_assinado.ler(caminho)
+    except FileNotFoundError:
+        return None
+    except Exception as e:  # entrada corrompida/incompatível/não assinada: descarta e volta a extrair
+        logger.warning("⚠ Cache de extração inválido (%s): %s", caminho, e)
+        _remover(caminho)
+        return None
+    if not _completa(df):  # gravada por uma versão anterior: volta a extrair as páginas em falta
+        _remover(caminho)
+        return None
+    os.utime(caminho)  # mtime = último uso, base do LRU
+    return df
+
+
+def guardar(conteudo_hash: str, tipo: str, df: pd.DataFrame) -> None:
+    pickle_assinado.criar_pasta(CACHE_DIR)
+    pickle_assinado.gravar(_caminho(conteudo_hash, tipo), df)
+    _aplicar_limite()
+
+
+def obter_ou_extrair(conteudo_hash: str, tipo: str, extrair: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """
+    Devolve o DataFrame já normalizado do cache ou extrai e guarda (chave: hash do conteúdo + versão do parser).
+    Uma extração incompleta (páginas com erro) é devolvida mas não guardada: a falha pode ser temporária.
+    """
+    df = obter(conteudo_hash, tipo)
+    if df is not None:
+        logger.info("♻ Extração reutilizada do cache (%s %s)", tipo, conteudo_hash[:12])
+        return df
+    df = extrair()
+    if df is not None:
+        if _completa(df):
+            guardar(conteudo_hash, tipo, df)
+        else:
+            logger.warning("⚠ Extração %s %s com páginas em erro %s: não fica em cache",
+                           tipo, conteudo_hash[:12], df.attrs["paginas_com_erro"])
+    return df
+
+
+def _remover(caminho: str) -> None:
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+
+def _aplicar_limite() -> None:
+    """Remove as entradas usadas há mais tempo até o cache caber em TAMANHO_MAX_BYTES."""
+    entradas = []
+    with os.scandir(CACHE_DIR) as it:
+        for e in it:
+            if e.is_file() and e.name.endswith(".pkl"):
+                st = e.stat()
+                entradas.append((st.st_mtime, st.st_size, e.path))
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    for _, tamanho, caminho in sorted(entradas):
+        if total <= TAMANHO_MAX_BYTES:
+            break
+        _remover(caminho)
+        total -= tamanho
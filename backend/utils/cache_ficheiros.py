@@ -0,0 +1,44 @@
+# utils/cache_ficheiros.py
+import hashlib
+import os
+import threading
+from typing import Callable
+
+import pandas as pd
+
+from utils import cache_extracao
+from utils.cache import CacheLRU
+
+# DataFrames mantidos em memória (os restantes ficam só no cache em disco)
+MAX_ENTRADAS_MEMORIA = int(os.getenv("CACHE_FICHEIROS_MAX_ENTRADAS", "16"))
+
+_memoria = CacheLRU(MAX_ENTRADAS_MEMORIA)
+_lock = threading.Lock()
+
+
+def chave_ficheiro(path: str, versao: str) -> str:
+    """Identidade do ficheiro (caminho absoluto, mtime, tamanho) + versão da normalização."""
+    st = os.stat(path)
+    identidade = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{versao}"
+    return hashlib.sha256(identidade.encode("utf-8")).hexdigest()
+
+
+def obter_ou_ler(path: str, tipo: str, ler: Callable[[str], pd.DataFrame], versao: str = "1") -> pd.DataFrame:
+    """
+    DataFrame já normalizado de `path`: memória (LRU) -> disco (cache_extracao) -> ler(path).
+    Um ficheiro alterado muda de mtime/tamanho e por isso de chave. Tratar o resultado como só de leitura.
+    """
+    chave = chave_ficheiro(path, versao)
+    with _lock:
+        df = _memoria.get((tipo, chave))
+    if df is not None:
+        return df
+    df = cache_extracao.obter_ou_extrair(chave, tipo, lambda: ler(path))
+    with _lock:
+        _memoria.put((tipo, chave), df)
+    return df
+
+
+def estatisticas():
+    with _lock:
+        return _memoria.estatisticas()
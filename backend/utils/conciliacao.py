@@ -1,66 +1,179 @@
 # utils/conciliacao.py
 
+from bisect import bisect_left, bisect_right
 from difflib import SequenceMatcher
-from datetime import datetime
-from typing import Any, Dict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
 from sqlalchemy.orm import Session
 
 from models.user_model import MovimentacaoBAI, MovimentacaoContabilidade
+from utils.similaridade import MotorSimilaridade, texto_bruto
+from utils.paralelo import TAMANHO_PARTICAO, particionar_por_data, pontuar_particoes, usar_paralelo
+from utils.cache import escopo_execucao, memoizar
 
+# Folga numérica da janela de valores do índice; o teste exato da tolerância é refeito em cada candidato
+_FOLGA_JANELA = 1e-6
 
-def conciliar_movimentos_db(
-    db: Session,
-    execucao_id: int,
+
+def format_data(d):
+    if not d:
+        return None
+    if isinstance(d, (date, datetime)):
+        return d.strftime('%Y-%m-%d')
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(d, fmt).strftime('%Y-%m-%d')
+        except:
+            pass
+    return d
+
+
+def to_dict_list(registros) -> List[Dict[str, Any]]:
+    return [{
+        'id': r.id,
+        'data_mov': format_data(r.data_mov),
+        'data_valor': format_data(r.data_valor),
+        'descritivo': (r.descritivo or "").upper().strip(),
+        'debito': float(r.debito or 0),
+        'credito': float(r.credito or 0),
+        'saldo': float(r.saldo or 0)
+    } for r in registros]
+
+
+# chave = (a, b) pela ordem recebida: o ratio do SequenceMatcher não é simétrico
+@memoizar("similaridade_desc")
+def similaridade_desc(a, b):
+    if not a or not b:
+        return 0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def indexar_contabilidade(contab_list: List[Dict[str, Any]]) -> Dict[tuple, tuple]:
+    """
+    Índice de candidatos: para cada data (data_mov e data_valor) guarda os valores
+    líquidos ordenados e as posições correspondentes em contab_list.
+    """
+    grupos: Dict[tuple, list] = {}
+    for idx, cont in enumerate(contab_list):
+        grupos.setdefault(('data_mov', cont['data_mov']), []).append((cont['valor_liq'], idx))
+        grupos.setdefault(('data_valor', cont['data_valor']), []).append((cont['valor_liq'], idx))
+
+    indice = {}
+    for chave, itens in grupos.items():
+        itens.sort()
+        indice[chave] = ([v for v, _ in itens], [i for _, i in itens])
+    return indice
+
+
+def candidatos_indice(indice: Dict[tuple, tuple], ext: Dict[str, Any], valor_tolerancia: float) -> List[int]:
+    """Posições da contabilidade com a mesma data_mov/data_valor e valor dentro da janela de tolerância."""
+    candidatos = set()
+    for chave in (('data_mov', ext['data_mov']), ('data_valor', ext['data_valor'])):
+        entrada = indice.get(chave)
+        if entrada is None:
+            continue
+        valores, posicoes = entrada
+        ini = bisect_left(valores, ext['valor_liq'] - valor_tolerancia - _FOLGA_JANELA)
+        fim = bisect_right(valores, ext['valor_liq'] + valor_tolerancia + _FOLGA_JANELA)
+        candidatos.update(posicoes[ini:fim])
+    # mantém a ordem original para o desempate ser igual ao da varredura completa
+    return sorted(candidatos)
+
+
+def conciliar_listas(
+    extrato_list: List[Dict[str, Any]],
+    contab_list: List[Dict[str, Any]],
     valor_tolerancia: float = 0.01,
-    descricao_sim_threshold: float = 0.6
+    descricao_sim_threshold: float = 0.6,
+    usar_indice: bool = True,
+    usar_motor_similaridade: bool = True,
+    paralelo: Optional[bool] = None,
+    max_workers: Optional[int] = None,
+    tamanho_particao: int = TAMANHO_PARTICAO
 ) -> Dict[str, Any]:
-    extrato = db.query(MovimentacaoBAI).filter(MovimentacaoBAI.execucao_id == execucao_id).all()
-    contab = db.query(MovimentacaoContabilidade).filter(MovimentacaoContabilidade.execucao_id == execucao_id).all()
+    """
+    Conciliação gulosa: cada movimento do extrato fica com o melhor movimento
+    contabilístico ainda livre. Com usar_indice=False percorre a contabilidade
+    inteira para cada linha (caminho antigo, útil para comparar resultados).
+    Com usar_motor_similaridade=True os candidatos de cada linha passam primeiro pelo
+    limite superior em bloco do MotorSimilaridade e só os que podem chegar ao threshold
+    são pontuados por similaridade_desc: o resultado é o mesmo de False (par a par).
 
-    def format_data(d):
-        if not d:
-            return None
-        if isinstance(d, datetime):
-            return d.strftime('%Y-%m-%d')
-        for fmt in ('%Y-%m-%d', '%d/%m/%Y'):
-            try:
-                return datetime.strptime(d, fmt).strftime('%Y-%m-%d')
-            except:
-                pass
-        return d
-
-    def to_dict_list(registros):
-        return [{
-            'id': r.id,
-            'data_mov': format_data(r.data_mov),
-            'data_valor': format_data(r.data_valor),
-            'descritivo': (r.descritivo or "").upper().strip(),
-            'debito': float(r.debito or 0),
-            'credito': float(r.credito or 0),
-            'saldo': float(r.saldo or 0)
-        } for r in registros]
-
-    extrato_list = to_dict_list(extrato)
-    contab_list = to_dict_list(contab)
+    Com paralelo=True o extrato é dividido em partições de datas (tamanho_particao linhas),
+    cada uma com os movimentos da contabilidade das suas datas, e a pontuação corre num pool
+    de max_workers processos (usa sempre o índice). A escolha gulosa continua na ordem
+    original, por isso o resultado é o mesmo do modo sequencial. paralelo=None só
+    paraleliza acima de LIMIAR_PARALELO linhas.
+    """
+    with escopo_execucao() as escopo:
+        resultado = _conciliar_listas(extrato_list, contab_list, valor_tolerancia,
+                                      descricao_sim_threshold, usar_indice, usar_motor_similaridade,
+                                      paralelo, max_workers, tamanho_particao)
+    resultado['cache'] = escopo.estatisticas()
+    return resultado
 
+
+def _conciliar_listas(
+    extrato_list: List[Dict[str, Any]],
+    contab_list: List[Dict[str, Any]],
+    valor_tolerancia: float,
+    descricao_sim_threshold: float,
+    usar_indice: bool,
+    usar_motor_similaridade: bool,
+    paralelo: Optional[bool],
+    max_workers: Optional[int],
+    tamanho_particao: int
+) -> Dict[str, Any]:
     for r in extrato_list:
         r['valor_liq'] = r['credito'] - r['debito']
     for r in contab_list:
         r['valor_liq'] = r['credito'] - r['debito']
 
+    n_ext = len(extrato_list)
+    motor = None
+    candidatos_linhas = None
+    pre_sims = None
+
+    if usar_paralelo(paralelo, n_ext + len(contab_list), max_workers):
+        indice = indexar_contabilidade(contab_list)
+        candidatos_linhas = [np.array(candidatos_indice(indice, ext, valor_tolerancia), dtype=np.int64)
+                             for ext in extrato_list]
+        particoes = particionar_por_data(np.array([ext['data_mov'] or '\uffff' for ext in extrato_list], dtype=str),
+                                         tamanho_particao)
+        pre_sims = pontuar_particoes(particoes,
+                                     [r['descritivo'] for r in extrato_list],
+                                     [r['descritivo'] for r in contab_list],
+                                     candidatos_linhas, similaridade_desc, max_workers=max_workers,
+                                     limiar=descricao_sim_threshold if usar_motor_similaridade else None,
+                                     normalizar=texto_bruto)
+    else:
+        indice = indexar_contabilidade(contab_list) if usar_indice else None
+    todos = range(len(contab_list))
+
+    if usar_motor_similaridade and pre_sims is None:
+        motor = MotorSimilaridade([r['descritivo'] for r in extrato_list] + [r['descritivo'] for r in contab_list],
+                                  exata=similaridade_desc, normalizar=texto_bruto)
+
     usados_contab = set()
     conciliados = []
 
-    def similaridade_desc(a, b):
-        return SequenceMatcher(None, a, b).ratio() if a and b else 0
-
-    for ext in extrato_list:
+    for i_ext, ext in enumerate(extrato_list):
         melhor_match = None
         melhor_pontuacao = -1
 
-        for idx_cont, cont in enumerate(contab_list):
+        if candidatos_linhas is not None:
+            candidatos = candidatos_linhas[i_ext].tolist()
+        else:
+            candidatos = candidatos_indice(indice, ext, valor_tolerancia) if usar_indice else todos
+
+        validos = []
+        manter = []
+        for k, idx_cont in enumerate(candidatos):
             if idx_cont in usados_contab:
                 continue
+            cont = contab_list[idx_cont]
 
             diff_valor = abs(ext['valor_liq'] - cont['valor_liq'])
             if diff_valor > valor_tolerancia:
@@ -69,11 +182,23 @@ def conciliar_movimentos_db(
             datas_iguais = ext['data_mov'] == cont['data_mov'] or ext['data_valor'] == cont['data_valor']
             if not datas_iguais:
                 continue
+            validos.append(idx_cont)
+            manter.append(k)
 
-            sim_desc = similaridade_desc(ext['descritivo'], cont['descritivo'])
+        if not validos:
+            continue
+        if pre_sims is not None:
+            sims = pre_sims[i_ext][manter]
+        elif motor is not None:
+            sims = motor.pontuar(i_ext, [n_ext + idx for idx in validos], descricao_sim_threshold)
+        else:
+            sims = [similaridade_desc(ext['descritivo'], contab_list[idx]['descritivo']) for idx in validos]
+
+        for idx_cont, sim_desc in zip(validos, sims):
             if sim_desc < descricao_sim_threshold:
                 continue
 
+            diff_valor = abs(ext['valor_liq'] - contab_list[idx_cont]['valor_liq'])
             pontuacao = (1 - diff_valor) + sim_desc
             if pontuacao > melhor_pontuacao:
                 melhor_pontuacao = pontuacao
@@ -115,3 +240,30 @@ def conciliar_movimentos_db(
             'somente_contabilidade': len(somente_contab)
         }
     }
+
+
+def conciliar_movimentos_db(
+    db: Session,
+    execucao_id: int,
+    valor_tolerancia: float = 0.01,
+    descricao_sim_threshold: float = 0.6,
+    usar_indice: bool = True,
+    usar_motor_similaridade: bool = True,
+    paralelo: Optional[bool] = None,
+    max_workers: Optional[int] = None,
+    tamanho_particao: int = TAMANHO_PARTICAO
+) -> Dict[str, Any]:
+    extrato = db.query(MovimentacaoBAI).filter(MovimentacaoBAI.execucao_id == execucao_id).all()
+    contab = db.query(MovimentacaoContabilidade).filter(MovimentacaoContabilidade.execucao_id == execucao_id).all()
+
+    return conciliar_listas(
+        to_dict_list(extrato),
+        to_dict_list(contab),
+        valor_tolerancia=valor_tolerancia,
+        descricao_sim_threshold=descricao_sim_threshold,
+        usar_indice=usar_indice,
+        usar_motor_similaridade=usar_motor_similaridade,
+        paralelo=paralelo,
+        max_workers=max_workers,
+        tamanho_particao=tamanho_particao
+    )
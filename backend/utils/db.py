@@ -12,19 +12,37 @@ DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 
-SQLALCHEMY_DATABASE_URL = URL.create(
-    drivername="mysql+pymysql",
-    username=DB_USER,
-    password=DB_PASSWORD,
-    host=DB_HOST,
-    port=int(DB_PORT),
-    database=DB_NAME,
-)
+# DATABASE_URL (ex.: sqlite:///bench.db) substitui a ligação MySQL — usado nos benchmarks, offline
+DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
+if DATABASE_URL:
+    SQLALCHEMY_DATABASE_URL = DATABASE_URL
+else:
+    SQLALCHEMY_DATABASE_URL = URL.create(
+        drivername="mysql+pymysql",
+        username=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=int(DB_PORT),
+        database=DB_NAME,
+    )
+
+# Em SQLite a mesma ligação pode ser usada pelos jobs (outras threads)
+_connect_args = {"check_same_thread": False} if str(SQLALCHEMY_DATABASE_URL).startswith("sqlite") else {}
+engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True, connect_args=_connect_args)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
+def inserir_em_lotes(db, modelo, registros, tamanho_lote: int = 5000) -> int:
+    """
+    INSERT em massa (executemany com várias linhas por instrução), em lotes de tamanho_lote.
+    Não faz commit: a transação pertence a quem chama.
+    """
+    tabela = modelo.__table__
+    for i in range(0, len(registros), tamanho_lote):
+        db.execute(tabela.insert(), registros[i:i + tamanho_lote])
+    return len(registros)
+
 def get_db():
     db = SessionLocal()
     try:
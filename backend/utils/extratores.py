@@ -1,30 +1,122 @@
-from sqlalchemy.orm import Session
-from models.user_model import MovimentacaoBAI
+import logging
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+
 import camelot
 import pandas as pd
-from utils.db import SessionLocal
-from models.user_model import MovimentacaoContabilidade
-from datetime import datetime
-from decimal import Decimal
+import pypdfium2
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+# Páginas por tarefa no modo paralelo
+PAGINAS_POR_LOTE = int(os.getenv("BAI_PAGINAS_POR_LOTE", "4"))
+# O modo automático só paraleliza a partir daqui: cada worker (spawn) reimporta camelot/OpenCV,
+# o que num extrato típico de 5-20 páginas custa mais do que poupa
+PAGINAS_MIN_PARALELO = int(os.getenv("BAI_PAGINAS_MIN_PARALELO", "40"))
+
+logger = logging.getLogger(__name__)
 
-def extrair_dados_bai(pdf_path: str) -> pd.DataFrame:
-    tabelas = camelot.read_pdf(pdf_path, pages="all", flavor="stream")
-    tabelas_validas = [t.df for t in tabelas if t.df.shape[1] == 6]
+
+def contar_paginas_pdf(pdf_path: str) -> int:
+    pdf = pypdfium2.PdfDocument(pdf_path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def _extrair_paginas_bai(pdf_path: str, paginas: List[int]) -> Tuple[List[Tuple[int, pd.DataFrame]], List[int]]:
+    """
+    Lê as tabelas de 6 colunas de um intervalo de páginas. Se o intervalo falhar,
+    tenta página a página para que uma página má não estrague as restantes.
+    Devolve ([(pagina, df)], paginas_com_erro).
+    """
+    def ler(spec: str):
+        tabelas = camelot.read_pdf(pdf_path, pages=spec, flavor="stream")
+        return [(int(t.page), t.df) for t in tabelas if t.df.shape[1] == 6]
+
+    try:
+        return ler(f"{paginas[0]}-{paginas[-1]}"), []
+    except Exception:
+        tabelas, falhas = [], []
+        for pagina in paginas:
+            try:
+                tabelas.extend(ler(str(pagina)))
+            except Exception as e:
+                logger.warning("⚠ Página %s ignorada: %s", pagina, e)
+                falhas.append(pagina)
+        return tabelas, falhas
+
+
+def extrair_dados_bai(
+    pdf_path: str,
+    paralelo: Optional[bool] = None,
+    max_workers: Optional[int] = None,
+    paginas_por_lote: int = PAGINAS_POR_LOTE,
+    progresso: Optional[Callable[[int, int], None]] = None
+) -> pd.DataFrame:
+    """
+    Extrai o extrato BAI em lotes de paginas_por_lote páginas, concatenando as tabelas por
+    ordem de página. Com paralelo=True os lotes são lidos num pool de processos;
+    paralelo=None só o faz a partir de PAGINAS_MIN_PARALELO páginas.
+    progresso(paginas_concluidas, total_paginas) é chamado à medida que os lotes terminam.
+    As páginas que falharem ficam em df.attrs["paginas_com_erro"] (processar_contabil devolve-as no resumo).
+    """
+    total = contar_paginas_pdf(pdf_path)
+    paginas = list(range(1, total + 1))
+    lotes = [paginas[i:i + paginas_por_lote] for i in range(0, total, max(1, paginas_por_lote))]
+    if paralelo is None:
+        paralelo = total >= PAGINAS_MIN_PARALELO
+
+    encontradas: List[Tuple[int, pd.DataFrame]] = []
+    falhas: List[int] = []
+    if paralelo and len(lotes) > 1:
+        concluidas = 0
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+            futuros = {pool.submit(_extrair_paginas_bai, pdf_path, lote): lote for lote in lotes}
+            for futuro in as_completed(futuros):
+                lote = futuros[futuro]
+                try:
+                    tabelas, erros = futuro.result()
+                except Exception as e:  # worker perdido: o lote inteiro fica marcado
+                    logger.warning("⚠ Páginas %s-%s ignoradas: %s", lote[0], lote[-1], e)
+                    tabelas, erros = [], lote
+                encontradas.extend(tabelas)
+                falhas.extend(erros)
+                concluidas += len(lote)
+                if progresso:
+                    progresso(concluidas, total)
+    else:
+        concluidas = 0
+        for lote in lotes:
+            tabelas, erros = _extrair_paginas_bai(pdf_path, lote)
+            encontradas.extend(tabelas)
+            falhas.extend(erros)
+            concluidas += len(lote)
+            if progresso:
+                progresso(concluidas, total)
+
+    # sort estável: mantém a ordem das tabelas dentro da mesma página
+    tabelas_validas = [df for _, df in sorted(encontradas, key=lambda t: t[0])]
 
     if not tabelas_validas:
-        return pd.DataFrame()
+        vazio = pd.DataFrame()
+        vazio.attrs["paginas_com_erro"] = sorted(falhas)
+        return vazio
 
     df_final = pd.concat(tabelas_validas, ignore_index=True)
     df_final.columns = df_final.iloc[0]
     df_final = df_final.drop(index=0).reset_index(drop=True)
-    print(df_final)
-    if not df_final.empty:
-        db = SessionLocal()
-        salvar_movimentacoes(db, df_final)
-        db.close()
-        print("✅ Movimentações salvas com sucesso!")
-    else:
-        print("⚠ Nenhuma movimentação encontrada.")
+    df_final.columns = df_final.columns.str.strip().str.lower()
+    df_final.attrs["paginas_com_erro"] = sorted(falhas)
+    # Dump completo só em DEBUG (a formatação é preguiçosa: sem custo nos outros níveis)
+    logger.debug("Extrato BAI extraído:\n%s", df_final)
+    if df_final.empty:
+        logger.warning("⚠ Nenhuma movimentação encontrada.")
     return df_final
 
 
@@ -63,75 +155,53 @@ def extrair_dados_contabilidade(xls_path: str) -> pd.DataFrame:
     df["credito"] = df["credito"].apply(parse_valor)
     df["saldo_disponivel"] = df["saldo_disponivel"].apply(parse_valor)
 
-    print(df.head())  # Para debug
-
-    # Salvar no banco
-    salvar_movimentacoes_contabilidade(SessionLocal(), df)
+    logger.debug("Contabilidade extraída:\n%s", df.head())
 
     return df
 
 def normalizar_data(valor):
-    if not valor:
+    if valor is None or valor == "" or pd.isna(valor):
         return None
-    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+    if isinstance(valor, datetime):  # inclui pd.Timestamp (read_excel)
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor).strip()
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%Y-%m-%d %H:%M:%S"):
         try:
-            return datetime.strptime(valor.strip(), fmt).date()
+            return datetime.strptime(texto, fmt).date()
         except ValueError:
             pass
     return None  # formato inválido
 
+CENTIMOS = Decimal("0.01")
+SEPARADOR_MILHAR = re.compile(r"-?\d{1,3}(\.\d{3})+")
+
 def normalizar_valor(valor):
-    if valor is None:
+    """Valor monetário exato (Decimal com 2 casas). Aceita '2.507,55', '2 507,55', '1.500', '-10.5' e números."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
         return Decimal("0.00")
     
     if isinstance(valor, (int, float, Decimal)):
-        return Decimal(str(valor))
-    
-    # Limpa espaços e símbolos
-    s = str(valor).strip().replace(" ", "").replace(".", "").replace(",", ".")
+        return Decimal(str(valor)).quantize(CENTIMOS)
     
-    # Remove qualquer coisa que não seja número, ponto ou sinal
-    import re
-    s = re.sub(r"[^0-9\.-]", "", s)
+    # Remove qualquer coisa que não seja número, ponto, vírgula ou sinal ('Kz', espaços)
+    s = re.sub(r"[^0-9\.,-]", "", str(valor))
+    # Com vírgula decimal os pontos são separadores de milhar. Sem vírgula, um ponto
+    # seguido de exatamente 3 dígitos também é milhar ('1.500', '-1.234.567')
+    if "," in s:
+        s = s.replace(".", "").replace(",", ".")
+    elif SEPARADOR_MILHAR.fullmatch(s):
+        s = s.replace(".", "")
     
     if s in ("", "-", ".", "-."):
         return Decimal("0.00")
     
     try:
-        return Decimal(s)
-    except Exception:
+        return Decimal(s).quantize(CENTIMOS)
+    except InvalidOperation:
         return Decimal("0.00")
 
 
 def normalizar_texto(texto):
     return str(texto).strip().upper()  # upper() ajuda na conciliação textual
-
-def salvar_movimentacoes(db: Session, df: pd.DataFrame):
-    df.columns = df.columns.str.strip().str.lower()
-
-    for _, row in df.iterrows():
-        """mov = MovimentacaoBAI(
-            data_mov=normalizar_data(row.get("data mov.", "")),
-            data_valor=normalizar_data(row.get("data valor", "")),
-            descritivo=normalizar_texto(row.get("descritivo", "")),
-            debito=normalizar_valor(row.get("débito", "")),
-            credito=normalizar_valor(row.get("crédito", "")),
-            saldo=normalizar_valor(row.get("movimento", ""))
-        )
-        db.add(mov)"""
-    db.commit()
-
-def salvar_movimentacoes_contabilidade(db: Session, df: pd.DataFrame):
-    for _, row in df.iterrows():
-        mov = MovimentacaoContabilidade(
-            data_mov=normalizar_data(row.get("data_movimento", "")),
-            data_valor=normalizar_data(row.get("data_valor", "")),
-            numero_operacao=normalizar_texto(row.get("numero_operacao", "")),
-            descritivo=normalizar_texto(row.get("descritivo", "")),
-            debito=normalizar_valor(row.get("debito", 0.0)),
-            credito=normalizar_valor(row.get("credito", 0.0)),
-            saldo=normalizar_valor(row.get("saldo_disponivel", 0.0))
-        )
-        db.add(mov)
-    db.commit()
-    print("✅ Movimentações salvas com sucesso!")
\ No newline at end of file
@@ -2,7 +2,9 @@
 import hashlib
 import platform
 import uuid
+from functools import lru_cache
 
+@lru_cache(maxsize=None)  # não muda durante a execução
 def get_machine_id() -> str:
     # Junta várias características do sistema
     info = (
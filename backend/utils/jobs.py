@@ -0,0 +1,239 @@
+# utils/jobs.py
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Quantos processamentos pesados correm ao mesmo tempo; os restantes ficam em fila
+MAX_JOBS_CONCORRENTES = int(os.getenv("JOBS_MAX_CONCORRENTES", "2"))
+# Jobs terminados guardados em memória para consulta
+MAX_JOBS_GUARDADOS = int(os.getenv("JOBS_MAX_GUARDADOS", "200"))
+# Estado de cada job em disco: sobrevive a um reinício e é visível para os outros workers
+JOBS_DIR = os.getenv("JOBS_DIR", "uploads/jobs")
+
+ESTADOS_TERMINAIS = ("concluido", "erro")
+ERRO_INTERROMPIDO = "Processamento interrompido: o servidor reiniciou antes de o job terminar"
+_ID_JOB = re.compile(r"[0-9a-f]{32}")
+
+
+class Job:
+    def __init__(self, tipo: str):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.estado = "pendente"  # pendente | em_execucao | concluido | erro
+        self.etapa = "na_fila"
+        self.progresso = 0.0
+        self.resultado: Any = None
+        self.erro: Optional[str] = None
+        self.criado_em = datetime.now()
+        self.atualizado_em = self.criado_em
+        # processo dono do job: quem arrancar depois dele e o encontrar por terminar marca-o como erro
+        self.pid = os.getpid()
+        self.instancia: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def atualizar(self, etapa: Optional[str] = None, progresso: Optional[float] = None):
+        with self._lock:
+            if etapa is not None:
+                self.etapa = etapa
+            if progresso is not None:
+                self.progresso = max(0.0, min(1.0, float(progresso)))
+            self.atualizado_em = datetime.now()
+
+    def to_dict(self, incluir_resultado: bool = True) -> Dict[str, Any]:
+        with self._lock:
+            dados = {
+                "id": self.id,
+                "tipo": self.tipo,
+                "estado": self.estado,
+                "etapa": self.etapa,
+                "progresso": round(self.progresso, 3),
+                "erro": self.erro,
+                "criado_em": self.criado_em,
+                "atualizado_em": self.atualizado_em,
+            }
+            if incluir_resultado and self.estado == "concluido":
+                dados["resultado"] = self.resultado
+            return dados
+
+    @classmethod
+    def de_registo(cls, registo: Dict[str, Any]) -> "Job":
+        job = cls(registo["tipo"])
+        job.id = registo["id"]
+        job.estado = registo["estado"]
+        job.etapa = registo["etapa"]
+        job.progresso = registo["progresso"]
+        job.erro = registo.get("erro")
+        job.resultado = registo.get("resultado")
+        job.criado_em = datetime.fromisoformat(registo["criado_em"])
+        job.atualizado_em = datetime.fromisoformat(registo["atualizado_em"])
+        job.pid = registo.get("pid")
+        job.instancia = registo.get("instancia")
+        return job
+
+
+def _processo_vivo(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # existe, mas é de outro utilizador
+        return True
+    return True
+
+
+class GestorJobs:
+    """
+    Fila de jobs executada por um pool local de threads (o event loop fica livre para I/O).
+
+    Limite: os jobs correm neste processo, por isso o trabalho em Python puro (extração,
+    conciliação) disputa o GIL com o event loop e os pedidos ficam mais lentos enquanto um
+    job corre. A pontuação de conciliações grandes já sai do processo (utils.paralelo, acima
+    de CONCILIACAO_LIMIAR_PARALELO linhas); para isolar mais, correr vários workers do uvicorn.
+
+    O estado de cada job é gravado em JOBS_DIR nas mudanças de estado. Um job que ficou por
+    terminar num processo que já não existe (reinício, crash) é marcado como erro por
+    recuperar_interrompidos(), chamado no arranque, para quem o consulta ter um estado final.
+    """
+
+    def __init__(self, max_workers: int = MAX_JOBS_CONCORRENTES, max_guardados: int = MAX_JOBS_GUARDADOS,
+                 pasta: str = JOBS_DIR):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._max_guardados = max_guardados
+        self._pasta = pasta
+        # distingue este arranque de um anterior com o mesmo pid (ex.: pid 1 num contentor)
+        self._instancia = uuid.uuid4().hex
+        self._lock = threading.Lock()
+
+    def submeter(self, tipo: str, func: Callable[..., Any], *args, **kwargs) -> Job:
+        """Agenda func(job, *args, **kwargs); o valor devolvido fica em job.resultado."""
+        job = Job(tipo)
+        job.instancia = self._instancia
+        with self._lock:
+            self._jobs[job.id] = job
+            self._limpar()
+        self._persistir(job)
+        self._pool.submit(self._executar, job, func, args, kwargs)
+        return job
+
+    def obter(self, job_id: str) -> Optional[Job]:
+        """Job deste processo ou, se não estiver em memória, o estado gravado em disco."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        registo = self._ler(job_id)
+        if registo is None:
+            return None
+        job = Job.de_registo(registo)
+        if job.estado not in ESTADOS_TERMINAIS and self._interrompido(job):
+            self._marcar_interrompido(job)
+        return job
+
+    def recuperar_interrompidos(self) -> int:
+        """
+        Marca como erro os jobs gravados que ficaram por terminar num processo que já acabou
+        e apaga os registos terminados mais antigos acima de max_guardados.
+        """
+        if not os.path.isdir(self._pasta):
+            return 0
+        interrompidos = 0
+        terminados = []
+        for nome in os.listdir(self._pasta):
+            job_id, ext = os.path.splitext(nome)
+            registo = self._ler(job_id) if ext == ".json" else None
+            if registo is None:
+                continue
+            if registo["estado"] in ESTADOS_TERMINAIS:
+                terminados.append((registo["atualizado_em"], job_id))
+                continue
+            job = Job.de_registo(registo)
+            if self._interrompido(job):
+                self._marcar_interrompido(job)
+                interrompidos += 1
+        for _, job_id in sorted(terminados)[:max(0, len(terminados) - self._max_guardados)]:
+            self._remover(job_id)
+        if interrompidos:
+            logger.warning("⚠ %d job(s) interrompidos pelo reinício marcados como erro", interrompidos)
+        return interrompidos
+
+    def _interrompido(self, job: Job) -> bool:
+        if job.pid == os.getpid():
+            return job.instancia != self._instancia
+        return not _processo_vivo(job.pid)
+
+    def _marcar_interrompido(self, job: Job):
+        job.estado = "erro"
+        job.erro = ERRO_INTERROMPIDO
+        job.atualizar()
+        self._persistir(job)
+
+    def _executar(self, job: Job, func, args, kwargs):
+        job.estado = "em_execucao"
+        job.atualizar(etapa="inicio")
+        self._persistir(job)
+        try:
+            job.resultado = func(job, *args, **kwargs)
+            job.estado = "concluido"
+            job.atualizar(etapa="concluido", progresso=1.0)
+        except Exception as e:
+            logger.exception("❌ Erro no job %s %s", job.tipo, job.id)
+            job.erro = str(e)
+            job.estado = "erro"
+            job.atualizar()
+        self._persistir(job)
+
+    def _caminho(self, job_id: str) -> str:
+        return os.path.join(self._pasta, f"{job_id}.json")
+
+    def _persistir(self, job: Job):
+        """Grava o estado do job (escrita atómica); uma falha de disco não interrompe o job."""
+        registo = job.to_dict()
+        registo.update(criado_em=job.criado_em.isoformat(), atualizado_em=job.atualizado_em.isoformat(),
+                       pid=job.pid, instancia=job.instancia)
+        try:
+            os.makedirs(self._pasta, exist_ok=True)
+            temp = f"{self._caminho(job.id)}.{uuid.uuid4().hex}.tmp"
+            with open(temp, "w", encoding="utf-8") as f:
+                json.dump(registo, f, default=str)
+            os.replace(temp, self._caminho(job.id))
+        except OSError:
+            logger.exception("⚠ Não foi possível gravar o estado do job %s", job.id)
+
+    def _ler(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not _ID_JOB.fullmatch(job_id):
+            return None
+        try:
+            with open(self._caminho(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _limpar(self):
+        """Descarta os jobs terminados mais antigos acima de max_guardados (memória e disco)."""
+        excesso = len(self._jobs) - self._max_guardados
+        if excesso <= 0:
+            return
+        for job_id in [j.id for j in self._jobs.values() if j.estado in ESTADOS_TERMINAIS][:excesso]:
+            del self._jobs[job_id]
+            self._remover(job_id)
+
+    def _remover(self, job_id: str):
+        try:
+            os.remove(self._caminho(job_id))
+        except OSError:
+            pass
+
+
+gestor_jobs = GestorJobs()
@@ -0,0 +1,106 @@
+# utils/json_rapido.py
+import datetime
+import decimal
+import json
+import math
+import sys
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from fastapi.responses import JSONResponse
+
+if TYPE_CHECKING:  # só para as anotações: o pandas continua a ser importado sob pedido
+    import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # sem orjson usa-se o json da biblioteca padrão (mais lento, mesmo resultado)
+    orjson = None
+
+
+def registos(df: "pd.DataFrame") -> List[Dict[str, Any]]:
+    """
+    DataFrame -> lista de dicts com tipos nativos e None no lugar de NaN/NaT.
+    Converte coluna a coluna (vetorizado), em vez de valor a valor.
+    """
+    import pandas as pd
+
+    nomes = [str(c) for c in df.columns]
+    colunas = []
+    for c in df.columns:
+        serie = df[c]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            # datetime nativo (serializado diretamente) em vez de Timestamp (que passaria por _padrao)
+            valores = pd.Series(serie.dt.to_pydatetime(), dtype=object, index=serie.index)
+        else:
+            valores = serie.astype(object)
+        if serie.hasnans:
+            valores = valores.where(serie.notna(), None)
+        colunas.append(valores.tolist())
+    return [dict(zip(nomes, linha)) for linha in zip(*colunas)]
+
+
+def _padrao(obj: Any) -> Any:
+    """
+    Tipos que o serializador não conhece diretamente. pandas/numpy não são importados aqui:
+    se ainda não estiverem carregados, o objeto não pode ser deles.
+    """
+    pd = sys.modules.get("pandas")
+    np = sys.modules.get("numpy")
+    if pd is not None:
+        if isinstance(obj, pd.DataFrame):
+            return registos(obj)
+        if isinstance(obj, pd.Series):
+            return obj.astype(object).where(obj.notna(), None).tolist()
+        if obj is pd.NaT:
+            return None
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if np is not None:
+        if isinstance(obj, np.generic):
+            valor = obj.item()
+            return None if isinstance(valor, float) and math.isnan(valor) else valor
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Tipo não serializável em JSON: {type(obj).__name__}")
+
+
+def _sem_nan(obj: Any) -> Any:
+    """Só para o caminho sem orjson: o json padrão escreveria NaN (JSON inválido)."""
+    if isinstance(obj, float):
+        return None if math.isnan(obj) or math.isinf(obj) else obj
+    if isinstance(obj, dict):
+        return {k: _sem_nan(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_sem_nan(v) for v in obj]
+    return obj
+
+
+if orjson is not None:
+    _OPCOES = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def conteudo_json(obj: Any) -> bytes:
+        """Serializa para bytes UTF-8; NaN/Infinity saem como null."""
+        return orjson.dumps(obj, default=_padrao, option=_OPCOES)
+else:
+    def conteudo_json(obj: Any) -> bytes:
+        """Serializa para bytes UTF-8; NaN/Infinity saem como null."""
+        try:
+            texto = json.dumps(obj, default=_padrao, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+        except ValueError:  # há floats NaN/Infinity: normaliza e tenta de novo
+            texto = json.dumps(_sem_nan(json.loads(json.dumps(obj, default=_padrao))),
+                               ensure_ascii=False, separators=(",", ":"))
+        return texto.encode("utf-8")
+
+
+class RespostaJSON(JSONResponse):
+    """
+    JSONResponse que aceita DataFrames, listas de registos, NaN, datas e escalares numpy.
+    Devolver a resposta diretamente (return RespostaJSON(dados)) evita também o jsonable_encoder do FastAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return conteudo_json(content)
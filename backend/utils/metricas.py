@@ -0,0 +1,83 @@
+# utils/metricas.py
+"""
+Cronómetros por etapa e histogramas agregados, expostos em /metrics no formato de texto do Prometheus.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+BALDES_SEGUNDOS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BALDES_LINHAS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class Histograma:
+    """Histograma cumulativo por etiqueta `etapa` (contagens por balde, soma e total)."""
+
+    def __init__(self, nome: str, ajuda: str, baldes: Sequence[float]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.baldes = tuple(baldes)
+        self._series: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, etapa: str) -> None:
+        with self._lock:
+            serie = self._series.get(etapa)
+            if serie is None:
+                serie = self._series[etapa] = {"baldes": [0] * len(self.baldes), "soma": 0.0, "total": 0}
+            i = bisect.bisect_left(self.baldes, valor)
+            if i < len(self.baldes):
+                serie["baldes"][i] += 1
+            serie["soma"] += valor
+            serie["total"] += 1
+
+    def exposicao(self) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        with self._lock:
+            series = {etapa: {**s, "baldes": list(s["baldes"])} for etapa, s in self._series.items()}
+        for etapa, serie in sorted(series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.baldes, serie["baldes"]):
+                acumulado += contagem
+                linhas.append(f'{self.nome}_bucket{{etapa="{etapa}",le="{limite:g}"}} {acumulado}')
+            linhas.append(f'{self.nome}_bucket{{etapa="{etapa}",le="+Inf"}} {serie["total"]}')
+            linhas.append(f'{self.nome}_sum{{etapa="{etapa}"}} {serie["soma"]:.6f}')
+            linhas.append(f'{self.nome}_count{{etapa="{etapa}"}} {serie["total"]}')
+        return linhas
+
+
+DURACAO_ETAPA = Histograma(
+    "contacerta_etapa_duracao_segundos", "Duração de cada etapa do processamento", BALDES_SEGUNDOS)
+LINHAS_ETAPA = Histograma(
+    "contacerta_etapa_linhas", "Linhas processadas em cada etapa", BALDES_LINHAS)
+HISTOGRAMAS = (DURACAO_ETAPA, LINHAS_ETAPA)
+
+
+@contextmanager
+def cronometro(etapa: str, duracoes: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """Mede o bloco, regista-o no histograma da etapa e soma a duração em duracoes[etapa]."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        DURACAO_ETAPA.observar(duracao, etapa)
+        if duracoes is not None:
+            duracoes[etapa] = duracoes.get(etapa, 0.0) + duracao
+        logger.info("⏱ %s: %.3fs", etapa, duracao)
+
+
+def contar_linhas(etapa: str, linhas: int) -> None:
+    LINHAS_ETAPA.observar(linhas, etapa)
+
+
+def texto_prometheus() -> str:
+    linhas = []
+    for histograma in HISTOGRAMAS:
+        linhas.extend(histograma.exposicao())
+    return "\n".join(linhas) + "\n"
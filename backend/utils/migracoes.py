@@ -0,0 +1,157 @@
+# utils/migracoes.py
+"""
+Migração das tabelas de movimentos para o schema tipado (datas DATE, valores DECIMAL,
+coluna `valor` líquido e índices compostos) e colunas novas das execuções.
+Idempotente e retomável: pode correr em cada arranque, mesmo depois de uma migração interrompida.
+
+Uso manual: python -m utils.migracoes
+"""
+import logging
+import os
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.types import Date, Float, Numeric
+
+from models.user_model import ExecucaoReconciliacao, MovimentacaoBAI, MovimentacaoContabilidade
+
+TABELAS_MOVIMENTOS = (MovimentacaoBAI, MovimentacaoContabilidade)
+TAMANHO_LOTE = 5000
+
+logger = logging.getLogger(__name__)
+
+
+def _colunas(engine: Engine, tabela: str) -> dict:
+    return {c["name"]: c for c in inspect(engine).get_columns(tabela)}
+
+
+def _valores_por_converter(colunas: dict) -> list:
+    """Colunas de valores que ainda não são DECIMAL (Float conta como por converter)."""
+    return [c for c in ("debito", "credito", "saldo") if c in colunas and (
+        not isinstance(colunas[c]["type"], Numeric) or isinstance(colunas[c]["type"], Float))]
+
+
+def _converter_linhas(engine: Engine, tabela: str) -> int:
+    """
+    Copia data_mov/data_valor (texto) para colunas DATE temporárias e calcula `valor`, em lotes.
+    Só converte as linhas ainda sem data_mov_tmp, para retomar uma migração interrompida.
+    """
+    from utils.extratores import normalizar_data, normalizar_valor  # pandas/camelot só se houver migração
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        with engine.begin() as conn:
+            # o cursor por id garante que datas que não convertem (ficam NULL) não são relidas nesta passagem
+            linhas = conn.execute(
+                text(f"SELECT id, data_mov, data_valor, debito, credito FROM {tabela} "
+                     f"WHERE id > :ultimo AND data_mov_tmp IS NULL ORDER BY id LIMIT {TAMANHO_LOTE}"),
+                {"ultimo": ultimo_id},
+            ).all()
+            if not linhas:
+                return total
+            conn.execute(
+                text(f"UPDATE {tabela} SET data_mov_tmp = :data_mov, data_valor_tmp = :data_valor, "
+                     f"valor = :valor WHERE id = :id"),
+                [{
+                    "id": l.id,
+                    "data_mov": normalizar_data(l.data_mov),
+                    "data_valor": normalizar_data(l.data_valor),
+                    "valor": normalizar_valor(l.credito) - normalizar_valor(l.debito),
+                } for l in linhas],
+            )
+        total += len(linhas)
+        ultimo_id = linhas[-1].id
+
+
+def _migrar_tabela(engine: Engine, modelo) -> None:
+    """
+    O DDL do MySQL não é transacional: cada passo confirma o schema atual antes de correr,
+    para que uma migração interrompida seja retomada no arranque seguinte.
+    """
+    tabela = modelo.__tablename__
+    if tabela not in inspect(engine).get_table_names():
+        return
+    colunas = _colunas(engine, tabela)
+    temporarias = ("data_mov_tmp", "data_valor_tmp")
+
+    em_curso = any(c in colunas for c in temporarias)
+    tipada = "data_mov" in colunas and isinstance(colunas["data_mov"]["type"], Date)
+    if not em_curso and tipada and not _valores_por_converter(colunas):
+        if "valor" not in colunas:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN valor NUMERIC(18,2) NULL"))
+                conn.execute(text(f"UPDATE {tabela} SET valor = COALESCE(credito, 0) - COALESCE(debito, 0)"))
+        return
+
+    if engine.dialect.name != "mysql":
+        raise RuntimeError(f"Migração de {tabela} só é suportada em MySQL")
+    logger.info("🔧 A migrar %s para datas/valores tipados%s...", tabela, " (a retomar)" if em_curso or tipada else "")
+
+    # 1. colunas temporárias e `valor` (só as que faltam, uma de cada vez)
+    novas = [] if tipada else [f"ADD COLUMN {c} DATE NULL" for c in temporarias if c not in colunas]
+    if "valor" not in colunas:
+        novas.append("ADD COLUMN valor DECIMAL(18,2) NULL")
+    for nova in novas:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {tabela} {nova}"))
+    if novas:
+        colunas = _colunas(engine, tabela)
+
+    # 2. conversão (só enquanto as colunas de texto ainda existem: depois do DROP já terminou)
+    convertidas = 0
+    if all(c in colunas for c in ("data_mov", "data_valor") + temporarias):
+        convertidas = _converter_linhas(engine, tabela)
+
+    # 3. troca de colunas, um passo de cada vez
+    for coluna in ("data_mov", "data_valor"):
+        temporaria = f"{coluna}_tmp"
+        if temporaria not in _colunas(engine, tabela):
+            continue
+        with engine.begin() as conn:
+            if coluna in _colunas(engine, tabela):
+                conn.execute(text(f"ALTER TABLE {tabela} DROP COLUMN {coluna}"))
+            conn.execute(text(f"ALTER TABLE {tabela} RENAME COLUMN {temporaria} TO {coluna}"))
+
+    # 4. valores em DECIMAL
+    colunas = _colunas(engine, tabela)
+    modificar = [f"MODIFY {c} DECIMAL(18,2)" for c in _valores_por_converter(colunas)]
+    if modificar:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {tabela} {', '.join(modificar)}"))
+    logger.info("✅ %s: %s linhas migradas", tabela, convertidas)
+
+
+def _adicionar_colunas_em_falta(engine: Engine, modelo) -> None:
+    """Acrescenta (NULL) as colunas do modelo que a tabela existente ainda não tem."""
+    tabela = modelo.__tablename__
+    insp = inspect(engine)
+    if tabela not in insp.get_table_names():
+        return
+    existentes = {c["name"] for c in insp.get_columns(tabela)}
+    em_falta = [c for c in modelo.__table__.columns if c.name not in existentes]
+    if not em_falta:
+        return
+    with engine.begin() as conn:
+        for coluna in em_falta:
+            tipo = coluna.type.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna.name} {tipo} NULL"))
+    logger.info("🔧 %s: colunas adicionadas (%s)", tabela, ", ".join(c.name for c in em_falta))
+
+
+def migrar_schema(engine: Engine) -> None:
+    for modelo in TABELAS_MOVIMENTOS:
+        _migrar_tabela(engine, modelo)
+    # métricas por execução (durações e linhas)
+    _adicionar_colunas_em_falta(engine, ExecucaoReconciliacao)
+    # create_all não cria índices em tabelas que já existiam
+    for modelo in TABELAS_MOVIMENTOS + (ExecucaoReconciliacao,):
+        for indice in modelo.__table__.indexes:
+            indice.create(bind=engine, checkfirst=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    from utils.db import Base, engine
+    Base.metadata.create_all(bind=engine)
+    migrar_schema(engine)
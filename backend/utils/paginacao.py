@@ -0,0 +1,88 @@
+# utils/paginacao.py
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+from utils.cache import CacheLRU
+from utils.json_rapido import conteudo_json
+
+LIMITE_PADRAO = 100
+LIMITE_MAX = 1000
+LINHAS_POR_BLOCO_NDJSON = 500
+# Totais filtrados já contados, por (resultado, versão, categoria, critérios do filtro)
+MAX_TOTAIS_FILTRADOS = 256
+
+_totais_filtrados = CacheLRU(MAX_TOTAIS_FILTRADOS)
+_totais_lock = threading.Lock()
+
+Filtro = Optional[Callable[[Dict[str, Any]], bool]]
+
+
+def _posicao(cursor: Optional[str]) -> int:
+    """O cursor é a posição (opaca para o cliente) do próximo item na lista guardada."""
+    if not cursor:
+        return 0
+    posicao = int(cursor)
+    if posicao < 0:
+        raise ValueError("cursor inválido")
+    return posicao
+
+
+def _total_filtrado(itens: List[Dict[str, Any]], filtro: Filtro, chave: Optional[Hashable]) -> int:
+    """Itens que passam o filtro; com `chave` a contagem é feita uma vez e reutilizada nas páginas seguintes."""
+    if filtro is None:
+        return len(itens)
+    if chave is not None:
+        with _totais_lock:
+            total = _totais_filtrados.get(chave)
+        if total is not None:
+            return total
+    total = sum(1 for item in itens if filtro(item))
+    if chave is not None:
+        with _totais_lock:
+            _totais_filtrados.put(chave, total)
+    return total
+
+
+def paginar(itens: List[Dict[str, Any]], cursor: Optional[str] = None, limite: int = LIMITE_PADRAO,
+            filtro: Filtro = None, chave_total: Optional[Hashable] = None) -> Dict[str, Any]:
+    """
+    Página de até `limite` itens (que passam o filtro) a partir do cursor.
+    Os resultados guardados não mudam, por isso o cursor continua válido entre pedidos.
+
+    `total` é o tamanho da lista completa e `total_filtrado` o número de itens que passam
+    o filtro (igual a `total` sem filtro). Com filtros, "N de total" e o número de páginas
+    devem usar `total_filtrado`. O frontend não envia filtros: conta as páginas pelo resumo
+    da execução, que coincide com `total`. `chave_total` identifica a lista guardada (com a
+    versão) e o filtro: o total filtrado é contado no primeiro pedido e não a cada página.
+    """
+    limite = max(1, min(limite, LIMITE_MAX))
+    i = _posicao(cursor)
+    pagina = []
+    while i < len(itens) and len(pagina) < limite:
+        if filtro is None or filtro(itens[i]):
+            pagina.append(itens[i])
+        i += 1
+    if filtro is not None:  # avança até ao próximo item válido para saber se há mais
+        while i < len(itens) and not filtro(itens[i]):
+            i += 1
+    return {
+        "itens": pagina,
+        "proximo_cursor": str(i) if i < len(itens) else None,
+        "total": len(itens),
+        "total_filtrado": _total_filtrado(itens, filtro, chave_total),
+    }
+
+
+def linhas_ndjson(itens: List[Dict[str, Any]], filtro: Filtro = None,
+                  dumps: Callable[[Any], bytes] = conteudo_json) -> Iterator[bytes]:
+    """Um objeto JSON por linha, enviado em blocos de LINHAS_POR_BLOCO_NDJSON linhas."""
+    bloco = []
+    for item in itens:
+        if filtro is not None and not filtro(item):
+            continue
+        bloco.append(dumps(item))
+        if len(bloco) >= LINHAS_POR_BLOCO_NDJSON:
+            yield b"\n".join(bloco) + b"\n"
+            bloco = []
+    if bloco:
+        yield b"\n".join(bloco) + b"\n"
@@ -0,0 +1,85 @@
+# utils/paralelo.py
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.cache import escopo_execucao
+from utils.similaridade import MotorSimilaridade
+
+# Abaixo deste número de linhas (extrato + contabilidade) o caminho sequencial é sempre usado
+LIMIAR_PARALELO = int(os.getenv("CONCILIACAO_LIMIAR_PARALELO", "20000"))
+TAMANHO_PARTICAO = int(os.getenv("CONCILIACAO_TAMANHO_PARTICAO", "5000"))
+
+# (descritivos do extrato, descritivos da contabilidade, candidatos locais de cada linha do extrato)
+TarefaPontuacao = Tuple[List[str], List[str], List[np.ndarray]]
+
+
+def usar_paralelo(paralelo: Optional[bool], total_linhas: int, max_workers: Optional[int]) -> bool:
+    """paralelo=None decide pelo tamanho da entrada; True/False forçam o modo."""
+    if paralelo is None:
+        paralelo = total_linhas >= LIMIAR_PARALELO
+    return bool(paralelo) and (max_workers or os.cpu_count() or 1) > 1
+
+
+def particionar_por_data(datas: np.ndarray, tamanho_particao: int) -> List[np.ndarray]:
+    """Posições ordenadas por data (quem chama põe as linhas sem data no fim) e cortadas em partições contíguas."""
+    ordem = np.argsort(datas, kind="stable")
+    return [ordem[i:i + tamanho_particao] for i in range(0, len(ordem), max(1, tamanho_particao))]
+
+
+def montar_tarefa(particao: np.ndarray, descs_ext: Sequence[str], descs_cont: Sequence[str],
+                  candidatos: Sequence[np.ndarray]) -> TarefaPontuacao:
+    """
+    Recorta uma partição: as linhas do extrato e todas as linhas da contabilidade que aparecem
+    nas janelas de candidatos delas (a sobreposição entre partições vizinhas).
+    """
+    usados = [candidatos[i] for i in particao]
+    cont_locais = np.unique(np.concatenate(usados)) if usados else np.array([], dtype=np.int64)
+    return (
+        [descs_ext[i] for i in particao],
+        [descs_cont[j] for j in cont_locais],
+        [np.searchsorted(cont_locais, c) for c in usados],
+    )
+
+
+def pontuar_tarefa(tarefa: TarefaPontuacao, similaridade: Callable[[str, str], float],
+                   limiar: Optional[float] = None,
+                   normalizar: Optional[Callable[[str], str]] = None) -> List[np.ndarray]:
+    """
+    Similaridade de cada linha do extrato contra os seus candidatos. Com `limiar` usa o
+    MotorSimilaridade (o mesmo score exato, só para os candidatos que podem chegar ao limiar;
+    os restantes ficam a -inf); sem limiar chama `similaridade` para todos os pares.
+    """
+    descs_ext, descs_cont, candidatos = tarefa
+    with escopo_execucao():
+        if limiar is not None:
+            motor = MotorSimilaridade(list(descs_ext) + list(descs_cont), exata=similaridade, normalizar=normalizar)
+            n = len(descs_ext)
+            return [motor.pontuar(k, n + c, limiar) for k, c in enumerate(candidatos)]
+        return [np.array([similaridade(descs_ext[k], descs_cont[j]) for j in c], dtype=float)
+                for k, c in enumerate(candidatos)]
+
+
+def pontuar_particoes(particoes: List[np.ndarray], descs_ext: Sequence[str], descs_cont: Sequence[str],
+                      candidatos: Sequence[np.ndarray], similaridade: Callable[[str, str], float],
+                      max_workers: Optional[int] = None, limiar: Optional[float] = None,
+                      normalizar: Optional[Callable[[str], str]] = None) -> List[Optional[np.ndarray]]:
+    """
+    Pontua as partições num ProcessPoolExecutor e devolve, por linha do extrato, os scores
+    alinhados com candidatos[i]. A escolha gulosa fica a cargo de quem chama, na ordem
+    original, o que resolve os conflitos das linhas partilhadas entre partições.
+    """
+    tarefas = [montar_tarefa(p, descs_ext, descs_cont, candidatos) for p in particoes]
+    scores: List[Optional[np.ndarray]] = [None] * len(candidatos)
+    # spawn: seguro mesmo quando chamado a partir de threads (jobs, servidor)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+        n = len(tarefas)
+        resultados = pool.map(pontuar_tarefa, tarefas, [similaridade] * n, [limiar] * n, [normalizar] * n)
+        for particao, sims in zip(particoes, resultados):
+            for i, s in zip(particao, sims):
+                scores[i] = s
+    return scores
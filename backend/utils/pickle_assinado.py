@@ -0,0 +1,108 @@
+# utils/pickle_assinado.py
+"""
+Pickles em disco assinados com HMAC-SHA256 (caches de extração e resultados guardados).
+
+Ler um pickle executa código: um ficheiro escrito por outro utilizador na pasta de uploads
+seria executado pelo servidor. Cada ficheiro leva a assinatura do conteúdo e só é lido se
+ela bater com a chave do servidor; as pastas são criadas só com acesso do dono (0700).
+
+A chave vem de CACHE_HMAC_CHAVE ou, sem ela, de um ficheiro gerado no primeiro uso
+(CACHE_HMAC_FICHEIRO, 0600), fora de uploads/. Com vários workers/servidores a chave tem de
+ser a mesma em todos; mudar a chave só invalida os caches (as entradas voltam a ser geradas).
+"""
+import hashlib
+import hmac
+import os
+import pickle
+import secrets
+import threading
+import uuid
+from typing import Any, Optional
+
+CHAVE_ENV = "CACHE_HMAC_CHAVE"
+FICHEIRO_CHAVE = os.getenv("CACHE_HMAC_FICHEIRO", os.path.join(os.path.expanduser("~"), ".contacerta", "cache_hmac.key"))
+
+_CABECALHO = b"CCPK1"
+_TAMANHO_ASSINATURA = hashlib.sha256().digest_size
+
+_chave: Optional[bytes] = None
+_chave_lock = threading.Lock()
+
+
+class AssinaturaInvalida(ValueError):
+    """O ficheiro não foi escrito por este servidor (ou foi alterado): não é lido."""
+
+
+def _carregar_chave() -> bytes:
+    chave = os.getenv(CHAVE_ENV)
+    if chave:
+        return chave.encode("utf-8")
+    try:
+        with open(FICHEIRO_CHAVE, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(FICHEIRO_CHAVE), mode=0o700, exist_ok=True)
+    nova = secrets.token_bytes(32)
+    temp = f"{FICHEIRO_CHAVE}.{uuid.uuid4().hex}.tmp"
+    with os.fdopen(os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as f:
+        f.write(nova)
+    try:
+        os.link(temp, FICHEIRO_CHAVE)  # atómico e falha se já existir: nunca se lê uma chave a meio
+    except FileExistsError:  # outro processo criou-a entretanto
+        with open(FICHEIRO_CHAVE, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(temp)
+    return nova
+
+
+def chave() -> bytes:
+    global _chave
+    with _chave_lock:
+        if _chave is None:
+            _chave = _carregar_chave()
+        return _chave
+
+
+def _assinatura(dados: bytes) -> bytes:
+    return hmac.new(chave(), dados, hashlib.sha256).digest()
+
+
+def criar_pasta(pasta: str) -> None:
+    """Pasta das caches só acessível ao utilizador do servidor (também as que já existiam)."""
+    os.makedirs(pasta, mode=0o700, exist_ok=True)
+    try:
+        os.chmod(pasta, 0o700)
+    except PermissionError:  # pasta de outro utilizador: a assinatura continua a proteger a leitura
+        pass
+
+
+def gravar(caminho: str, obj: Any) -> None:
+    """Grava obj assinado (escrita atómica: ficheiro temporário + os.replace), com permissões 0600."""
+    dados = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    temp = f"{caminho}.{uuid.uuid4().hex}.tmp"
+    fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_CABECALHO)
+            f.write(_assinatura(dados))
+            f.write(dados)
+        os.replace(temp, caminho)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def ler(caminho: str) -> Any:
+    """Lê um ficheiro de gravar(); levanta AssinaturaInvalida sem executar nada se não for nosso."""
+    with open(caminho, "rb") as f:
+        conteudo = f.read()
+    inicio = len(_CABECALHO) + _TAMANHO_ASSINATURA
+    if not conteudo.startswith(_CABECALHO) or len(conteudo) < inicio:
+        raise AssinaturaInvalida(f"{caminho}: ficheiro sem assinatura")
+    dados = conteudo[inicio:]
+    if not hmac.compare_digest(conteudo[len(_CABECALHO):inicio], _assinatura(dados)):
+        raise AssinaturaInvalida(f"{caminho}: assinatura inválida")
+    return pickle.loads(dados)
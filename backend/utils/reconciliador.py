@@ -4,9 +4,13 @@ from datetime import timedelta
 from difflib import SequenceMatcher
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from utils.similaridade import MotorSimilaridade, clean_text
+from utils.cache import escopo_execucao, memoizar
+from utils.paralelo import TAMANHO_PARTICAO, particionar_por_data, pontuar_particoes, usar_paralelo
 
 # ---------------- Helpers ----------------
+@memoizar("norm_name")
 def _norm_name(s: str) -> str:
     if s is None:
         return ""
@@ -48,14 +52,8 @@ def parse_valor_ptbr(valor):
         except:
             return 0.0
 
-def clean_text(s: str) -> str:
-    if pd.isna(s):
-        return ""
-    s = str(s).lower()
-    s = re.sub(r"[^\w\s]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
+# chave = (a, b) pela ordem recebida: o ratio do SequenceMatcher não é simétrico
+@memoizar("desc_similarity")
 def desc_similarity(a: str, b: str) -> float:
     a_c = clean_text(a)
     b_c = clean_text(b)
@@ -67,6 +65,15 @@ def desc_similarity(a: str, b: str) -> float:
     jaccard = len(tokens_a & tokens_b) / max(1, len(tokens_a | tokens_b))
     return max(ratio, jaccard)
 
+def _date_str(ts) -> str:
+    return str(ts.date()) if pd.notna(ts) else None
+
+def _date_days(dates: pd.Series):
+    """Datas como inteiros (dias) + máscara de datas presentes, para diferenças em NumPy."""
+    has_date = dates.notna().to_numpy()
+    days = dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64)
+    return np.where(has_date, days, 0), has_date
+
 # ---------------- Normalizers ----------------
 def normalize_extrato_bai(df: pd.DataFrame) -> pd.DataFrame:
     df2 = df.copy()
@@ -117,21 +124,55 @@ def normalize_contabilidade(df: pd.DataFrame) -> pd.DataFrame:
 def reconcile_movements(extrato_df: pd.DataFrame, contab_df: pd.DataFrame,
                         amount_tolerance: float = 0.01,
                         date_tolerance_days: int = 1,
-                        desc_similarity_threshold: float = 0.55) -> Dict[str, Any]:
+                        desc_similarity_threshold: float = 0.55,
+                        use_similarity_engine: bool = True,
+                        parallel: Optional[bool] = None,
+                        max_workers: Optional[int] = None,
+                        partition_size: int = TAMANHO_PARTICAO) -> Dict[str, Any]:
     """
+    Os descritivos são pontuados por desc_similarity. Com use_similarity_engine=True o
+    Stage 2 corta primeiro, em bloco, os candidatos cujo limite superior (MotorSimilaridade)
+    fica abaixo de desc_similarity_threshold; o resultado é o mesmo de False (par a par).
+
+    parallel=True pontua o Stage 2 em partições de datas do extrato (partition_size linhas)
+    num pool de max_workers processos; None só o faz acima de LIMIAR_PARALELO linhas.
+    A escolha gulosa continua sequencial, por isso o resultado é igual ao do modo sequencial.
+
     Retorna dict com:
       - matches: list of matched pairs (automatic)
       - potential: list of suggested pairs (fuzzy)
       - unmatched_extrato: list of extrato rows not matched
       - unmatched_contabilidade: list of contabilidade rows not matched
       - summary: counts
+      - cache: hits/misses dos caches de normalização/similaridade da execução
     """
+    with escopo_execucao() as escopo:
+        result = _reconcile_movements(extrato_df, contab_df, amount_tolerance,
+                                      date_tolerance_days, desc_similarity_threshold,
+                                      use_similarity_engine, parallel, max_workers, partition_size)
+    result["cache"] = escopo.estatisticas()
+    return result
+
+def _reconcile_movements(extrato_df: pd.DataFrame, contab_df: pd.DataFrame,
+                         amount_tolerance: float, date_tolerance_days: int,
+                         desc_similarity_threshold: float,
+                         use_similarity_engine: bool, parallel: Optional[bool],
+                         max_workers: Optional[int], partition_size: int) -> Dict[str, Any]:
     ext = normalize_extrato_bai(extrato_df)
     cont = normalize_contabilidade(contab_df)
 
     ext["_matched"] = False
     cont["_matched"] = False
 
+    n_ext = len(ext)
+    if use_similarity_engine:
+        motor = MotorSimilaridade(list(ext["desc"]) + list(cont["desc"]), exata=desc_similarity, normalizar=clean_text)
+        # textos do motor: linhas do extrato em [0, n_ext), contabilidade a seguir
+        sim_block = lambda e_pos, c_pos: motor.pontuar(e_pos, n_ext + c_pos, desc_similarity_threshold)
+    else:
+        sim_block = lambda e_pos, c_pos: np.array(
+            [desc_similarity(ext["desc"].iat[e_pos], cont["desc"].iat[c]) for c in c_pos], dtype=float)
+
     matches: List[Dict[str,Any]] = []
     potential: List[Dict[str,Any]] = []
 
@@ -139,100 +180,111 @@ def reconcile_movements(extrato_df: pd.DataFrame, contab_df: pd.DataFrame,
     ext["date_only"] = ext["date_mov"].dt.date
     cont["date_only"] = cont["date_mov"].dt.date
 
-    merge1 = pd.merge(ext.loc[~ext["_matched"]], cont.loc[~cont["_matched"]],
-                      left_on=["amount","date_only"], right_on=["amount","date_only"],
+    # duplicados do mesmo (amount, date_only) emparelham 1-para-1 pela ordem de ocorrência
+    rank_ext = ext.groupby(["amount","date_only"], dropna=False, sort=False).cumcount()
+    rank_cont = cont.groupby(["amount","date_only"], dropna=False, sort=False).cumcount()
+    merge1 = pd.merge(ext.assign(_rank=rank_ext), cont.assign(_rank=rank_cont),
+                      on=["amount","date_only","_rank"],
                       suffixes=("_ext","_cont"), how="inner")
+    # Stage 1 aceita o par qualquer que seja o score: pontua sempre par a par
+    sims1 = [desc_similarity(a, b) for a, b in zip(merge1["desc_ext"], merge1["desc_cont"])]
 
-    for _, r in merge1.iterrows():
+    for ext_idx, cont_idx, amount, d_ext, d_cont, desc_e, desc_c, sim in zip(
+            merge1["orig_index_ext"], merge1["orig_index_cont"], merge1["amount"],
+            merge1["date_mov_ext"], merge1["date_mov_cont"], merge1["desc_ext"], merge1["desc_cont"], sims1):
         matches.append({
-            "ext_idx": int(r["orig_index_ext"]),
-            "cont_idx": int(r["orig_index_cont"]),
-            "amount": float(r["amount"]),
-            "date_ext": str(r["date_mov_ext"].date()) if pd.notna(r["date_mov_ext"]) else None,
-            "date_cont": str(r["date_mov_cont"].date()) if pd.notna(r["date_mov_cont"]) else None,
-            "desc_ext": r["desc_ext"],
-            "desc_cont": r["desc_cont"],
+            "ext_idx": int(ext_idx),
+            "cont_idx": int(cont_idx),
+            "amount": float(amount),
+            "date_ext": _date_str(d_ext),
+            "date_cont": _date_str(d_cont),
+            "desc_ext": desc_e,
+            "desc_cont": desc_c,
             "amount_diff": 0.0,
             "date_diff_days": 0,
-            "desc_similarity": float(desc_similarity(r["desc_ext"], r["desc_cont"])),
+            "desc_similarity": float(sim),
             "status":"matched_exact"
         })
-        ext.loc[ext["orig_index"]==r["orig_index_ext"], "_matched"] = True
-        cont.loc[cont["orig_index"]==r["orig_index_cont"], "_matched"] = True
+    ext["_matched"] = ext["orig_index"].isin(merge1["orig_index_ext"])
+    cont["_matched"] = cont["orig_index"].isin(merge1["orig_index_cont"])
 
     # Stage 2: fuzzy by amount tolerance + date tolerance + description similarity
-    ext_cands = ext[~ext["_matched"]].copy()
-    cont_cands = cont[~cont["_matched"]].copy()
+    ext_cands = ext[~ext["_matched"]]
+    cont_cands = cont[~cont["_matched"]]
+
+    # índice ordenado por valor: cada linha do extrato encontra a janela de candidatos com searchsorted
+    cont_amount = cont_cands["amount"].to_numpy(dtype=float)
+    order = np.argsort(cont_amount, kind="stable")
+    amount_sorted = cont_amount[order]
+    cont_days, cont_has_date = _date_days(cont_cands["date_mov"])
+    cont_orig = cont_cands["orig_index"].to_numpy()
+    cont_pos = cont_cands.index.to_numpy(dtype=np.int64)
+    cont_desc = cont_cands["desc"].to_numpy()
+    cont_dates = cont_cands["date_mov"].tolist()
+    cont_amounts = cont_cands["amount"].tolist()
+    cont_used = np.zeros(len(cont_cands), dtype=bool)
+
+    ext_amount = ext_cands["amount"].to_numpy(dtype=float)
+    lo = np.searchsorted(amount_sorted, ext_amount - amount_tolerance, side="left")
+    hi = np.searchsorted(amount_sorted, ext_amount + amount_tolerance, side="right")
+    ext_days, ext_has_date = _date_days(ext_cands["date_mov"])
+    # candidatos na ordem original da contabilidade (mesmo desempate da varredura linha a linha)
+    windows = [np.sort(order[a:b]) for a, b in zip(lo, hi)]
+    matched_ext_idx = []
+
+    pre_sims = None
+    if usar_paralelo(parallel, len(ext) + len(cont), max_workers):
+        partitions = particionar_por_data(np.where(ext_has_date, ext_days, np.iinfo(np.int64).max), partition_size)
+        pre_sims = pontuar_particoes(partitions, ext_cands["desc"].tolist(), cont_desc.tolist(), windows,
+                                     desc_similarity, max_workers=max_workers,
+                                     limiar=desc_similarity_threshold if use_similarity_engine else None,
+                                     normalizar=clean_text)
 
-    for _, erow in ext_cands.iterrows():
-        if erow["_matched"]:
+    for i, (e_pos, e_idx, amt, e_date, e_desc) in enumerate(zip(
+            ext_cands.index, ext_cands["orig_index"], ext_cands["amount"], ext_cands["date_mov"], ext_cands["desc"])):
+        keep = ~cont_used[windows[i]]
+        pos = windows[i][keep]
+        if pos.size == 0:
             continue
-        amt = erow["amount"]
-        lower, upper = amt - amount_tolerance, amt + amount_tolerance
-        cands = cont_cands[(cont_cands["amount"] >= lower) & (cont_cands["amount"] <= upper) & (~cont_cands["_matched"])]
-        best = None
-        best_score = -999
-        for _, crow in cands.iterrows():
-            # date diff
-            date_diff = None
-            if pd.notna(erow["date_mov"]) and pd.notna(crow["date_mov"]):
-                date_diff = abs((erow["date_mov"].date() - crow["date_mov"].date()).days)
-            # only accept if within date_tolerance_days or date missing
-            if date_diff is not None and date_diff > date_tolerance_days:
-                # still consider but penalize
-                pass
-            sim = desc_similarity(erow["desc"], crow["desc"])
-            # score = sim - small penalty for date_diff
-            score = sim - (0.01 * (date_diff if date_diff is not None else 0))
-            if score > best_score:
-                best_score = score
-                best = (crow, sim, date_diff)
-        if best is not None and best_score >= desc_similarity_threshold:
-            crow, sim, date_diff = best
-            matches.append({
-                "ext_idx": int(erow["orig_index"]),
-                "cont_idx": int(crow["orig_index"]),
-                "amount": float(amt),
-                "date_ext": str(erow["date_mov"].date()) if pd.notna(erow["date_mov"]) else None,
-                "date_cont": str(crow["date_mov"].date()) if pd.notna(crow["date_mov"]) else None,
-                "desc_ext": erow["desc"],
-                "desc_cont": crow["desc"],
-                "amount_diff": float(round(erow["amount"] - crow["amount"], 2)),
-                "date_diff_days": int(date_diff) if date_diff is not None else None,
-                "desc_similarity": float(sim),
-                "status":"matched_fuzzy"
-            })
-            ext.loc[ext["orig_index"]==erow["orig_index"], "_matched"] = True
-            cont.loc[cont["orig_index"]==crow["orig_index"], "_matched"] = True
+
+        # date diff (só quando as duas datas existem); fora de date_tolerance_days apenas penaliza
+        has_dd = cont_has_date[pos] & ext_has_date[i]
+        dd = np.abs(cont_days[pos] - ext_days[i])
+        sims = pre_sims[i][keep] if pre_sims is not None else sim_block(e_pos, cont_pos[pos])
+        # score = sim - small penalty for date_diff
+        scores = sims - 0.01 * np.where(has_dd, dd, 0)
+        k = int(np.argmax(scores))
+
+        if scores[k] >= desc_similarity_threshold:
+            status = "matched_fuzzy"
+            cont_used[pos[k]] = True
+            matched_ext_idx.append(e_idx)
         else:
-            # suggest potential amount-only matches (closest date)
-            if not cands.empty:
-                # choose candidate with smallest date diff (or first if dates missing)
-                best2 = None
-                best_dd = 10**6
-                for _, crow in cands.iterrows():
-                    dd = None
-                    if pd.notna(erow["date_mov"]) and pd.notna(crow["date_mov"]):
-                        dd = abs((erow["date_mov"].date() - crow["date_mov"].date()).days)
-                    dd_val = 999999 if dd is None else dd
-                    if dd_val < best_dd:
-                        best_dd = dd_val
-                        best2 = (crow, dd)
-                crow, dd = best2
-                potential.append({
-                    "ext_idx": int(erow["orig_index"]),
-                    "cont_idx": int(crow["orig_index"]),
-                    "amount": float(amt),
-                    "date_ext": str(erow["date_mov"].date()) if pd.notna(erow["date_mov"]) else None,
-                    "date_cont": str(crow["date_mov"].date()) if pd.notna(crow["date_mov"]) else None,
-                    "desc_ext": erow["desc"],
-                    "desc_cont": crow["desc"],
-                    "amount_diff": float(round(erow["amount"] - crow["amount"], 2)),
-                    "date_diff_days": int(dd) if dd is not None else None,
-                    "desc_similarity": float(desc_similarity(erow["desc"], crow["desc"])),
-                    "status":"potential"
-                })
-                # do not auto-mark matched
+            # suggest potential amount-only matches (closest date, first if dates missing)
+            status = "potential"
+            k = int(np.argmin(np.where(has_dd, dd, 999999)))
+
+        p = pos[k]
+        # candidato cortado pelo motor (abaixo do threshold): o score reportado é o exato
+        sim = float(sims[k]) if np.isfinite(sims[k]) else desc_similarity(e_desc, cont_desc[p])
+        row = {
+            "ext_idx": int(e_idx),
+            "cont_idx": int(cont_orig[p]),
+            "amount": float(amt),
+            "date_ext": _date_str(e_date),
+            "date_cont": _date_str(cont_dates[p]),
+            "desc_ext": e_desc,
+            "desc_cont": cont_desc[p],
+            "amount_diff": float(round(float(amt) - float(cont_amounts[p]), 2)),
+            "date_diff_days": int(dd[k]) if has_dd[k] else None,
+            "desc_similarity": sim,
+            "status": status
+        }
+        # potential: do not auto-mark matched
+        (matches if status == "matched_fuzzy" else potential).append(row)
+
+    ext.loc[ext["orig_index"].isin(matched_ext_idx), "_matched"] = True
+    cont.loc[cont["orig_index"].isin(cont_orig[cont_used]), "_matched"] = True
 
     unmatched_ext = ext[~ext["_matched"]].copy()
     unmatched_cont = cont[~cont["_matched"]].copy()
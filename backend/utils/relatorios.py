@@ -1,40 +1,121 @@
 import os
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import uuid
+from itertools import islice
+from typing import Optional
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
+from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet
 from openpyxl import Workbook
-from openpyxl.styles import PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, PatternFill
 
-from utils.conciliacao import conciliar_movimentos_db  # ✅ sem import circular
-from models.user_model import MovimentacaoBAI, MovimentacaoContabilidade, ExecucaoReconciliacao
+from utils.cache import LocksPorChave
+from utils.metricas import cronometro, contar_linhas
+from utils.resultados import ResultadoEmCalculo, carregar_resultado, obter_ou_calcular
+from models.user_model import ExecucaoReconciliacao
 
-def gerar_pdf_conciliacao(db, execucao_id: int, caminho_pdf: str):
-    # 🔹 Garante que a pasta existe
-    pasta = os.path.dirname(caminho_pdf)
-    os.makedirs(pasta, exist_ok=True)
+RELATORIOS_DIR = "uploads/relatorios"
 
-    doc = SimpleDocTemplate(caminho_pdf, pagesize=A4)
-    elementos = []
-    styles = getSampleStyleSheet()
+# 🔹 Filtro de palavras a ignorar (igual ao processar_contabil)
+PALAVRAS_IGNORADAS = {"SALDO INICIAL", "SALDO FINAL", "TRANSPORTE", "A TRANSPORTAR"}
+
+
+def linha_valida(descritivo: str) -> bool:
+    if not descritivo:
+        return True
+    return not any(p in descritivo.upper() for p in PALAVRAS_IGNORADAS)
+
+
+# --- PDF ---
+
+# Linhas por bloco LongTable (~uma página A4 horizontal); o layout do reportlab cresce
+# com o tamanho de cada tabela, por isso blocos pequenos mantêm o tempo linear
+LINHAS_POR_BLOCO = 40
+# Elementos (sobretudo blocos LongTable) desenhados por ficheiro parcial; as partes são
+# depois juntas com o pypdfium2, por isso a memória fica limitada a uma parte de cada vez
+ELEMENTOS_POR_PARTE = 250
+MAX_CHARS_DESCRICAO = 60
+PDF_WORKERS = int(os.getenv("RELATORIOS_PDF_WORKERS", "1"))
+
+_pool_pdf: Optional[ProcessPoolExecutor] = None
+_pool_pdf_lock = threading.Lock()
+
+
+def _executor_pdf() -> ProcessPoolExecutor:
+    global _pool_pdf
+    with _pool_pdf_lock:
+        if _pool_pdf is None:
+            ctx = multiprocessing.get_context("spawn")
+            _pool_pdf = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=ctx)
+        return _pool_pdf
+
+
+def _texto(valor, limite: int = MAX_CHARS_DESCRICAO) -> str:
+    texto = "" if valor is None else str(valor)
+    return texto if len(texto) <= limite else texto[:limite - 1] + "…"
 
-    # 🔹 Buscar dados no banco
-    execucao = db.query(ExecucaoReconciliacao).filter_by(id=execucao_id).first()
-    extrato = db.query(MovimentacaoBAI).filter_by(execucao_id=execucao_id).all()
-    contab = db.query(MovimentacaoContabilidade).filter_by(execucao_id=execucao_id).all()
+
+def _valor(v) -> str:
+    return f"{float(v or 0):,.2f}"
+
+
+def _blocos_tabela(cabecalho, linhas, larguras, estilo_base, estilos_linha=None):
+    """Divide as linhas em LongTables de LINHAS_POR_BLOCO com o cabeçalho repetido."""
+    bloco, cores = [], []
+    for linha in linhas:
+        if estilos_linha is not None:
+            linha, cor = linha
+            cores.append(cor)
+        bloco.append(linha)
+        if len(bloco) == LINHAS_POR_BLOCO:
+            yield _long_table(cabecalho, bloco, larguras, estilo_base, cores)
+            bloco, cores = [], []
+    if bloco:
+        yield _long_table(cabecalho, bloco, larguras, estilo_base, cores)
+
+
+def _long_table(cabecalho, bloco, larguras, estilo_base, cores):
+    tabela = LongTable([cabecalho] + bloco, colWidths=larguras, repeatRows=1)
+    comandos = list(estilo_base)
+    for i, cor in enumerate(cores, start=1):
+        if cor is not None:
+            comandos.append(("BACKGROUND", (0, i), (-1, i), cor))
+    tabela.setStyle(TableStyle(comandos))
+    return tabela
+
+
+def _elementos_pdf(cabecalho_exec: dict, conciliacao: dict):
+    styles = getSampleStyleSheet()
+    estilo_base = [
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightblue),
+        ("FONTSIZE", (0, 0), (-1, -1), 7),
+        ("LEADING", (0, 0), (-1, -1), 8),
+        ("ALIGN", (3, 1), (-2, -1), "RIGHT"),
+    ]
 
     # 🔹 Cabeçalho
-    elementos.append(Paragraph("Relatório de Conciliação", styles['Title']))
-    elementos.append(Spacer(1, 12))
-    elementos.append(Paragraph(f"Empresa ID: {execucao.empresa_id}", styles['Normal']))
-    elementos.append(Paragraph(f"Execução ID: {execucao.id}", styles['Normal']))
-    elementos.append(Paragraph(f"Data: {execucao.criado_em}", styles['Normal']))
-    elementos.append(Spacer(1, 24))
+    yield Paragraph("Relatório de Conciliação", styles['Title'])
+    yield Spacer(1, 12)
+    yield Paragraph(f"Empresa ID: {cabecalho_exec['empresa_id']}", styles['Normal'])
+    yield Paragraph(f"Execução ID: {cabecalho_exec['id']}", styles['Normal'])
+    yield Paragraph(f"Data: {cabecalho_exec['criado_em']}", styles['Normal'])
+    yield Spacer(1, 24)
 
     # 🔹 Resumo
+    resumo = conciliacao["summary"]
     data_resumo = [
-        ["Total Extrato", len(extrato)],
-        ["Total Contabilidade", len(contab)],
+        ["Categoria", "Quantidade"],
+        ["Total Extrato", resumo["total_extrato"]],
+        ["Total Contabilidade", resumo["total_contabilidade"]],
+        ["Conciliados", resumo["conciliados"]],
+        ["Somente Extrato", resumo["somente_extrato"]],
+        ["Somente Contabilidade", resumo["somente_contabilidade"]],
     ]
     tabela_resumo = Table(data_resumo, colWidths=[200, 200])
     tabela_resumo.setStyle(
@@ -45,54 +126,150 @@ def gerar_pdf_conciliacao(db, execucao_id: int, caminho_pdf: str):
             ("GRID", (0, 0), (-1, -1), 1, colors.black),
         ])
     )
-    elementos.append(tabela_resumo)
-    elementos.append(Spacer(1, 24))
-
-    # 🔹 Tabela simplificada (extrato)
-    data_tabela = [["Data", "Descrição", "Débito", "Crédito", "Saldo"]]
-    for mov in extrato[:10]:  # ← limitar só p/ exemplo
-        data_tabela.append([
-            str(mov.data_mov),
-            mov.descritivo or "",
-            mov.debito or 0,
-            mov.credito or 0,
-            mov.saldo or 0
-        ])
+    yield tabela_resumo
 
-    tabela = Table(data_tabela, colWidths=[80, 200, 80, 80, 80])
-    tabela.setStyle(
-        TableStyle([
-            ("GRID", (0, 0), (-1, -1), 1, colors.black),
-            ("BACKGROUND", (0, 0), (-1, 0), colors.lightblue),
-        ])
+    # 🔹 Conciliados / divergentes
+    yield PageBreak()
+    yield Paragraph("Movimentos conciliados", styles['Heading2'])
+    cor_divergente = colors.HexColor("#FFEB9C")
+
+    def conciliados():
+        for c in conciliacao["conciliados"]:
+            if not linha_valida(c["extrato_descritivo"]) and not linha_valida(c["contab_descritivo"]):
+                continue
+            yield [
+                c["extrato_data_mov"] or c["contab_data_mov"] or "",
+                _texto(c["extrato_descritivo"], MAX_CHARS_DESCRICAO // 2 + 5),
+                _texto(c["contab_descritivo"], MAX_CHARS_DESCRICAO // 2 + 5),
+                _valor(c["extrato_valor_liq"]),
+                _valor(c["contab_valor_liq"]),
+                _valor(c["extrato_valor_liq"] - c["contab_valor_liq"]),
+                c["status"],
+            ], (None if c["status"] == "conciliado" else cor_divergente)
+
+    yield from _blocos_tabela(
+        ["Data", "Descrição Extrato", "Descrição Contabilidade", "Valor Extrato", "Valor Contab.", "Diferença", "Status"],
+        conciliados(), [60, 190, 190, 75, 75, 65, 60], estilo_base, estilos_linha=True,
     )
-    elementos.append(tabela)
 
-    doc.build(elementos)
+    # 🔹 Somente extrato / somente contabilidade
+    for titulo, chave in (("Somente no extrato", "somente_extrato"),
+                          ("Somente na contabilidade", "somente_contabilidade")):
+        yield PageBreak()
+        yield Paragraph(titulo, styles['Heading2'])
+        linhas = (
+            [m["data_mov"] or "", _texto(m["descritivo"]), _valor(m["debito"]),
+             _valor(m["credito"]), _valor(m["valor_liq"])]
+            for m in conciliacao[chave] if linha_valida(m["descritivo"])
+        )
+        yield from _blocos_tabela(
+            ["Data", "Descrição", "Débito", "Crédito", "Valor Líquido"],
+            linhas, [60, 380, 90, 90, 95], estilo_base,
+        )
+
+
+def _juntar_partes(partes, caminho_pdf: str) -> None:
+    import pypdfium2  # só no processo de relatórios
+
+    destino = pypdfium2.PdfDocument.new()
+    try:
+        for parte in partes:
+            origem = pypdfium2.PdfDocument(parte)
+            try:
+                destino.import_pages(origem)
+            finally:
+                origem.close()
+        destino.save(caminho_pdf)
+    finally:
+        destino.close()
+
+
+def renderizar_pdf_conciliacao(caminho_pdf: str, cabecalho_exec: dict, execucao_id: Optional[int] = None,
+                               conciliacao: Optional[dict] = None, elementos_por_parte: int = ELEMENTOS_POR_PARTE):
+    """
+    Desenha o PDF completo; corre no processo de relatórios e lê o resultado guardado do disco.
+    Cada ELEMENTOS_POR_PARTE elementos são desenhados num PDF parcial (cada parte começa
+    numa página nova) e no fim as partes são juntas em caminho_pdf.
+    """
+    if conciliacao is None:
+        guardado = carregar_resultado(execucao_id)
+        if guardado is None:  # removido ou invalidado desde o pedido: o próximo pedido volta a calculá-lo
+            raise ResultadoEmCalculo(execucao_id)
+        conciliacao, _ = guardado
+    elementos = _elementos_pdf(cabecalho_exec, conciliacao)
+    partes = []
+    try:
+        while True:
+            bloco = list(islice(elementos, elementos_por_parte))
+            if not bloco:
+                break
+            while bloco and isinstance(bloco[0], PageBreak):  # a parte já começa numa página nova
+                bloco.pop(0)
+            if not bloco:
+                continue
+            parte = f"{caminho_pdf}.parte{len(partes)}"
+            partes.append(parte)
+            doc = SimpleDocTemplate(parte, pagesize=landscape(A4),
+                                    leftMargin=30, rightMargin=30, topMargin=30, bottomMargin=30)
+            doc.build(bloco)
+        _juntar_partes(partes, caminho_pdf)
+    finally:
+        for parte in partes:
+            if os.path.exists(parte):
+                os.remove(parte)
+
+
+def gerar_pdf_conciliacao(db, execucao_id: int, caminho_pdf: str, em_processo: bool = True):
+    """
+    Relatório PDF com todos os movimentos (conciliados, só extrato e só contabilidade).
+    Com em_processo=True o desenho corre num processo separado (RELATORIOS_PDF_WORKERS).
+    """
+    # 🔹 Garante que a pasta existe
+    pasta = os.path.dirname(caminho_pdf)
+    os.makedirs(pasta, exist_ok=True)
+
+    # 🔹 Buscar dados no banco
+    execucao = db.query(ExecucaoReconciliacao).filter_by(id=execucao_id).first()
+    cabecalho_exec = {"id": execucao.id, "empresa_id": execucao.empresa_id, "criado_em": str(execucao.criado_em)}
+    conciliacao, _ = obter_ou_calcular(db, execucao_id)  # garante o resultado em disco para o worker
+
+    if not em_processo:
+        renderizar_pdf_conciliacao(caminho_pdf, cabecalho_exec, conciliacao=conciliacao)
+        return
+    global _pool_pdf
+    try:
+        _executor_pdf().submit(renderizar_pdf_conciliacao, caminho_pdf, cabecalho_exec, execucao_id).result()
+    except BrokenProcessPool:
+        with _pool_pdf_lock:  # worker morreu: o próximo pedido cria um pool novo
+            _pool_pdf = None
+        raise
 
 
-def gerar_excel_conciliacao(db, execucao_id: int, caminho_excel: str):
+# Linhas por folha no Excel (limite do formato: 1 048 576); o resto continua numa nova folha
+LINHAS_POR_FOLHA = 1_000_000
+
+CABECALHO_DETALHES = ["Origem", "Data Mov", "Descrição", "Débito", "Crédito", "Valor Líquido", "Status"]
+
+
+def gerar_excel_conciliacao(db, execucao_id: int, caminho_excel: str, conciliacao: Optional[dict] = None,
+                            linhas_por_folha: int = LINHAS_POR_FOLHA):
+    """
+    Exporta em modo write-only: as linhas são escritas em streaming (com o estilo já
+    aplicado a cada célula), por isso a memória não cresce com o tamanho da execução.
+    """
     # 🔹 Garante que a pasta existe
     pasta = os.path.dirname(caminho_excel)
     os.makedirs(pasta, exist_ok=True)
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Resumo"
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Resumo")
 
     # 🔹 Buscar execução
     execucao = db.query(ExecucaoReconciliacao).filter_by(id=execucao_id).first()
 
-    # 🔹 Rodar conciliação (usando dados da execução)
-    conciliacao = conciliar_movimentos_db(db, execucao_id)
-
-    # 🔹 Filtro de palavras a ignorar (igual ao processar_contabil)
-    palavras_ignoradas = {"SALDO INICIAL", "SALDO FINAL", "TRANSPORTE", "A TRANSPORTAR"}
-
-    def linha_valida(descritivo: str) -> bool:
-        if not descritivo:
-            return True
-        return not any(p in descritivo.upper() for p in palavras_ignoradas)
+    # 🔹 Resultado já calculado no upload (não volta a conciliar)
+    if conciliacao is None:
+        conciliacao, _ = obter_ou_calcular(db, execucao_id)
 
     # --- CABEÇALHO ---
     ws.append([f"Relatório de Conciliação - Execução {execucao.id}"])
@@ -110,20 +287,39 @@ def gerar_excel_conciliacao(db, execucao_id: int, caminho_excel: str):
     ws.append([])
 
     # --- DETALHES ---
-    ws.append(["Origem", "Data Mov", "Descrição", "Débito", "Crédito", "Valor Líquido", "Status"])
+    ws.append(CABECALHO_DETALHES)
+    linhas_folha = 11
+    folhas = 1
+
+    # Cores para diferenciar: um NamedStyle por cor, registado uma vez no workbook;
+    # cada célula refere-o pelo nome (não volta a procurar o fill no workbook a cada linha)
+    for nome, cor in (("conciliado", "C6EFCE"),       # verde
+                      ("divergente", "FFEB9C"),       # amarelo
+                      ("somente_extrato", "BDD7EE"),  # azul claro
+                      ("somente_contab", "F8CBAD")):  # vermelho claro
+        wb.add_named_style(NamedStyle(name=nome, fill=PatternFill(start_color=cor, end_color=cor, fill_type="solid")))
 
-    # Cores para diferenciar
-    fill_conciliado = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")  # verde
-    fill_divergente = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")  # amarelo
-    fill_extrato = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")     # azul claro
-    fill_contab = PatternFill(start_color="F8CBAD", end_color="F8CBAD", fill_type="solid")     # vermelho claro
+    def escrever(valores, estilo: str):
+        nonlocal ws, linhas_folha, folhas
+        if linhas_folha >= linhas_por_folha:
+            folhas += 1
+            ws = wb.create_sheet(f"Detalhes {folhas}")
+            ws.append(CABECALHO_DETALHES)
+            linhas_folha = 1
+        linha = []
+        for v in valores:
+            cell = WriteOnlyCell(ws, value=v)
+            cell.style = estilo
+            linha.append(cell)
+        ws.append(linha)
+        linhas_folha += 1
 
     # Conciliados / divergentes
     for c in conciliacao["conciliados"]:
         if not linha_valida(c["extrato_descritivo"]) and not linha_valida(c["contab_descritivo"]):
             continue  # ignora linha auxiliar
 
-        row = [
+        escrever([
             "Conciliado",
             c["extrato_data_mov"] or c["contab_data_mov"],
             f"{c['extrato_descritivo']} | {c['contab_descritivo']}",
@@ -131,17 +327,14 @@ def gerar_excel_conciliacao(db, execucao_id: int, caminho_excel: str):
             c["contab_valor_liq"],
             c["extrato_valor_liq"] - c["contab_valor_liq"],
             c["status"],
-        ]
-        ws.append(row)
-        for cell in ws[ws.max_row]:
-            cell.fill = fill_conciliado if c["status"] == "conciliado" else fill_divergente
+        ], "conciliado" if c["status"] == "conciliado" else "divergente")
 
     # Somente extrato
     for e in conciliacao["somente_extrato"]:
         if not linha_valida(e["descritivo"]):
             continue
 
-        row = [
+        escrever([
             "Somente Extrato",
             e["data_mov"],
             e["descritivo"],
@@ -149,17 +342,14 @@ def gerar_excel_conciliacao(db, execucao_id: int, caminho_excel: str):
             e["credito"],
             e["valor_liq"],
             "Não conciliado",
-        ]
-        ws.append(row)
-        for cell in ws[ws.max_row]:
-            cell.fill = fill_extrato
+        ], "somente_extrato")
 
     # Somente contabilidade
     for c in conciliacao["somente_contabilidade"]:
         if not linha_valida(c["descritivo"]):
             continue
 
-        row = [
+        escrever([
             "Somente Contabilidade",
             c["data_mov"],
             c["descritivo"],
@@ -167,9 +357,63 @@ def gerar_excel_conciliacao(db, execucao_id: int, caminho_excel: str):
             c["credito"],
             c["valor_liq"],
             "Não conciliado",
-        ]
-        ws.append(row)
-        for cell in ws[ws.max_row]:
-            cell.fill = fill_contab
+        ], "somente_contab")
+
+    wb.save(caminho_excel)
+
+
+# --- Geração sob pedido, com cache em disco ---
+
+EXTENSOES = {"pdf": "pdf", "excel": "xlsx"}
+
+# Um lock por (execução, formato), descartado quando a geração termina
+_locks = LocksPorChave()
+
+
+def _remover_versoes_antigas(execucao_id: int, ext: str, atual: str) -> None:
+    prefixo = f"relatorio_{execucao_id}_"
+    with os.scandir(RELATORIOS_DIR) as it:
+        for e in it:
+            if e.name.startswith(prefixo) and e.name.endswith(f".{ext}") and e.path != atual:
+                try:
+                    os.remove(e.path)
+                except FileNotFoundError:
+                    pass
+
+
+def obter_relatorio(db, execucao_id: int, formato: str) -> str:
+    """
+    Caminho do relatório (formato "pdf" ou "excel"), gerado só quando é pedido.
+    A cache é por execução + versão do resultado guardado; pedidos simultâneos
+    do mesmo relatório esperam pela mesma geração. Levanta ResultadoEmCalculo enquanto
+    o job da execução não gravou o resultado.
+    """
+    ext = EXTENSOES[formato]
+    conciliacao, versao = obter_ou_calcular(db, execucao_id)
+    caminho = os.path.join(RELATORIOS_DIR, f"relatorio_{execucao_id}_{versao}.{ext}")
+    if os.path.exists(caminho):
+        return caminho
 
-    wb.save(caminho_excel)
\ No newline at end of file
+    with _locks.segurar((execucao_id, formato)):
+        if os.path.exists(caminho):  # outro pedido gerou-o enquanto esperávamos
+            return caminho
+        os.makedirs(RELATORIOS_DIR, exist_ok=True)
+        temp = f"{caminho}.{uuid.uuid4().hex}.tmp.{ext}"
+        duracoes = {}
+        try:
+            with cronometro(f"relatorio_{formato}", duracoes):
+                if formato == "pdf":
+                    gerar_pdf_conciliacao(db, execucao_id, temp)
+                else:
+                    gerar_excel_conciliacao(db, execucao_id, temp, conciliacao=conciliacao)
+            os.replace(temp, caminho)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        _remover_versoes_antigas(execucao_id, ext, caminho)
+        contar_linhas(f"relatorio_{formato}", sum(len(conciliacao.get(k, [])) for k in (
+            "conciliados", "somente_extrato", "somente_contabilidade")))
+        db.query(ExecucaoReconciliacao).filter_by(id=execucao_id).update(
+            {"duracao_relatorio": duracoes[f"relatorio_{formato}"]})
+        db.commit()
+    return caminho
@@ -0,0 +1,128 @@
+# utils/resultados.py
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from utils import pickle_assinado
+from utils.cache import CacheLRU, LocksPorChave
+
+logger = logging.getLogger(__name__)
+
+RESULTADOS_DIR = os.getenv("RESULTADOS_DIR", "uploads/resultados")
+# Resultados já carregados, para a paginação não voltar a ler o ficheiro a cada página
+MAX_RESULTADOS_MEMORIA = int(os.getenv("RESULTADOS_MAX_MEMORIA", "4"))
+
+_memoria = CacheLRU(MAX_RESULTADOS_MEMORIA)
+_memoria_lock = threading.Lock()
+
+# Um lock por execução, partilhado pelo job que grava o resultado e por obter_ou_calcular
+_locks = LocksPorChave()
+_em_calculo_lock = threading.Lock()
+_em_calculo: set = set()
+
+
+class ResultadoEmCalculo(Exception):
+    """O job da execução ainda está a calcular o resultado; o pedido deve tentar mais tarde."""
+
+    def __init__(self, execucao_id: int):
+        super().__init__(f"Execução {execucao_id} ainda em processamento")
+        self.execucao_id = execucao_id
+
+    def __reduce__(self):  # também atravessa o processo de relatórios
+        return type(self), (self.execucao_id,)
+
+
+def _caminho(execucao_id: int, tipo: str) -> str:
+    return os.path.join(RESULTADOS_DIR, f"{tipo}_{execucao_id}.pkl")
+
+
+def _remover(caminho: str) -> None:
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+
+def versao_resultado(execucao_id: int, tipo: str = "conciliacao") -> Optional[str]:
+    """Versão do resultado guardado (muda sempre que é regravado); None se não existir."""
+    try:
+        st = os.stat(_caminho(execucao_id, tipo))
+    except FileNotFoundError:
+        return None
+    return f"{st.st_mtime_ns:x}{st.st_size:x}"
+
+
+def guardar_resultado(execucao_id: int, conciliacao: Dict[str, Any], tipo: str = "conciliacao") -> str:
+    """Grava o resultado de uma execução ("conciliacao" = contabilística, "fiscal" = reconciliação fiscal)."""
+    pickle_assinado.criar_pasta(RESULTADOS_DIR)
+    pickle_assinado.gravar(_caminho(execucao_id, tipo), conciliacao)
+    return versao_resultado(execucao_id, tipo)
+
+
+def carregar_resultado(execucao_id: int, tipo: str = "conciliacao") -> Optional[Tuple[Dict[str, Any], str]]:
+    """
+    Devolve (resultado, versao) ou None se a execução não tiver resultado guardado (ou se o
+    ficheiro não tiver a assinatura deste servidor). Só de leitura.
+    """
+    versao = versao_resultado(execucao_id, tipo)
+    if versao is None:
+        return None
+    chave = (tipo, execucao_id, versao)
+    with _memoria_lock:
+        dados = _memoria.get(chave)
+    if dados is None:
+        try:
+            dados = pickle_assinado.ler(_caminho(execucao_id, tipo))
+        except pickle_assinado.AssinaturaInvalida as e:  # não foi escrito por este servidor: não é lido
+            logger.warning("⚠ Resultado guardado ignorado: %s", e)
+            _remover(_caminho(execucao_id, tipo))
+            return None
+        with _memoria_lock:
+            _memoria.put(chave, dados)
+    return dados, versao
+
+
+@contextmanager
+def calculo_resultado(execucao_id: int):
+    """
+    Usado pelo job desde que a execução é criada até guardar_resultado: segura o lock da
+    execução e, entretanto, obter_ou_calcular levanta ResultadoEmCalculo em vez de recalcular.
+    Só é visível neste processo (com vários workers, um pedido noutro worker pode recalcular).
+    """
+    with _em_calculo_lock:
+        _em_calculo.add(execucao_id)
+    try:
+        with _locks.segurar(execucao_id):
+            yield
+    finally:
+        with _em_calculo_lock:
+            _em_calculo.discard(execucao_id)
+
+
+def em_calculo(execucao_id: int) -> bool:
+    with _em_calculo_lock:
+        return execucao_id in _em_calculo
+
+
+def obter_ou_calcular(db, execucao_id: int) -> Tuple[Dict[str, Any], str]:
+    """
+    Resultado guardado; execuções antigas (sem resultado) são conciliadas uma vez e guardadas.
+    Levanta ResultadoEmCalculo enquanto o job da execução não gravou o resultado.
+    """
+    guardado = carregar_resultado(execucao_id)
+    if guardado is not None:
+        return guardado
+    if em_calculo(execucao_id):
+        raise ResultadoEmCalculo(execucao_id)
+    with _locks.segurar(execucao_id):  # pedidos simultâneos partilham o mesmo cálculo
+        guardado = carregar_resultado(execucao_id)
+        if guardado is not None:
+            return guardado
+        if em_calculo(execucao_id):
+            raise ResultadoEmCalculo(execucao_id)
+        from utils.conciliacao import conciliar_movimentos_db  # numpy só quando é preciso calcular
+
+        conciliacao = conciliar_movimentos_db(db, execucao_id)
+        return conciliacao, guardar_resultado(execucao_id, conciliacao)
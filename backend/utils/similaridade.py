@@ -0,0 +1,136 @@
+# utils/similaridade.py
+import os
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import memoizar
+
+
+@memoizar("clean_text")
+def clean_text(s: str) -> str:
+    if pd.isna(s):
+        return ""
+    s = str(s).lower()
+    s = re.sub(r"[^\w\s]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+def texto_bruto(s) -> str:
+    """Normalização dos scorers que comparam o texto tal como está (só None/NaN passam a "")."""
+    return "" if pd.isna(s) else str(s)
+
+
+# Folga contra arredondamentos entre o limite (numpy) e o score exato (Python)
+_MARGEM = 1e-9
+# Blocos com menos candidatos do que isto vão direto ao scorer exato (o limite vetorizado
+# tem um custo fixo de dezenas de µs, mais do que pontuar um ou dois pares)
+BLOCO_MINIMO = int(os.getenv("SIMILARIDADE_BLOCO_MINIMO", "8"))
+
+
+class _MatrizEsparsa:
+    """Matriz CSR mínima (indptr/indices/data) com reduções linha x bloco de linhas."""
+
+    def __init__(self, linhas: List[Dict[int, float]], n_colunas: int):
+        tamanhos = np.array([len(l) for l in linhas], dtype=np.int64)
+        self.indptr = np.concatenate(([0], np.cumsum(tamanhos)))
+        self.indices = np.fromiter((c for l in linhas for c in l.keys()), dtype=np.int64, count=int(self.indptr[-1]))
+        self.data = np.fromiter((v for l in linhas for v in l.values()), dtype=float, count=int(self.indptr[-1]))
+        self._denso = np.zeros(max(1, n_colunas), dtype=float)
+
+    def _reduzir(self, i: int, js: np.ndarray, op) -> np.ndarray:
+        """Soma de op(linha i, linha j) nas colunas de cada j (um único passo vetorizado)."""
+        ini, fim = self.indptr[i], self.indptr[i + 1]
+        cols = self.indices[ini:fim]
+        self._denso[cols] = self.data[ini:fim]
+
+        inicios = self.indptr[js]
+        tamanhos = self.indptr[js + 1] - inicios
+        segmento = np.repeat(np.arange(len(js)), tamanhos)
+        desloc = np.arange(int(tamanhos.sum())) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+        pos = np.repeat(inicios, tamanhos) + desloc
+        out = np.bincount(segmento, weights=op(self.data[pos], self._denso[self.indices[pos]]), minlength=len(js))
+
+        self._denso[cols] = 0.0
+        return out
+
+    def produto(self, i: int, js: np.ndarray) -> np.ndarray:
+        return self._reduzir(i, js, np.multiply)
+
+    def minimo(self, i: int, js: np.ndarray) -> np.ndarray:
+        """Tamanho da interseção de multiconjuntos (valores não negativos)."""
+        return self._reduzir(i, js, np.minimum)
+
+
+class MotorSimilaridade:
+    """
+    Pontuação de descritivos em lote para uma execução, com o mesmo resultado do scorer par a par.
+
+    Para blocos com pelo menos BLOCO_MINIMO candidatos calcula-se, num passo vetorizado, um
+    limite superior do score: max(quick_ratio do difflib, Jaccard de palavras). O quick_ratio
+    (interseção dos multiconjuntos de caracteres) majora o SequenceMatcher.ratio, por isso quem
+    fica abaixo do limiar não precisa do scorer exato; os restantes passam por `exata` e os
+    thresholds ficam como estão. Os textos são normalizados e contados uma única vez, no
+    primeiro desses blocos (textos repetidos partilham a mesma linha).
+    `normalizar` tem de ser a normalização que `exata` aplica antes do SequenceMatcher.
+    """
+
+    def __init__(self, textos: Iterable[str], exata: Callable[[str, str], float],
+                 normalizar: Optional[Callable[[str], str]] = None):
+        self.textos = list(textos)
+        self.exata = exata
+        self._normalizar = normalizar or clean_text
+        self._indexado = False
+
+    def _indexar(self) -> None:
+        """Normaliza e conta os textos; só corre no primeiro bloco grande o suficiente para o limite."""
+        unicos: Dict[str, int] = {}
+        ids = []
+        for t in self.textos:
+            ids.append(unicos.setdefault(self._normalizar(t), len(unicos)))
+        self.ids = np.array(ids, dtype=np.int64)
+        textos_unicos = list(unicos.keys())
+        self.vazio = np.array([not t for t in textos_unicos], dtype=bool)
+        self._comprimentos = np.array([len(t) for t in textos_unicos], dtype=float)
+
+        caracteres: Dict[str, int] = {}
+        linhas_car = [{caracteres.setdefault(c, len(caracteres)): float(n) for c, n in Counter(t).items()}
+                      for t in textos_unicos]
+        self._caracteres = _MatrizEsparsa(linhas_car, len(caracteres))
+
+        tokens: Dict[str, int] = {}
+        linhas_tok = [{tokens.setdefault(tok, len(tokens)): 1.0 for tok in t.split()} for t in textos_unicos]
+        self._tokens = _MatrizEsparsa(linhas_tok, len(tokens))
+        self._n_tokens = np.array([len(l) for l in linhas_tok], dtype=float)
+        self._indexado = True
+
+    def _limite(self, u: int, us: np.ndarray) -> np.ndarray:
+        if us.size == 0 or self.vazio[u]:
+            return np.zeros(us.size)
+        comuns = self._caracteres.minimo(u, us)
+        rapido = 2.0 * comuns / np.maximum(1.0, self._comprimentos[u] + self._comprimentos[us])
+        inter = self._tokens.produto(u, us)
+        jaccard = inter / np.maximum(1.0, self._n_tokens[u] + self._n_tokens[us] - inter)
+        limite = np.maximum(rapido, jaccard)
+        limite[self.vazio[us]] = 0.0
+        return limite
+
+    def limite(self, i: int, js) -> np.ndarray:
+        """Limite superior do score do texto i contra cada texto de js."""
+        if not self._indexado:
+            self._indexar()
+        return self._limite(self.ids[i], self.ids[np.asarray(js, dtype=np.int64)])
+
+    def pontuar(self, i: int, js, limiar: float) -> np.ndarray:
+        """Score exato do texto i contra cada texto de js que pode chegar ao limiar; os outros ficam a -inf."""
+        js = np.asarray(js, dtype=np.int64)
+        if js.size < BLOCO_MINIMO:
+            return np.array([self.exata(self.textos[i], self.textos[j]) for j in js], dtype=float)
+        scores = np.full(js.size, -np.inf)
+        for k in np.flatnonzero(self.limite(i, js) >= limiar - _MARGEM):
+            scores[k] = self.exata(self.textos[i], self.textos[js[k]])
+        return scores
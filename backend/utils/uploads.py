@@ -0,0 +1,59 @@
+# utils/uploads.py
+import hashlib
+import os
+import uuid
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+TAMANHO_BLOCO = 1024 * 1024
+TAMANHO_MAX_UPLOAD = int(os.getenv("UPLOAD_MAX_MB", "200")) * 1024 * 1024
+
+
+def _escrever(f, bloco: bytes) -> None:
+    f.write(bloco)
+
+
+async def gravar_upload(upload: UploadFile, destino: str, tamanho_max: int = TAMANHO_MAX_UPLOAD) -> str:
+    """
+    Grava o upload em blocos de TAMANHO_BLOCO (memória constante), calcula o SHA-256
+    durante a escrita e só publica o ficheiro no fim (temp + rename).
+    Acima de tamanho_max o ficheiro é descartado e é devolvido 413.
+    """
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    temp = f"{destino}.{uuid.uuid4().hex}.tmp"
+    sha = hashlib.sha256()
+    total = 0
+    f = await run_in_threadpool(open, temp, "wb")
+    try:
+        while True:
+            bloco = await upload.read(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            total += len(bloco)
+            if total > tamanho_max:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Ficheiro '{upload.filename}' excede o limite de {tamanho_max // (1024 * 1024)} MB",
+                )
+            sha.update(bloco)
+            await run_in_threadpool(_escrever, f, bloco)
+        await run_in_threadpool(f.close)
+        await run_in_threadpool(os.replace, temp, destino)
+    except BaseException:
+        f.close()
+        try:
+            os.remove(temp)
+        except FileNotFoundError:
+            pass
+        raise
+    return sha.hexdigest()
+
+
+def remover_uploads(*caminhos: str) -> None:
+    """Apaga ficheiros de upload já processados (os que não existem são ignorados)."""
+    for caminho in caminhos:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
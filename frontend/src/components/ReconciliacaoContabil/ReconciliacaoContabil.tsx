@@ -10,6 +10,7 @@ import {
   InputLabel,
   Select,
   MenuItem,
+  Alert,
 } from "@mui/material";
 import {
   BarChart,
@@ -38,6 +39,44 @@ const ReconCiliacaoContabil = () => {
   const [ficheiroContabilidade, setFicheiroContabilidade] =
     useState<File | null>(null);
   const [resultado, setResultado] = useState<any>(null);
+  // Listas do resultado carregadas por página (a API devolve só o resumo no upload)
+  const [listas, setListas] = useState<
+    Record<string, { itens: any[]; proximo_cursor: string | null }>
+  >({});
+
+  const carregarLista = async (
+    execucaoId: number,
+    categoria: string,
+    cursor: string | null = null
+  ) => {
+    const res = await axios.get(
+      `http://localhost:8001/contabil/execucoes/${execucaoId}/${categoria}`,
+      { params: { cursor, limite: 100 } }
+    );
+    setListas((prev) => ({
+      ...prev,
+      [categoria]: {
+        itens: [...(cursor ? prev[categoria]?.itens ?? [] : []), ...res.data.itens],
+        proximo_cursor: res.data.proximo_cursor,
+      },
+    }));
+  };
+
+  const botaoCarregarMais = (categoria: string) =>
+    listas[categoria]?.proximo_cursor ? (
+      <Button
+        size="small"
+        onClick={() =>
+          carregarLista(
+            resultado.execucao_id,
+            categoria,
+            listas[categoria].proximo_cursor
+          )
+        }
+      >
+        Carregar mais
+      </Button>
+    ) : null;
 
   const handleNext = () => setActiveStep((prev) => prev + 1);
   const handleBack = () => setActiveStep((prev) => prev - 1);
@@ -59,8 +98,28 @@ const ReconCiliacaoContabil = () => {
         }
       );
       console.log("Resposta:", response.data);
-      setResultado(response.data.dados);
-      // Armazena os dados da API se quiseres usar no próximo passo
+
+      // O processamento corre em segundo plano: consultar o job até terminar
+      const jobId = response.data.job_id;
+      let job = response.data;
+      while (job.estado !== "concluido" && job.estado !== "erro") {
+        await new Promise((r) => setTimeout(r, 1500));
+        const estado = await axios.get(
+          `http://localhost:8001/contabil/jobs/${jobId}`
+        );
+        job = estado.data;
+        console.log(`Job ${jobId}: ${job.etapa} (${Math.round(job.progresso * 100)}%)`);
+      }
+      if (job.estado === "erro") {
+        console.error("Erro no processamento:", job.erro);
+        return;
+      }
+      setResultado(job.resultado);
+      await Promise.all(
+        ["conciliados", "somente_extrato", "somente_contabilidade"].map((c) =>
+          carregarLista(job.resultado.execucao_id, c)
+        )
+      );
       handleNext();
     } catch (error) {
       console.error("Erro ao importar:", error);
@@ -209,10 +268,12 @@ const ReconCiliacaoContabil = () => {
       case 3:
         if (!resultado) return <Typography>Carregando resultado...</Typography>;
 
-        const conciliacao = resultado.conciliacao;
-
-        if (!conciliacao)
-          return <Typography>Conciliação não encontrada.</Typography>;
+        const conciliacao = {
+          conciliados: listas.conciliados?.itens ?? [],
+          somente_extrato: listas.somente_extrato?.itens ?? [],
+          somente_contabilidade: listas.somente_contabilidade?.itens ?? [],
+        };
+        const summary = resultado.summary ?? {};
 
         return (
           <Box sx={{ maxWidth: 900, mx: "auto", p: 3 }}>
@@ -225,6 +286,13 @@ const ReconCiliacaoContabil = () => {
               ✅ Resultado da Reconciliação
             </Typography>
 
+            {summary.paginas_com_erro?.length > 0 && (
+              <Alert severity="warning" sx={{ mb: 3 }}>
+                Não foi possível ler as páginas {summary.paginas_com_erro.join(", ")} do
+                extrato: os movimentos dessas páginas não entram na reconciliação.
+              </Alert>
+            )}
+
             {/* Resumo geral em cards */}
             <Box
               sx={{
@@ -305,7 +373,7 @@ const ReconCiliacaoContabil = () => {
                 }}
               >
                 <Typography variant="h6" mb={2} color="primary">
-                  Conciliados ({conciliacao.conciliados.length})
+                  Conciliados ({summary.conciliados ?? 0})
                 </Typography>
                 {conciliacao.conciliados.length === 0 && (
                   <Typography>Nenhum conciliado.</Typography>
@@ -334,6 +402,7 @@ const ReconCiliacaoContabil = () => {
                     </Typography>
                   </Box>
                 ))}
+                {botaoCarregarMais("conciliados")}
               </Box>
 
               {/* Somente Extrato */}
@@ -350,7 +419,7 @@ const ReconCiliacaoContabil = () => {
               >
                 <Typography variant="h6" mb={2} color="primary">
                   Movimentos apenas no Extrato (
-                  {conciliacao.somente_extrato.length})
+                  {summary.somente_extrato ?? 0})
                 </Typography>
                 {conciliacao.somente_extrato.length === 0 && (
                   <Typography>Nenhum.</Typography>
@@ -370,6 +439,7 @@ const ReconCiliacaoContabil = () => {
                     {(item.credito - item.debito).toFixed(2)}
                   </Typography>
                 ))}
+                {botaoCarregarMais("somente_extrato")}
               </Box>
 
               {/* Somente Contabilidade */}
@@ -387,7 +457,7 @@ const ReconCiliacaoContabil = () => {
               >
                 <Typography variant="h6" mb={2} color="primary">
                   Movimentos apenas na Contabilidade (
-                  {conciliacao.somente_contabilidade.length})
+                  {summary.somente_contabilidade ?? 0})
                 </Typography>
                 {conciliacao.somente_contabilidade.length === 0 && (
                   <Typography>Nenhum.</Typography>
@@ -409,6 +479,7 @@ const ReconCiliacaoContabil = () => {
                     </Typography>
                   )
                 )}
+                {botaoCarregarMais("somente_contabilidade")}
               </Box>
             </Box>
           </Box>
@@ -418,7 +489,7 @@ const ReconCiliacaoContabil = () => {
         if (!resultado)
           return <Typography>Carregando dados para gráfico...</Typography>;
 
-        const resumo = resultado.conciliacao?.summary;
+        const resumo = resultado.summary;
         if (!resumo) return <Typography>Resumo não encontrado.</Typography>;
 
         // Dados para o gráfico
@@ -26,10 +26,15 @@ const ReconciliaçãoFiscal = () => {
   const itensPorPagina = 10;
   const [conciliados, setConciliados] = useState<any[]>([]);
   const [divergentesIva, setDivergentesIva] = useState<any[]>([]);
+  const [aproximados, setAproximados] = useState<any[]>([]);
   const [soAGT, setSoAGT] = useState<any[]>([]);
   const [soCont, setSoCont] = useState<any[]>([]);
+  // Só o resumo vem na resposta; as listas são pedidas por página à API
+  const [reconciliacaoId, setReconciliacaoId] = useState<number | null>(null);
+  const [resumo, setResumo] = useState<Record<string, number>>({});
   const [paginaConciliados, setPaginaConciliados] = useState(1);
   const [paginaIva, setPaginaIva] = useState(1);
+  const [paginaAproximados, setPaginaAproximados] = useState(1);
   const [paginaAGT, setPaginaAGT] = useState(1);
   const [paginaCont, setPaginaCont] = useState(1);
   const fornecedoresInputRef = useRef<HTMLInputElement>(null);
@@ -39,6 +44,7 @@ const ReconciliaçãoFiscal = () => {
     labels: [
       "Conciliado",
       "Divergência no IVA",
+      "Aproximados",
       "Só na AGT",
       "Só na Contabilidade",
     ],
@@ -46,12 +52,13 @@ const ReconciliaçãoFiscal = () => {
       {
         label: "Número de Faturas",
         data: [
-          conciliados.length,
-          divergentesIva.length,
-          soAGT.length,
-          soCont.length,
+          resumo.conciliados ?? 0,
+          resumo.divergentes_iva ?? 0,
+          resumo.conciliados_aproximados ?? 0,
+          resumo.so_agt ?? 0,
+          resumo.so_contabilidade ?? 0,
         ],
-        backgroundColor: ["green", "orange", "red", "blue"],
+        backgroundColor: ["green", "orange", "gold", "red", "blue"],
         borderWidth: 1,
       },
     ],
@@ -79,10 +86,35 @@ const ReconciliaçãoFiscal = () => {
       },
     },
   };
-  const paginar = (arr: any[], pagina: number) => {
-    const start = (pagina - 1) * itensPorPagina;
-    return arr.slice(start, start + itensPorPagina);
+  const API_RESULTADOS = "http://localhost:8001/fiscal/reconciliacoes";
+
+  // O cursor da API é a posição na lista, por isso a página N começa em (N-1) * itensPorPagina
+  const carregarPagina = async (
+    categoria: string,
+    pagina: number,
+    setter: React.Dispatch<React.SetStateAction<any[]>>
+  ) => {
+    if (reconciliacaoId === null) return;
+    const res = await axios.get(
+      `${API_RESULTADOS}/${reconciliacaoId}/${categoria}`,
+      { params: { cursor: String((pagina - 1) * itensPorPagina), limite: itensPorPagina } }
+    );
+    setter(res.data.itens);
+  };
+
+  // Lista completa (para exportação) lida do endpoint NDJSON em streaming
+  const carregarTudo = async (categoria: string): Promise<any[]> => {
+    if (reconciliacaoId === null) return [];
+    const res = await fetch(`${API_RESULTADOS}/${reconciliacaoId}/${categoria}/ndjson`);
+    const texto = await res.text();
+    return texto
+      .split("\n")
+      .filter((linha) => linha.trim() !== "")
+      .map((linha) => JSON.parse(linha));
   };
+
+  const totalPaginas = (categoria: string) =>
+    Math.ceil((resumo[categoria] ?? 0) / itensPorPagina);
   const handleDrop = (
     e: React.DragEvent<HTMLDivElement>,
     setter: React.Dispatch<React.SetStateAction<File | null>>
@@ -129,11 +161,13 @@ const ReconciliaçãoFiscal = () => {
         periodo: "2025-01",
       });
       console.log("Resposta da reconciliação:", res.data);
-      // 👇 Remova .dados se a resposta já for o objeto plano
-      setConciliados(res.data.dados.conciliados || []);
-      setDivergentesIva(res.data.dados.divergentes_iva || []);
-      setSoAGT(res.data.dados.so_agt || []);
-      setSoCont(res.data.dados.so_contabilidade || []);
+      setResumo(res.data.dados.summary || {});
+      setPaginaConciliados(1);
+      setPaginaIva(1);
+      setPaginaAproximados(1);
+      setPaginaAGT(1);
+      setPaginaCont(1);
+      setReconciliacaoId(res.data.dados.reconciliacao_id);
 
       toast.success("🎯 Reconciliação concluída com sucesso!");
     } catch (err: any) {
@@ -143,13 +177,22 @@ const ReconciliaçãoFiscal = () => {
   };
 
   useEffect(() => {
-    console.log("✅ Conciliados:", conciliados);
-    console.log("⚠️ Divergentes no IVA:", divergentesIva);
-    console.log("📄 Só AGT:", soAGT);
-    console.log("📄 Só Contabilidade:", soCont);
-  }, [conciliados, divergentesIva, soAGT, soCont]);
+    carregarPagina("conciliados", paginaConciliados, setConciliados);
+  }, [reconciliacaoId, paginaConciliados]);
+  useEffect(() => {
+    carregarPagina("divergentes_iva", paginaIva, setDivergentesIva);
+  }, [reconciliacaoId, paginaIva]);
+  useEffect(() => {
+    carregarPagina("conciliados_aproximados", paginaAproximados, setAproximados);
+  }, [reconciliacaoId, paginaAproximados]);
+  useEffect(() => {
+    carregarPagina("so_agt", paginaAGT, setSoAGT);
+  }, [reconciliacaoId, paginaAGT]);
+  useEffect(() => {
+    carregarPagina("so_contabilidade", paginaCont, setSoCont);
+  }, [reconciliacaoId, paginaCont]);
 
-  const exportarRelatorioPDF = () => {
+  const exportarRelatorioPDF = async () => {
     const doc = new jsPDF();
     let currentY = 10; // posição inicial no PDF
 
@@ -195,14 +238,15 @@ const ReconciliaçãoFiscal = () => {
       });
     };
 
-    adicionarSecao("✅ Conciliados", conciliados, "#28a745"); // verde
-    adicionarSecao("⚠️ Divergência no IVA", divergentesIva, "#fd7e14"); // laranja
-    adicionarSecao("📄 Só no Mapa AGT", soAGT, "#dc3545"); // vermelho
-    adicionarSecao("📄 Só na Contabilidade", soCont, "#007bff"); // azul
+    adicionarSecao("✅ Conciliados", await carregarTudo("conciliados"), "#28a745"); // verde
+    adicionarSecao("⚠️ Divergência no IVA", await carregarTudo("divergentes_iva"), "#fd7e14"); // laranja
+    adicionarSecao("🔎 Conciliados Aproximados", await carregarTudo("conciliados_aproximados"), "#ffc107"); // amarelo
+    adicionarSecao("📄 Só no Mapa AGT", await carregarTudo("so_agt"), "#dc3545"); // vermelho
+    adicionarSecao("📄 Só na Contabilidade", await carregarTudo("so_contabilidade"), "#007bff"); // azul
 
     doc.save("Relatorio_Consolidacao_Fiscal.pdf");
   };
-  const exportarRelatorioExcel = () => {
+  const exportarRelatorioExcel = async () => {
     const wb = XLSX.utils.book_new();
 
     const exportarSheet = (dados: any[], nomeSheet: string) => {
@@ -224,10 +268,11 @@ const ReconciliaçãoFiscal = () => {
       XLSX.utils.book_append_sheet(wb, ws, nomeSheet);
     };
 
-    exportarSheet(conciliados, "Conciliados");
-    exportarSheet(divergentesIva, "Divergência IVA");
-    exportarSheet(soAGT, "Só AGT");
-    exportarSheet(soCont, "Só Contabilidade");
+    exportarSheet(await carregarTudo("conciliados"), "Conciliados");
+    exportarSheet(await carregarTudo("divergentes_iva"), "Divergência IVA");
+    exportarSheet(await carregarTudo("conciliados_aproximados"), "Aproximados");
+    exportarSheet(await carregarTudo("so_agt"), "Só AGT");
+    exportarSheet(await carregarTudo("so_contabilidade"), "Só Contabilidade");
 
     const excelBuffer = XLSX.write(wb, { bookType: "xlsx", type: "array" });
     const blob = new Blob([excelBuffer], { type: "application/octet-stream" });
@@ -306,15 +351,9 @@ const ReconciliaçãoFiscal = () => {
         </button>
       )}
 
-      {(conciliados.length > 0 ||
-        divergentesIva.length > 0 ||
-        soAGT.length > 0 ||
-        soCont.length > 0) && (
+      {reconciliacaoId !== null && (
         <div className="resultados">
-          {(conciliados.length > 0 ||
-            divergentesIva.length > 0 ||
-            soAGT.length > 0 ||
-            soCont.length > 0) && (
+          {Object.values(resumo).some((n) => n > 0) && (
             <div>
               {" "}
               <button className="btn-primario" onClick={exportarRelatorioPDF}>
@@ -327,8 +366,8 @@ const ReconciliaçãoFiscal = () => {
           )}
 
           {/* Conciliados */}
-          <h3>✅ Conciliados ({conciliados.length})</h3>
-          {paginar(conciliados, paginaConciliados).map((item, index) => (
+          <h3>✅ Conciliados ({resumo.conciliados ?? 0})</h3>
+          {conciliados.map((item, index) => (
             <div key={index} className="resultado-card">
               <strong>{item.numero_documento}</strong>
               <small>NIF: {item.nif}</small>
@@ -337,13 +376,13 @@ const ReconciliaçãoFiscal = () => {
           ))}
           <Pagination
             currentPage={paginaConciliados}
-            totalPages={Math.ceil(conciliados.length / itensPorPagina)}
+            totalPages={totalPaginas("conciliados")}
             onPageChange={setPaginaConciliados}
           />
 
           {/* Divergência no IVA */}
-          <h3>⚠️ Divergência no IVA ({divergentesIva.length})</h3>
-          {paginar(divergentesIva, paginaIva).map((item, index) => (
+          <h3>⚠️ Divergência no IVA ({resumo.divergentes_iva ?? 0})</h3>
+          {divergentesIva.map((item, index) => (
             <div key={index} className="resultado-card">
               <strong>{item.numero_documento}</strong>
               <small>NIF: {item.nif}</small>
@@ -353,13 +392,31 @@ const ReconciliaçãoFiscal = () => {
           ))}
           <Pagination
             currentPage={paginaIva}
-            totalPages={Math.ceil(divergentesIva.length / itensPorPagina)}
+            totalPages={totalPaginas("divergentes_iva")}
             onPageChange={setPaginaIva}
           />
 
+          {/* Conciliados aproximados (mesmo NIF, nº documento semelhante) */}
+          <h3>🔎 Conciliados Aproximados ({resumo.conciliados_aproximados ?? 0})</h3>
+          {aproximados.map((item, index) => (
+            <div key={index} className="resultado-card">
+              <strong>
+                {item.numero_documento_agt} ≈ {item.numero_documento_cont}
+              </strong>
+              <small>NIF: {item.nif}</small>
+              <small>Dif. valor: {item.diferenca_valor}</small>
+              <small>Dif. IVA: {item.diferenca_iva}</small>
+            </div>
+          ))}
+          <Pagination
+            currentPage={paginaAproximados}
+            totalPages={totalPaginas("conciliados_aproximados")}
+            onPageChange={setPaginaAproximados}
+          />
+
           {/* Só AGT */}
-          <h3>📄 Só no Mapa AGT ({soAGT.length})</h3>
-          {paginar(soAGT, paginaAGT).map((item, index) => (
+          <h3>📄 Só no Mapa AGT ({resumo.so_agt ?? 0})</h3>
+          {soAGT.map((item, index) => (
             <div key={index} className="resultado-card">
               <strong>{item.numero_documento}</strong>
               <small>NIF: {item.nif}</small>
@@ -368,13 +425,13 @@ const ReconciliaçãoFiscal = () => {
           ))}
           <Pagination
             currentPage={paginaAGT}
-            totalPages={Math.ceil(soAGT.length / itensPorPagina)}
+            totalPages={totalPaginas("so_agt")}
             onPageChange={setPaginaAGT}
           />
 
           {/* Só Contabilidade */}
-          <h3>📄 Só na Contabilidade ({soCont.length})</h3>
-          {paginar(soCont, paginaCont).map((item, index) => (
+          <h3>📄 Só na Contabilidade ({resumo.so_contabilidade ?? 0})</h3>
+          {soCont.map((item, index) => (
             <div key={index} className="resultado-card">
               <strong>{item.numero_documento}</strong>
               <small>NIF: {item.nif}</small>
@@ -383,7 +440,7 @@ const ReconciliaçãoFiscal = () => {
           ))}
           <Pagination
             currentPage={paginaCont}
-            totalPages={Math.ceil(soCont.length / itensPorPagina)}
+            totalPages={totalPaginas("so_contabilidade")}
             onPageChange={setPaginaCont}
           />
         </div>